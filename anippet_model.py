@@ -3,6 +3,11 @@ from fastapi import Depends, Request
 from pydantic import BaseModel, Field, create_model
 from fastapi import HTTPException
 
+from srehubapp.utils.model_cache import ModelCache, spec_key
+
+# identical query-param sets share one generated model
+_models = ModelCache("landlord")
+
 # crude OAS2 type → python type mapping
 def _py_type(p: Dict[str, Any]):
     t = p.get("type", "string")
@@ -29,15 +34,18 @@ def _field_default(p: Dict[str, Any]):
 def build_param_model_from_oas(parameters: Optional[list], *, name: str) -> Optional[type[BaseModel]]:
     """
     Build a Pydantic model for query params from OAS2 'parameters' (only 'in'=='query' considered).
-    Returns None if no query params are present.
+    Returns None if no query params are present. Models are cached by the params' content hash
+    and named after it rather than `name`, since every path with the same params shares them.
     """
-    if not parameters:
+    params = [p for p in (parameters or []) if p.get("in") == "query"]
+    if not params:
         return None
+    key = spec_key(params)
+    return _models.get_or_build(key, lambda: _build_param_model(params, key))
 
+def _build_param_model(params: list, key: str) -> type[BaseModel]:
     fields: Dict[str, Tuple[type, Field]] = {}
-    for par in parameters:
-        if par.get("in") != "query":
-            continue
+    for par in params:
         py_t = _py_type(par)
         default = _field_default(par)
         kwargs: Dict[str, Any] = {"description": par.get("description")}
@@ -46,8 +54,5 @@ def build_param_model_from_oas(parameters: Optional[list], *, name: str) -> Opti
             kwargs["json_schema_extra"] = {"enum": par["enum"]}
         fields[par["name"]] = (py_t, Field(default, **kwargs))
 
-    if not fields:
-        return None
-
-    model = create_model(f"{name}Params", **fields)  # type: ignore
+    model = create_model(f"Params_{key[:12]}", **fields)  # type: ignore
     return model
\ No newline at end of file
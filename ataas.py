@@ -1,13 +1,37 @@
 # api/v1/ataas.py
 from fastapi import APIRouter, Request
-from utils.proxy import proxy_request  # moved to utils
+from utils.proxy import proxy_request, proxy_pool_stats, close_proxy_clients, http_cache, coalescer  # moved to utils
+from utils.proxy_compress import compression_stats
+from utils.proxy_ratelimit import admission_stats
 
 router = APIRouter(prefix="/api/v1/ataas", tags=["ATAAS"])
+router.add_event_handler("shutdown", close_proxy_clients)
+router.add_event_handler("shutdown", http_cache.close)
 
 @router.get("/health")
 async def ataas_health():
     return {"ok": True}
 
+@router.get("/_proxy_pools", include_in_schema=False)
+async def proxy_pools():
+    return proxy_pool_stats()
+
+@router.get("/_proxy_cache", include_in_schema=False)
+async def proxy_cache():
+    return http_cache.stats()
+
+@router.get("/_proxy_coalesce", include_in_schema=False)
+async def proxy_coalesce():
+    return coalescer.stats()
+
+@router.get("/_proxy_compress", include_in_schema=False)
+async def proxy_compress():
+    return compression_stats()
+
+@router.get("/_proxy_admission", include_in_schema=False)
+async def proxy_admission():
+    return admission_stats()
+
 # Any non-implemented path/method is proxied to ATAAS:
 @router.api_route("/{path:path}", methods=["GET","POST","PUT","PATCH","DELETE","HEAD","OPTIONS"])
 async def ataas_fallback(path: str, request: Request):
@@ -1,16 +1,35 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import hashlib, json, os
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response, status, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRoute
-from pydantic import BaseModel, Field, create_model
-from typing import Any, Dict, Optional, Tuple, Type
+from pydantic import BaseModel, Field, ValidationError, create_model
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
 
-from ...module_bricks.ataas.bootstrap import build_catalog
-from ...module_bricks.ataas.registry import registry as code_registry
-from ...module_bricks.ataas.base import Job
-from ...connectors.ataas_connector import make_ataas_connector
+from ....module_bricks.ataas.bootstrap import build_catalog, stop_refresh
+from ....module_bricks.ataas.registry import registry as code_registry
+from ....module_bricks.ataas.base import Job
+from ....module_bricks.ataas.generic import GenericAtaasJob, compiled_schema
+from ....module_bricks.ataas.run_watcher import run_watcher
+from ....connectors.ataas_connector import ATAASAPIError, ATAASCircuitOpen, make_ataas_connector
+from ....models.ataas import BulkTriggerRequest
+from ....models.model_cache import ModelCache, spec_key
+from ....utils.route_index import index_routes
 
 ataas_router = APIRouter(prefix="/api/v1/ataas", tags=["ataas"])
 
+# Args models keyed by schema content hash; ATAAS_LAZY_MODELS builds discovered jobs' models on first trigger
+_models = ModelCache("ataas")
+ataas_router.add_event_handler("shutdown", _models.save)
+LAZY_MODELS = os.getenv("ATAAS_LAZY_MODELS", "false").lower() == "true"
+BULK_MAX_ITEMS = int(os.getenv("ATAAS_BULK_MAX_ITEMS", "1000"))
+BULK_MAX_CONCURRENCY = int(os.getenv("ATAAS_BULK_MAX_CONCURRENCY", "50"))
+SSE_KEEPALIVE_SEC = float(os.getenv("ATAAS_SSE_KEEPALIVE_SEC", "15"))
+ataas_router.add_event_handler("shutdown", run_watcher.aclose)
+ataas_router.add_event_handler("shutdown", stop_refresh)
+
 # AuthZ stub — replace with your real dependency
 async def require_authz():
     return {"user": "demo", "tenant": "default"}
@@ -36,33 +55,125 @@ def _field_from_schema(name: str, prop: Dict[str, Any], required: bool):
     return ((Optional[base] if not required else base),
             Field(default, description=desc, examples=[ex] if ex is not None else None))
 
-def model_from_jsonschema(job_name: str, schema: Dict[str, Any]) -> Type[BaseModel]:
+def _build_args_model(key: str, schema: Dict[str, Any]) -> Type[BaseModel]:
     props: Dict[str, Any] = schema.get("properties", {})
     req = set(schema.get("required", []))
     fields = {k: _field_from_schema(k, v, k in req) for k, v in props.items()}
-    return create_model(f"{job_name.title().replace('-','_')}Args", **fields)  # type: ignore
+    return create_model(f"Args_{key[:12]}", **fields)  # type: ignore
+
+def model_from_jsonschema(job_name: str, schema: Dict[str, Any]) -> Type[BaseModel]:
+    """Cached by schema content: jobs sharing a schema share one model, named after the hash."""
+    key = spec_key(schema)
+    return _models.get_or_build(key, lambda: _build_args_model(key, schema))
+
+# Router that serves the job routes and the prefix it was included with; see serve_jobs_from
+_live_app: Optional[FastAPI] = None
+_live: Tuple[APIRouter, str] = (ataas_router, "")
+
+def serve_jobs_from(app: FastAPI, prefix: str = "") -> None:
+    """
+    Call right after `app.include_router(ataas_router, prefix=prefix)`: include_router copies the
+    routes, so job routes registered at startup and on catalog refresh must go to app.router.
+    """
+    global _live_app, _live
+    _live_app, _live = app, (app.router, prefix)
 
 _CODE_JOBS: Dict[str, Type[Job]] = {}
 _DYNAMIC_FACTORIES: Dict[str, callable] = {}
+# Per-job metadata incl. args schema, filled on first use; cleared whenever the catalog changes
+_JOB_META: Dict[str, Dict[str, Any]] = {}
+# Serialized /jobs body and its ETag, rebuilt with the catalog
+_JOBS_LISTING: Tuple[bytes, str] = (b"[]", '"empty"')
 
-def _add_job_route(router: APIRouter, job_name: str, ArgsModel: Type[BaseModel], JobImpl: Type[Job] | callable):
-    async def trigger(
-        args: ArgsModel,
-        bt: BackgroundTasks,
-        caller=Depends(require_authz),
-    ):
-        payload = args.model_dump()
-        if not entitlements.allow(caller, job_name, payload):
-            raise HTTPException(status.HTTP_403_FORBIDDEN, "AUTHZ_DENIED")
+def _job_info(job_name: str) -> Optional[Dict[str, Any]]:
+    info = _JOB_META.get(job_name)
+    if info is not None:
+        return info
+    if job_name in _CODE_JOBS:
+        J = _CODE_JOBS[job_name]
+        info = {"name": J.job_name(), "title": getattr(J,"title",J.job_name()), "description": getattr(J,"description",""),
+                "schemaVersion": getattr(J,"schema_version","1.0.0"), "argsSchema": J.args_schema(), "source":"code"}
+    elif job_name in _DYNAMIC_FACTORIES:
+        factory = _DYNAMIC_FACTORIES[job_name]
+        if hasattr(factory, "meta"):
+            info = {**GenericAtaasJob.describe(factory.meta), "source": "ataas"}
+        else:  # custom factory: build it once to read the metadata
+            inst = factory()
+            info = {"name": job_name, "title": getattr(inst,"title",job_name), "description": getattr(inst,"description",""),
+                    "schemaVersion": getattr(inst,"schema_version","from-ataas"),
+                    "argsSchema": getattr(inst, "instance_args_schema", lambda: {"type":"object","properties":{}})(),
+                    "source":"ataas"}
+    else:
+        return None
+    _JOB_META[job_name] = info
+    return info
+
+def _rebuild_listing():
+    global _JOBS_LISTING
+    code = [{
+        "name": J.job_name(),
+        "title": getattr(J, "title", J.job_name()),
+        "description": getattr(J, "description", ""),
+        "schemaVersion": getattr(J, "schema_version", "1.0.0"),
+        "source": "code"
+    } for J in _CODE_JOBS.values()]
+    dyn = [{"name": n, "title": n, "description": "", "schemaVersion": "from-ataas", "source": "ataas"}
+           for n in _DYNAMIC_FACTORIES.keys()]
+    body = json.dumps(code + dyn, separators=(",", ":")).encode()
+    _JOBS_LISTING = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
 
-        job_obj = JobImpl(connector=make_ataas_connector, entitlements=entitlements, telemetry=None, queue=bt) \
-                  if isinstance(JobImpl, type) and issubclass(JobImpl, Job) else JobImpl()
+def _make_job(JobImpl: Type[Job] | callable, bt: BackgroundTasks):
+    """A code job class is instantiated with the router's deps; a discovered job's factory builds its own."""
+    if isinstance(JobImpl, type) and issubclass(JobImpl, Job):
+        return JobImpl(connector=make_ataas_connector, entitlements=entitlements, telemetry=None, queue=bt)
+    return JobImpl()
 
-        res = await job_obj.run(args=args, caller=caller, correlation_id="auto")
+def _add_job_route(router: APIRouter, job_name: str, ArgsModel: Optional[Type[BaseModel]], JobImpl: Type[Job] | callable,
+                   *, lazy_schema: Optional[Dict[str, Any]] = None):
+    """Pass ArgsModel=None with `lazy_schema` to build the args model on the first trigger."""
+    async def run(args: BaseModel, bt: BackgroundTasks, caller):
+        if not entitlements.allow(caller, job_name, args.model_dump()):
+            raise HTTPException(status.HTTP_403_FORBIDDEN, "AUTHZ_DENIED")
+        res = await _make_job(JobImpl, bt).run(args=args, caller=caller, correlation_id="auto")
         return {"run_id": res.run_id, "message": res.message, "outputs": res.outputs}
 
+    openapi_extra = None
+    if ArgsModel is not None:
+        async def trigger(
+            args: ArgsModel,
+            bt: BackgroundTasks,
+            caller=Depends(require_authz),
+        ):
+            return await run(args, bt, caller)
+        # annotations are strings under postponed evaluation; bind the real model for FastAPI
+        trigger.__annotations__["args"] = ArgsModel
+    else:
+        key = spec_key(lazy_schema)
+        openapi_extra = {"requestBody": {"required": True, "content": {
+            "application/json": {"schema": _models.schema(key) or lazy_schema}}}}
+
+        async def trigger(
+            request: Request,
+            bt: BackgroundTasks,
+            caller=Depends(require_authz),
+        ):
+            Model = _models.get_or_build(key, lambda: _build_args_model(key, lazy_schema))
+            try:
+                args = Model.model_validate(await request.json())
+            except ValidationError as e:
+                raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+            except ValueError:
+                raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": "JSON decode error", "input": {}}])
+            return await run(args, bt, caller)
+
     route = APIRoute(
-        path=f"/jobs/{job_name}/runs",
+        path=f"{_live[1]}{ataas_router.prefix}/jobs/{job_name}/runs",
         endpoint=trigger,
         methods=["POST"],
         name=f"run_{job_name}",
@@ -70,6 +181,7 @@ def _add_job_route(router: APIRouter, job_name: str, ArgsModel: Type[BaseModel],
         status_code=202,
         summary=f"Run {job_name}",
         description=f"Trigger the '{job_name}' ATAAS job.",
+        openapi_extra=openapi_extra,
     )
     router.routes.append(route)
 
@@ -77,51 +189,197 @@ def _add_job_route(router: APIRouter, job_name: str, ArgsModel: Type[BaseModel],
 async def startup():
     # Ensure code jobs are imported so @job decorator runs (import your module that defines jobs)
     try:
-        from ...module_bricks.ataas import examples  # noqa: F401
+        from ....module_bricks.ataas import examples  # noqa: F401
     except Exception:
         pass
 
-    global _CODE_JOBS, _DYNAMIC_FACTORIES
-    _CODE_JOBS, _DYNAMIC_FACTORIES = await build_catalog()
+    global _CODE_JOBS
+    _CODE_JOBS, factories = await build_catalog(on_refresh=_on_catalog_refresh)
 
     # Register routes for code jobs
     for JobCls in _CODE_JOBS.values():
         if not getattr(JobCls, "enabled", True): continue
-        _add_job_route(ataas_router, JobCls.job_name(), JobCls.ArgsModel, JobCls)
+        _add_job_route(_live[0], JobCls.job_name(), JobCls.ArgsModel, JobCls)
+    _register_dynamic_jobs(factories)
+
+def _register_dynamic_jobs(factories: Dict[str, callable]):
+    """(Re)register the discovered jobs' routes, replacing those of the previous catalog."""
+    global _DYNAMIC_FACTORIES
+    router = _live[0]
+    stale = {f"run_{name}" for name in _DYNAMIC_FACTORIES}
+    router.routes = [r for r in router.routes if r.name not in stale]
+    _DYNAMIC_FACTORIES = factories
+    _JOB_META.clear()
+    _rebuild_listing()
 
     # Register routes for discovered jobs (generic)
     for name, factory in _DYNAMIC_FACTORIES.items():
-        inst = factory()
-        schema = getattr(inst, "instance_args_schema", lambda: {"type":"object","properties":{}})()
-        ArgsModel = model_from_jsonschema(name, schema)
-        _add_job_route(ataas_router, name, ArgsModel, factory)
+        schema = _job_info(name)["argsSchema"]
+        if LAZY_MODELS:
+            _add_job_route(router, name, None, factory, lazy_schema=schema)
+        else:
+            _add_job_route(router, name, model_from_jsonschema(name, schema), factory)
+    _models.save()
+
+    # One trie lookup for /jobs/{job}/runs instead of a regex per job route
+    router.routes = index_routes(router.routes, lambda r: r.name.startswith("run_") and r.path.endswith("/runs"),
+                                 name="ataas_job_runs")
+    if _live_app is not None:
+        _live_app.openapi_schema = None  # regenerate docs on next /openapi.json
+
+def _on_catalog_refresh(code_jobs, factories):
+    # startup served the catalog snapshot; swap in the freshly discovered jobs
+    _register_dynamic_jobs(factories)
 
 @ataas_router.get("/jobs")
-async def list_jobs(caller=Depends(require_authz)):
-    code = [{
-        "name": J.job_name(),
-        "title": getattr(J, "title", J.job_name()),
-        "description": getattr(J, "description", ""),
-        "schemaVersion": getattr(J, "schema_version", "1.0.0"),
-        "source": "code"
-    } for J in _CODE_JOBS.values()]
-    dyn = [{"name": n, "title": n, "description": "", "schemaVersion": "from-ataas", "source": "ataas"}
-           for n in _DYNAMIC_FACTORIES.keys()]
-    return code + dyn
+async def list_jobs(request: Request, caller=Depends(require_authz)):
+    body, etag = _JOBS_LISTING
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 @ataas_router.get("/jobs/{job_name}")
 async def job_meta(job_name: str, caller=Depends(require_authz)):
+    info = _job_info(job_name)
+    if info is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "JOB_NOT_AVAILABLE")
+    return info
+
+async def _bulk_runs(JobImpl: Type[Job] | callable, args_list: List[BaseModel], keys: List[Optional[str]], caller,
+                     bt: BackgroundTasks, concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """Each item goes through the job's own run(), as a single trigger would; the key is its correlation id."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> Dict[str, Any]:
+        async with sem:
+            try:
+                res = await _make_job(JobImpl, bt).run(args=args_list[i], caller=caller, correlation_id=keys[i] or "auto")
+                return {"index": i, "run_id": res.run_id, "message": res.message}
+            except HTTPException as e:
+                return {"index": i, "error": e.detail, "status": e.status_code}
+            except ATAASAPIError as e:
+                return {"index": i, "error": e.message, "status": e.status}
+            except ATAASCircuitOpen as e:
+                return {"index": i, "error": str(e), "status": 503}
+            except Exception as e:
+                return {"index": i, "error": str(e) or type(e).__name__, "status": 502}
+
+    tasks = [asyncio.ensure_future(one(i)) for i in range(len(args_list))]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks: t.cancel()
+
+@ataas_router.post("/jobs/{job_name}/runs/bulk", status_code=202)
+async def bulk_trigger(job_name: str, body: BulkTriggerRequest, bt: BackgroundTasks, caller=Depends(require_authz)):
+    """
+    Trigger one job for many argument sets. Every item is validated and authorized before
+    anything is sent (422/403 list the offending indexes); runs then fan out with bounded
+    concurrency and results stream back as NDJSON, one {"index", "run_id"} or
+    {"index", "error", "status"} line per item in completion order, then a {"summary"} line.
+    """
     if job_name in _CODE_JOBS:
-        J = _CODE_JOBS[job_name]
-        return {"name": J.job_name(), "title": getattr(J,"title",J.job_name()), "description": getattr(J,"description",""),
-                "schemaVersion": getattr(J,"schema_version","1.0.0"), "argsSchema": J.args_schema(), "source":"code"}
-    if job_name in _DYNAMIC_FACTORIES:
-        inst = _DYNAMIC_FACTORIES[job_name]()
-        return {"name": job_name, "title": getattr(inst,"title",job_name), "description": getattr(inst,"description",""),
-                "schemaVersion": getattr(inst,"schema_version","from-ataas"), "argsSchema": inst.instance_args_schema(), "source":"ataas"}
-    raise HTTPException(status.HTTP_404_NOT_FOUND, "JOB_NOT_AVAILABLE")
+        JobImpl, ArgsModel, schema = _CODE_JOBS[job_name], _CODE_JOBS[job_name].ArgsModel, None
+    elif job_name in _DYNAMIC_FACTORIES:
+        JobImpl, info = _DYNAMIC_FACTORIES[job_name], _job_info(job_name)
+        schema = compiled_schema(job_name, info["schemaVersion"], info["argsSchema"])
+        ArgsModel = model_from_jsonschema(job_name, info["argsSchema"])
+    else:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "JOB_NOT_AVAILABLE")
+    if len(body.items) > BULK_MAX_ITEMS:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, f"At most {BULK_MAX_ITEMS} items per bulk trigger")
+
+    args_list: List[BaseModel] = []
+    invalid, denied = [], []
+    for i, item in enumerate(body.items):
+        try:
+            args = ArgsModel.model_validate(item.args)
+        except ValidationError as e:
+            invalid.append({"index": i, "errors": e.errors(include_url=False, include_context=False)})
+            continue
+        # the same checks, on the same dumps, as a single trigger and GenericAtaasJob.run
+        errors = schema.errors(args.model_dump(exclude_unset=True)) if schema is not None else []
+        if errors:
+            invalid.append({"index": i, "errors": errors})
+        elif not entitlements.allow(caller, job_name, args.model_dump()):
+            denied.append(i)
+        args_list.append(args)
+    if invalid:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, {"error": "BULK_VALIDATION_FAILED", "items": invalid})
+    if denied:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, {"error": "AUTHZ_DENIED", "indexes": denied})
+
+    keys = [item.idempotency_key or (item.args.get("client_token") if isinstance(item.args.get("client_token"), str) else None)
+            for item in body.items]
+    concurrency = min(body.concurrency or BULK_MAX_CONCURRENCY, BULK_MAX_CONCURRENCY)
+
+    async def ndjson():
+        ok = failed = 0
+        async for r in _bulk_runs(JobImpl, args_list, keys, caller, bt, concurrency):
+            ok, failed = (ok + 1, failed) if "run_id" in r else (ok, failed + 1)
+            yield json.dumps(r) + "\n"
+        yield json.dumps({"summary": {"total": len(args_list), "succeeded": ok, "failed": failed}}) + "\n"
+
+    return StreamingResponse(ndjson(), status_code=status.HTTP_202_ACCEPTED, media_type="application/x-ndjson")
+
+@ataas_router.get("/runs/events")
+async def run_events(run_id: List[str] = Query(...), caller=Depends(require_authz)):
+    """
+    Server-sent events for one or more runs (`?run_id=a&run_id=b`): an `event: status` per change,
+    served from the shared run watcher; the stream ends when every run is terminal.
+    """
+    sub = run_watcher.subscribe(run_id)
+
+    async def sse():
+        try:
+            while not sub.done:
+                update = await sub.get(timeout=SSE_KEEPALIVE_SEC)
+                if update is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {json.dumps(update)}\n\n"
+        finally:
+            sub.close()
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@ataas_router.websocket("/runs/ws")
+async def run_updates_ws(ws: WebSocket, caller=Depends(require_authz)):
+    """Send {"subscribe": [...]} / {"unsubscribe": [...]}; receive one JSON status message per change."""
+    await ws.accept()
+    sub = run_watcher.subscribe()
+
+    async def reader():
+        try:
+            while True:
+                msg = await ws.receive_json()
+                for rid in msg.get("subscribe", []): sub.add(rid)
+                for rid in msg.get("unsubscribe", []): sub.remove(rid)
+        except (WebSocketDisconnect, ValueError):
+            return
+
+    read_task = asyncio.ensure_future(reader())
+    try:
+        while True:
+            nxt = asyncio.ensure_future(sub.get())
+            done, _ = await asyncio.wait({nxt, read_task}, return_when=asyncio.FIRST_COMPLETED)
+            if read_task in done:
+                nxt.cancel()
+                break
+            await ws.send_json(nxt.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        read_task.cancel()
+        sub.close()
+
+@ataas_router.get("/runs/_watcher", include_in_schema=False)
+async def run_watcher_stats():
+    return run_watcher.stats()
 
 @ataas_router.get("/runs/{run_id}")
 async def run_status(run_id: str, caller=Depends(require_authz)):
-    async with make_ataas_connector() as c:
-        return await c.status(run_id)
\ No newline at end of file
+    # terminal runs come from cache; watched runs from the poller's latest copy
+    return await run_watcher.status(run_id)
\ No newline at end of file
@@ -1,7 +1,22 @@
 from fastapi import FastAPI
-from .api.v1.routers.ataas import ataas_router
+from .api.v1.routers.ataas import ataas_router, serve_jobs_from
+from .connectors.ataas_connector import start_ataas_pool, close_ataas_pool, ataas_pool_stats, circuit_stats
+from .auth.auth_base import close_token_client
 
 app = FastAPI(title="SREHubApp")
+# pool must be up before router startup hooks (job discovery) run
+app.add_event_handler("startup", start_ataas_pool)
+app.add_event_handler("shutdown", close_ataas_pool)
+app.add_event_handler("shutdown", close_token_client)
 app.include_router(ataas_router)
+serve_jobs_from(app)  # job routes are added at startup, after include_router copied the rest
+
+@app.get("/api/v1/ataas/_pool", include_in_schema=False)
+async def ataas_pool():
+    return ataas_pool_stats()
+
+@app.get("/api/v1/ataas/_circuit", include_in_schema=False)
+async def ataas_circuit():
+    return circuit_stats()
 
 # add other routers here as needed
\ No newline at end of file
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Dict
-import os, base64, time, httpx
+from typing import Dict, Optional, Tuple
+import asyncio, os, base64, hashlib, time, httpx
 
 # ---- Strategy contract ----
 class AuthStrategy(ABC):
@@ -29,23 +29,68 @@ class BasicAuth(AuthStrategy):
     async def headers(self) -> Dict[str, str]:
         return dict(self._headers)
 
+class _TokenState:
+    """Cached token + in-flight/background refresh tasks for one credential set."""
+    __slots__ = ("access_token", "expires_at", "inflight", "prefetch", "last_used")
+    def __init__(self):
+        self.access_token: str | None = None
+        self.expires_at: float = 0.0
+        self.inflight: Optional[asyncio.Future] = None
+        self.prefetch: Optional[asyncio.Task] = None
+        self.last_used: float = 0.0  # monotonic time of the last headers() call
+
+# Shared by every OAuth2ClientCredentials (e.g. each auth_from_env(prefix) call) with the same credentials
+_TOKENS: Dict[Tuple, _TokenState] = {}
+_token_http: httpx.AsyncClient | None = None
+
+def _token_client() -> httpx.AsyncClient:
+    # shared by every credential set, so each token POST passes its own timeout
+    global _token_http
+    if _token_http is None or _token_http.is_closed:
+        _token_http = httpx.AsyncClient(limits=httpx.Limits(max_connections=10, max_keepalive_connections=5))
+    return _token_http
+
+async def close_token_client() -> None:
+    global _token_http
+    for st in _TOKENS.values():
+        if st.prefetch and not st.prefetch.done(): st.prefetch.cancel()
+    if _token_http is not None: await _token_http.aclose()
+    _token_http = None
+
 class OAuth2ClientCredentials(AuthStrategy):
+    """
+    Client-credentials grant with single-flight refresh: concurrent callers near
+    expiry share one token POST, and a background task refreshes ahead of expiry
+    as long as headers() was called within the last `prefetch_idle_sec`; an idle
+    credential lets its token lapse and refreshes on its next use.
+    """
     def __init__(self, token_url: str, client_id: str, client_secret: str,
                  scope: str | None = None, auth_method: str = "client_secret_basic",
-                 audience: str | None = None, timeout_sec: float = 10.0):
+                 audience: str | None = None, timeout_sec: float = 10.0,
+                 refresh_ahead_sec: float = 60.0, prefetch_idle_sec: float = 900.0):
         self.token_url, self.client_id, self.client_secret = token_url, client_id, client_secret
         self.scope, self.auth_method, self.audience = scope, auth_method, audience
         self.timeout_sec = timeout_sec
-        self._access_token: str | None = None
-        self._expires_at: float = 0.0
+        self.refresh_ahead_sec = refresh_ahead_sec
+        self.prefetch_idle_sec = prefetch_idle_sec
+        key = (token_url, client_id, hashlib.sha256(client_secret.encode()).hexdigest(), scope, audience, auth_method)
+        self._state = _TOKENS.setdefault(key, _TokenState())
 
     async def headers(self) -> Dict[str, str]:
-        now = time.time()
-        if not self._access_token or now + 30 >= self._expires_at:
+        st = self._state
+        st.last_used = time.monotonic()
+        if not st.access_token or time.time() + 30 >= st.expires_at:
             await self._refresh()
-        return {"Authorization": f"Bearer {self._access_token}"}
+        return {"Authorization": f"Bearer {st.access_token}"}
 
     async def _refresh(self) -> None:
+        st = self._state
+        if st.inflight is None or st.inflight.done():
+            st.inflight = asyncio.ensure_future(self._fetch())
+        # shield: a cancelled waiter must not cancel the refresh the others are waiting on
+        await asyncio.shield(st.inflight)
+
+    async def _fetch(self) -> None:
         data = {"grant_type": "client_credentials"}
         if self.scope: data["scope"] = self.scope
         if self.audience: data["audience"] = self.audience
@@ -53,14 +98,32 @@ class OAuth2ClientCredentials(AuthStrategy):
         if auth is None:
             data["client_id"] = self.client_id
             data["client_secret"] = self.client_secret
-        async with httpx.AsyncClient(timeout=self.timeout_sec) as client:
-            r = await client.post(self.token_url, data=data,
-                                  headers={"Content-Type": "application/x-www-form-urlencoded"},
-                                  auth=auth)
-            r.raise_for_status()
-            body = r.json()
-        self._access_token = body["access_token"]
-        self._expires_at = time.time() + max(60, int(0.9 * int(body.get("expires_in", 3600))))
+        r = await _token_client().post(self.token_url, data=data,
+                                       headers={"Content-Type": "application/x-www-form-urlencoded"},
+                                       auth=auth, timeout=self.timeout_sec)
+        r.raise_for_status()
+        body = r.json()
+        st = self._state
+        st.access_token = body["access_token"]
+        st.expires_at = time.time() + max(60, int(0.9 * int(body.get("expires_in", 3600))))
+        self._schedule_prefetch()
+
+    def _schedule_prefetch(self) -> None:
+        st = self._state
+        if st.prefetch and not st.prefetch.done(): st.prefetch.cancel()
+        lifetime = st.expires_at - time.time()
+        # never refresh more often than every half lifetime, whatever refresh_ahead_sec says
+        delay = lifetime - min(self.refresh_ahead_sec, lifetime / 2)
+        st.prefetch = asyncio.ensure_future(self._prefetch_after(delay))
+
+    async def _prefetch_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if time.monotonic() - self._state.last_used > self.prefetch_idle_sec:
+            return  # unused lately: stop re-arming; the next headers() refreshes in the foreground
+        try:
+            await self._refresh()
+        except Exception:
+            pass  # headers() falls back to a foreground refresh near expiry
 
 # ---- Env factory (per-connector prefix) ----
 def auth_from_env(prefix: str) -> AuthStrategy:
@@ -8,6 +8,7 @@ from typing import Any, AsyncIterator, Dict, List, Optional
 import httpx
 
 from ..auth.auth_base import AuthStrategy, auth_from_env
+from .circuit import guard_for, circuit_stats
 from ..models.ataas import JobCatalogItem, TriggerResponse, RunStatus
 
 class ATAASAPIError(RuntimeError):
@@ -17,6 +18,9 @@ class ATAASAPIError(RuntimeError):
 
 class ATAASCircuitOpen(RuntimeError): pass
 
+class ATAASOverloaded(ATAASCircuitOpen):
+    """Shed by the adaptive concurrency limiter before the request reached ATAAS."""
+
 @dataclass(frozen=True)
 class ATAASConfig:
     base_url: str
@@ -28,7 +32,19 @@ class ATAASConfig:
     jitter: bool = True
     cb_error_threshold: int = 8
     cb_reset_after_sec: float = 30.0
+    cb_window_sec: float = 30.0
+    cb_error_rate: float = 0.5
+    cb_shared_dir: Optional[str] = None
+    aimd_initial_limit: int = 20
+    aimd_max_limit: int = 200
+    aimd_latency_target_sec: Optional[float] = None
     default_project: Optional[str] = None
+    max_connections: int = 100
+    max_keepalive: int = 20
+    keepalive_expiry_sec: float = 30.0
+    http2: bool = False
+    catalog_page_size: int = 200
+    bulk_concurrency: int = 10
 
     @staticmethod
     def from_env() -> "ATAASConfig":
@@ -42,47 +58,63 @@ class ATAASConfig:
             jitter=os.getenv("ATAAS_JITTER", "true").lower() != "false",
             cb_error_threshold=int(os.getenv("ATAAS_CB_ERROR_THRESHOLD", "8")),
             cb_reset_after_sec=float(os.getenv("ATAAS_CB_RESET_AFTER_SEC", "30")),
+            cb_window_sec=float(os.getenv("ATAAS_CB_WINDOW_SEC", "30")),
+            cb_error_rate=float(os.getenv("ATAAS_CB_ERROR_RATE", "0.5")),
+            cb_shared_dir=os.getenv("ATAAS_CB_SHARED_DIR") or None,
+            aimd_initial_limit=int(os.getenv("ATAAS_AIMD_INITIAL_LIMIT", "20")),
+            aimd_max_limit=int(os.getenv("ATAAS_AIMD_MAX_LIMIT", "200")),
+            aimd_latency_target_sec=float(os.environ["ATAAS_AIMD_LATENCY_TARGET_SEC"]) if os.getenv("ATAAS_AIMD_LATENCY_TARGET_SEC") else None,
             default_project=os.getenv("SREHUB_ATAAS_PROJECT"),
+            max_connections=int(os.getenv("ATAAS_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("ATAAS_MAX_KEEPALIVE", "20")),
+            keepalive_expiry_sec=float(os.getenv("ATAAS_KEEPALIVE_EXPIRY_SEC", "30")),
+            http2=os.getenv("ATAAS_HTTP2", "false").lower() == "true",
+            catalog_page_size=int(os.getenv("ATAAS_CATALOG_PAGE_SIZE", "200")),
+            bulk_concurrency=int(os.getenv("ATAAS_BULK_CONCURRENCY", "10")),
         )
 
-class _Circuit:
-    def __init__(self, threshold: int, reset_after: float):
-        self.threshold, self.reset_after = threshold, reset_after
-        self.failures = 0
-        self.opened_at: Optional[float] = None
-    def on_success(self): self.failures, self.opened_at = 0, None
-    def on_failure(self):
-        self.failures += 1
-        if self.failures >= self.threshold and self.opened_at is None:
-            self.opened_at = time.time()
-    def allow(self) -> bool:
-        return self.opened_at is None or (time.time() - self.opened_at) >= self.reset_after
-    def maybe_close_after_probe(self, success: bool):
-        if self.opened_at is None: return
-        if success: self.on_success()
-        else: self.opened_at = time.time()
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2] extra)
+        return True
+    except ImportError:
+        return False
+
+def _build_client(config: ATAASConfig, *, event_hooks: Optional[dict] = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=config.base_url,
+        timeout=httpx.Timeout(config.timeout_sec, connect=config.connect_timeout_sec),
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive,
+            keepalive_expiry=config.keepalive_expiry_sec,
+        ),
+        http2=config.http2 and _http2_available(),
+        event_hooks=event_hooks,
+    )
 
 class ATAASConnector:
     """
     Async ATAAS client delegating auth to an injected AuthStrategy.
+    Pass `client` to borrow a shared (pooled) httpx client; it is never closed here.
     """
-    def __init__(self, auth: AuthStrategy, config: Optional[ATAASConfig] = None):
+    def __init__(self, auth: AuthStrategy, config: Optional[ATAASConfig] = None,
+                 client: Optional[httpx.AsyncClient] = None):
         self.config = config or ATAASConfig.from_env()
         if not self.config.base_url:
             raise ValueError("ATAAS_BASE_URL must be set")
         self.auth = auth
+        self._shared_client = client
         self._client: Optional[httpx.AsyncClient] = None
-        self._circuit = _Circuit(self.config.cb_error_threshold, self.config.cb_reset_after_sec)
+        # breaker + limiter are per upstream and outlive this (per-request) connector
+        self._guard = guard_for(self.config.base_url, self.config)
 
     async def __aenter__(self) -> "ATAASConnector":
-        self._client = httpx.AsyncClient(
-            base_url=self.config.base_url,
-            timeout=httpx.Timeout(self.config.timeout_sec, connect=self.config.connect_timeout_sec),
-        )
+        self._client = self._shared_client or _build_client(self.config)
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        if self._client: await self._client.aclose()
+        if self._client and self._client is not self._shared_client: await self._client.aclose()
         self._client = None
 
     # ---- Public API ----
@@ -95,6 +127,28 @@ class ATAASConnector:
             raise ATAASAPIError(500, "Unexpected response for list_jobs", payload={"body": raw})
         return [JobCatalogItem(**item) for item in raw]
 
+    async def iter_jobs(self, project: Optional[str] = None, *, page_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the project's catalog page by page as raw dicts (no model round-trip).
+        Paged responses look like {"items": [...], "next_page_token": "..."}; a plain list is a single page.
+        """
+        project = project or self.config.default_project
+        if not project:
+            raise ValueError("project must be provided (env SREHUB_ATAAS_PROJECT or param)")
+        params: Dict[str, Any] = {"page_size": page_size or self.config.catalog_page_size}
+        while True:
+            raw = await self._request("GET", f"/api/v1/projects/{project}/jobs", params=params)
+            if isinstance(raw, list):
+                yield raw
+                return
+            if not isinstance(raw, dict) or not isinstance(raw.get("items", raw.get("jobs")), list):
+                raise ATAASAPIError(500, "Unexpected response for list_jobs", payload={"body": raw})
+            yield raw.get("items", raw.get("jobs"))
+            token = raw.get("next_page_token") or raw.get("nextPageToken")
+            if not token:
+                return
+            params["page_token"] = token
+
     async def trigger(self, job: str, payload: Dict[str, Any], *, client_token: Optional[str] = None) -> str:
         headers = {"Idempotency-Key": client_token} if client_token else None
         raw = await self._request("POST", f"/api/v1/jobs/{job}/runs", json=payload, headers=headers)
@@ -105,6 +159,35 @@ class ATAASConnector:
         except Exception:
             raise ATAASAPIError(500, "No run_id in trigger response", payload={"body": raw})
 
+    async def trigger_many(self, job: str, payloads: List[Dict[str, Any]], *,
+                           client_tokens: Optional[List[Optional[str]]] = None,
+                           concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Trigger `job` once per payload over this connector's client, at most `concurrency`
+        (default config.bulk_concurrency) in flight. Yields {"index", "run_id"} or
+        {"index", "error", "status"} per item, in completion order.
+        """
+        sem = asyncio.Semaphore(concurrency or self.config.bulk_concurrency)
+        tokens = client_tokens or [None] * len(payloads)
+
+        async def one(i: int) -> Dict[str, Any]:
+            async with sem:
+                try:
+                    return {"index": i, "run_id": await self.trigger(job, payloads[i], client_token=tokens[i])}
+                except ATAASAPIError as e:
+                    return {"index": i, "error": e.message, "status": e.status}
+                except ATAASCircuitOpen as e:
+                    return {"index": i, "error": str(e), "status": 503}
+                except Exception as e:
+                    return {"index": i, "error": str(e) or type(e).__name__, "status": 502}
+
+        tasks = [asyncio.ensure_future(one(i)) for i in range(len(payloads))]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:  # consumer went away: don't leave triggers running
+            for t in tasks: t.cancel()
+
     async def status(self, run_id: str) -> RunStatus:
         raw = await self._request("GET", f"/api/v1/runs/{run_id}")
         if not isinstance(raw, dict):
@@ -112,33 +195,52 @@ class ATAASConnector:
         return RunStatus(**raw)
 
     # ---- Internals ----
-    async def _request(self, method: str, path: str, *, json: Optional[dict] = None, headers: Optional[dict] = None):
+    async def _request(self, method: str, path: str, *, json: Optional[dict] = None, headers: Optional[dict] = None,
+                       params: Optional[dict] = None):
         if self._client is None:
             raise RuntimeError("Connector not started. Use 'async with ATAASConnector(...) as c:'")
-        if not self._circuit.allow():
+        breaker, limiter = self._guard.breaker, self._guard.limiter
+        ticket = breaker.allow()
+        if ticket is None:
             raise ATAASCircuitOpen("Circuit open for ATAAS; backing off")
 
         attempt, last_exc = 0, None
         while attempt <= self.config.retries:
+            if attempt:
+                # back off without holding a concurrency permit, then stop if the breaker opened meanwhile
+                await self._sleep_backoff(attempt - 1)
+                if breaker.state != "closed":
+                    raise ATAASCircuitOpen("Circuit opened for ATAAS while retrying")
+            if not limiter.try_acquire():
+                breaker.abandon(ticket)
+                raise ATAASOverloaded("ATAAS concurrency limit reached; shedding request")
+            ok, recorded, started = False, False, time.monotonic()
             try:
                 auth_headers = await self.auth.headers()
                 merged_headers = {**auth_headers, **(headers or {})}
-                resp = await self._client.request(method, path, json=json, headers=merged_headers)
+                started = time.monotonic()  # upstream latency only, not the token fetch
+                resp = await self._client.request(method, path, json=json, headers=merged_headers, params=params)
 
                 if 200 <= resp.status_code < 300:
-                    self._circuit.maybe_close_after_probe(True); self._circuit.on_success()
+                    ok = recorded = True; breaker.record(True, ticket)
                     return resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {"text": resp.text}
 
                 body = _safe_json(resp)
                 if resp.status_code >= 500 or resp.status_code in (408, 429):
-                    self._circuit.on_failure(); await self._sleep_backoff(attempt); attempt += 1; continue
-                self._circuit.maybe_close_after_probe(False)
+                    recorded = True; breaker.record(False, ticket)
+                    attempt += 1; continue
+                # a 4xx is the caller's problem; the upstream answered, so it counts as healthy
+                ok = recorded = True; breaker.record(True, ticket)
                 raise ATAASAPIError(resp.status_code, body.get("error") or resp.text, payload=body)
 
-            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as e:
-                last_exc = e; self._circuit.on_failure(); await self._sleep_backoff(attempt); attempt += 1; continue
+            except ATAASAPIError:
+                raise
             except Exception as e:
-                last_exc = e; self._circuit.on_failure(); await self._sleep_backoff(attempt); attempt += 1; continue
+                last_exc = e; recorded = True; breaker.record(False, ticket)
+                attempt += 1; continue
+            finally:
+                limiter.release(ok, time.monotonic() - started)
+                if not recorded: breaker.abandon(ticket)  # cancelled mid-flight: free the half-open probe
 
         if last_exc: raise last_exc
         raise ATAASAPIError(503, "ATAAS unavailable after retries")
@@ -153,10 +255,79 @@ def _safe_json(resp: httpx.Response) -> Dict[str, Any]:
     try: return resp.json()
     except Exception: return {"text": resp.text}
 
+class ATAASClientPool:
+    """
+    App-scoped httpx client shared by every ATAASConnector, so connections
+    (TCP + TLS, optionally HTTP/2) are reused across requests.
+    Start on FastAPI startup, close on shutdown.
+    """
+    def __init__(self, config: Optional[ATAASConfig] = None):
+        self.config = config or ATAASConfig.from_env()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.leases = 0
+        self.requests = 0
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    async def start(self) -> "ATAASClientPool":
+        if self._client is None:
+            self._client = _build_client(self.config, event_hooks={"request": [self._on_request]})
+        return self
+
+    async def aclose(self):
+        if self._client: await self._client.aclose()
+        self._client = None
+
+    def lease(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("ATAAS client pool not started")
+        self.leases += 1
+        return self._client
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests += 1
+
+    def stats(self) -> Dict[str, Any]:
+        transport = getattr(self._client, "_transport", None)
+        conns = list(getattr(getattr(transport, "_pool", None), "connections", None) or [])
+        return {
+            "started": self.started,
+            "http2": bool(self._client and self.config.http2 and _http2_available()),
+            "max_connections": self.config.max_connections,
+            "max_keepalive": self.config.max_keepalive,
+            "keepalive_expiry_sec": self.config.keepalive_expiry_sec,
+            "connections": len(conns),
+            "idle_connections": sum(1 for c in conns if c.is_idle()),
+            "leases": self.leases,
+            "requests": self.requests,
+        }
+
+_pool: Optional[ATAASClientPool] = None
+
+async def start_ataas_pool(config: Optional[ATAASConfig] = None) -> ATAASClientPool:
+    global _pool
+    if _pool is None:
+        _pool = await ATAASClientPool(config).start()
+    return _pool
+
+async def close_ataas_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+    _pool = None
+
+def ataas_pool_stats() -> Dict[str, Any]:
+    return _pool.stats() if _pool is not None else {"started": False}
+
 # Factory: keep auth in the shared auth layer
 @asynccontextmanager
 async def make_ataas_connector(config: Optional[ATAASConfig] = None) -> AsyncIterator[ATAASConnector]:
     auth = auth_from_env("ATAAS")  # will produce ApiKeyAuth for ATAAS
-    conn = ATAASConnector(auth=auth, config=config or ATAASConfig.from_env())
+    config = config or ATAASConfig.from_env()
+    # borrow the app pool when it targets the same upstream; otherwise fall back to a per-call client
+    shared = _pool.lease() if _pool is not None and _pool.started and _pool.config.base_url == config.base_url else None
+    conn = ATAASConnector(auth=auth, config=config, client=shared)
     async with conn as started:
         yield started
\ No newline at end of file
@@ -13,6 +13,14 @@ class JobCatalogItem(BaseModel):
 class TriggerResponse(BaseModel):
     run_id: str
 
+class BulkTriggerItem(BaseModel):
+    args: Dict[str, Any] = Field(default_factory=dict)
+    idempotency_key: Optional[str] = None
+
+class BulkTriggerRequest(BaseModel):
+    items: List[BulkTriggerItem]
+    concurrency: Optional[int] = Field(None, ge=1)
+
 RunState = Literal["QUEUED", "RUNNING", "SUCCEEDED", "FAILED", "CANCELLED"]
 
 class RunStatus(BaseModel):
@@ -1,10 +1,14 @@
 from __future__ import annotations
-from typing import Dict, Type, Callable
+import asyncio, inspect, logging
+from typing import Any, Dict, List, Optional, Type, Callable
 from .registry import registry
 from .generic import GenericAtaasJob
-from .discovery import discover_filtered_jobs
+from .discovery import discover_filtered_jobs, load_snapshot, save_snapshot
 from ...connectors.ataas_connector import make_ataas_connector
 
+log = logging.getLogger("ataas.bootstrap")
+_refresh_task: Optional[asyncio.Task] = None
+
 def _code_jobs_map():
     return {J.job_name(): J for J in registry.all() if getattr(J, "enabled", True)}
 
@@ -12,15 +16,7 @@ class SimpleEntitlements:
     def allow(self, caller, job_name: str, args: dict) -> bool:
         return True
 
-async def build_catalog():
-    """
-    Returns:
-      - code_jobs: Dict[name, Type[Job]]
-      - dynamic_factories: Dict[name, Callable[[], GenericAtaasJob]]
-    """
-    code_jobs = _code_jobs_map()
-    discovered = await discover_filtered_jobs()
-
+def _factories(discovered: List[Dict[str, Any]], code_jobs: Dict[str, Type]) -> Dict[str, Callable[[], GenericAtaasJob]]:
     factories: Dict[str, Callable[[], GenericAtaasJob]] = {}
     for meta in discovered:
         name = meta["name"]
@@ -34,5 +30,50 @@ async def build_catalog():
                 queue=None,
                 meta=meta
             )
+        factory.meta = meta  # lets read-only endpoints describe the job without instantiating it
         factories[name] = factory
-    return code_jobs, factories
\ No newline at end of file
+    return factories
+
+async def _refresh(on_refresh: Optional[Callable]):
+    try:
+        discovered = await discover_filtered_jobs()
+    except Exception as e:  # keep serving the snapshot
+        log.warning("ATAAS catalog refresh failed, keeping snapshot: %s", e)
+        return
+    save_snapshot(discovered)
+    if on_refresh is not None:
+        code_jobs = _code_jobs_map()
+        res = on_refresh(code_jobs, _factories(discovered, code_jobs))
+        if inspect.isawaitable(res):
+            await res
+
+async def build_catalog(on_refresh: Optional[Callable] = None):
+    """
+    Returns:
+      - code_jobs: Dict[name, Type[Job]]
+      - dynamic_factories: Dict[name, Callable[[], GenericAtaasJob]]
+
+    With a catalog snapshot (SREHUB_ATAAS_CATALOG_SNAPSHOT) the catalog comes from the last
+    known one immediately and is refreshed from ATAAS in the background; the fresh catalog is
+    passed to `on_refresh(code_jobs, dynamic_factories)`.
+    """
+    global _refresh_task
+    code_jobs = _code_jobs_map()
+    snapshot = load_snapshot()
+    if snapshot is None:
+        discovered = await discover_filtered_jobs()
+        save_snapshot(discovered)
+        return code_jobs, _factories(discovered, code_jobs)
+    _refresh_task = asyncio.create_task(_refresh(on_refresh))
+    return code_jobs, _factories(snapshot, code_jobs)
+
+async def stop_refresh():
+    """Cancel a background catalog refresh still running at shutdown."""
+    global _refresh_task
+    if _refresh_task is not None and not _refresh_task.done():
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+    _refresh_task = None
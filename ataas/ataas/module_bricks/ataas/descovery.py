@@ -1,25 +1,102 @@
 from __future__ import annotations
-import fnmatch, os
-from typing import Any, Dict, List
+import asyncio, fnmatch, json, logging, os, re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Pattern, Set, Tuple
 from ...connectors.ataas_connector import make_ataas_connector
 
+log = logging.getLogger("ataas.discovery")
+
+# tag -> job names, rebuilt on every discovery / snapshot load
+_tag_index: Dict[str, Set[str]] = {}
+
 def _split_env(name: str) -> List[str]:
     v = os.getenv(name, "").strip()
     return [s.strip() for s in v.split(",") if s.strip()]
 
+@lru_cache(maxsize=32)
+def _compile(patterns: Tuple[str, ...]) -> Optional[Pattern[str]]:
+    """All glob patterns as one alternation regex (None when there are none)."""
+    if not patterns: return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
 def _allowed(name: str, tags: List[str], allow: List[str], deny: List[str], require_tags: List[str]) -> bool:
-    if allow and not any(fnmatch.fnmatch(name, pat) for pat in allow): return False
-    if any(fnmatch.fnmatch(name, pat) for pat in deny): return False
-    if require_tags and not set(require_tags).issubset(set(tags or [])): return False
+    allow_re, deny_re = _compile(tuple(allow)), _compile(tuple(deny))
+    if allow_re and not allow_re.match(name): return False
+    if deny_re and deny_re.match(name): return False
+    if require_tags and not set(require_tags).issubset(tags or ()): return False
     return True
 
-async def discover_filtered_jobs() -> List[Dict[str, Any]]:
-    project = os.getenv("SREHUB_ATAAS_PROJECT", "default")
-    allow = _split_env("SREHUB_ATAAS_ALLOW")
-    deny = _split_env("SREHUB_ATAAS_DENY")
-    require_tags = _split_env("SREHUB_ATAAS_REQUIRE_TAGS")
+def _filters() -> Tuple[List[str], List[str], List[str]]:
+    """(allow, deny, require_tags) from SREHUB_ATAAS_ALLOW / _DENY / _REQUIRE_TAGS."""
+    return _split_env("SREHUB_ATAAS_ALLOW"), _split_env("SREHUB_ATAAS_DENY"), _split_env("SREHUB_ATAAS_REQUIRE_TAGS")
+
+def _projects() -> List[str]:
+    return _split_env("SREHUB_ATAAS_PROJECTS") or [os.getenv("SREHUB_ATAAS_PROJECT", "default")]
+
+def build_tag_index(jobs: List[Dict[str, Any]]) -> Dict[str, Set[str]]:
+    index: Dict[str, Set[str]] = {}
+    for j in jobs:
+        for tag in j.get("tags") or []:
+            index.setdefault(tag, set()).add(j["name"])
+    return index
+
+def jobs_with_tags(*tags: str) -> Set[str]:
+    """Names of discovered jobs carrying every one of `tags`."""
+    if not tags: return set()
+    sets = [_tag_index.get(t, set()) for t in tags]
+    return set.intersection(*sets)
+
+async def _discover_project(project: str, allow: List[str], deny: List[str], require_tags: List[str]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
     async with make_ataas_connector() as c:
-        catalog = await c.list_jobs(project=project)
-    # c.list_jobs returns JobCatalogItem models → coerce to dict
-    items = [j.model_dump() for j in catalog]
-    return [j for j in items if _allowed(j.get("name",""), j.get("tags", []), allow, deny, require_tags)]
\ No newline at end of file
+        async for page in c.iter_jobs(project=project):
+            # filter page by page; items stay plain dicts (no model round-trip)
+            out.extend(dict(j, project=project) for j in page
+                       if _allowed(j.get("name", ""), j.get("tags", []), allow, deny, require_tags))
+    return out
+
+async def discover_filtered_jobs() -> List[Dict[str, Any]]:
+    """
+    Fetch the catalogs of every project in SREHUB_ATAAS_PROJECTS (default: SREHUB_ATAAS_PROJECT)
+    concurrently, page by page, keeping jobs that pass the allow/deny/require-tags filters.
+    On a name clash the project listed first wins.
+    """
+    global _tag_index
+    allow, deny, require_tags = _filters()
+    per_project = await asyncio.gather(*(_discover_project(p, allow, deny, require_tags) for p in _projects()))
+    seen: Dict[str, Dict[str, Any]] = {}
+    for jobs in per_project:
+        for j in jobs:
+            seen.setdefault(j["name"], j)
+    items = list(seen.values())
+    _tag_index = build_tag_index(items)
+    return items
+
+# ---- On-disk snapshot of the last discovered catalog ----
+def _snapshot_path() -> Optional[str]:
+    return os.getenv("SREHUB_ATAAS_CATALOG_SNAPSHOT") or None
+
+def load_snapshot() -> Optional[List[Dict[str, Any]]]:
+    """The last saved catalog, narrowed to the jobs today's allow/deny/require-tags filters keep."""
+    global _tag_index
+    path = _snapshot_path()
+    if not path or not os.path.exists(path): return None
+    try:
+        with open(path, "r") as f:
+            items = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable catalog snapshot %s: %s", path, e)
+        return None
+    allow, deny, require_tags = _filters()  # the snapshot may predate a filter change
+    items = [j for j in items if _allowed(j.get("name", ""), j.get("tags", []), allow, deny, require_tags)]
+    _tag_index = build_tag_index(items)
+    return items
+
+def save_snapshot(items: List[Dict[str, Any]]) -> None:
+    path = _snapshot_path()
+    if not path: return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(items, f)
+    os.replace(tmp, path)
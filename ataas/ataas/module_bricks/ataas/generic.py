@@ -1,12 +1,68 @@
 from __future__ import annotations
-from typing import Any, Dict
-from pydantic import BaseModel
-from jsonschema import validate as json_validate, ValidationError
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, RootModel
+from jsonschema.validators import validator_for
 from fastapi import HTTPException, status
 from .base import Job, JobArgs, JobResult
+from ...models.model_cache import spec_key
 
-class DictArgs(JobArgs):
-    __root__: Dict[str, Any]
+try:
+    import fastjsonschema
+except ImportError:  # optional fast path; jsonschema alone works
+    fastjsonschema = None
+
+USE_FASTJSONSCHEMA = os.getenv("ATAAS_FASTJSONSCHEMA", "true").lower() != "false"
+
+class DictArgs(RootModel[Dict[str, Any]]):
+    pass
+
+class _CompiledSchema:
+    """
+    One schema, checked once. `fast` (fastjsonschema, when installed) answers the common
+    valid case; the jsonschema validator collects every error when it is not. Neither path
+    changes the payload (fastjsonschema is compiled without default filling).
+    """
+    __slots__ = ("schema", "key", "validator", "fast")
+
+    def __init__(self, schema: Dict[str, Any], key: str):
+        self.schema = schema
+        self.key = key
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        self.validator = cls(schema)
+        self.fast: Optional[Callable[[Any], Any]] = None
+        if fastjsonschema is not None and USE_FASTJSONSCHEMA:
+            try:
+                self.fast = fastjsonschema.compile(schema, use_default=False)
+            except Exception:  # draft/keyword fastjsonschema can't compile: jsonschema only
+                self.fast = None
+
+    def errors(self, payload: Any) -> List[Dict[str, Any]]:
+        if self.fast is not None:
+            try:
+                self.fast(payload)
+                return []
+            except fastjsonschema.JsonSchemaException:
+                pass
+        errs = sorted(self.validator.iter_errors(payload), key=lambda e: list(e.absolute_path))
+        return [{"path": "/".join(str(p) for p in e.absolute_path), "message": e.message, "validator": e.validator}
+                for e in errs]
+
+# (job name, schema version) -> compiled schema; rebuilt if the job's schema content hash changes
+_VALIDATORS: Dict[Tuple[str, str], _CompiledSchema] = {}
+
+def compiled_schema(name: str, version: str, schema: Dict[str, Any]) -> _CompiledSchema:
+    compiled = _VALIDATORS.get((name, version))
+    if compiled is not None and compiled.schema is schema:
+        return compiled
+    # a schema object not seen before (e.g. after a catalog load) is hashed once, never deep-compared
+    key = spec_key(schema)
+    if compiled is None or compiled.key != key:
+        compiled = _VALIDATORS[(name, version)] = _CompiledSchema(schema, key)
+    else:
+        compiled.schema = schema  # same content: later calls with this object take the identity check
+    return compiled
 
 class GenericAtaasJob(Job):
     ArgsModel = DictArgs
@@ -14,24 +70,34 @@ class GenericAtaasJob(Job):
     def __init__(self, *, connector, entitlements, telemetry, queue, meta: Dict[str, Any]):
         super().__init__(connector=connector, entitlements=entitlements, telemetry=telemetry, queue=queue)
         self._meta = meta
-        self.name = meta["name"]
-        self.title = meta.get("title", meta["name"])
-        self.description = meta.get("description", "")
-        self.schema_version = str(meta.get("version", "1.0.0"))
-        self._schema = meta.get("schema") or {"type": "object", "properties": {}}
+        info = self.describe(meta)
+        self.name = info["name"]
+        self.title = info["title"]
+        self.description = info["description"]
+        self.schema_version = info["schemaVersion"]
+        self._schema = info["argsSchema"]
+
+    @staticmethod
+    def describe(meta: Dict[str, Any]) -> Dict[str, Any]:
+        """Job metadata from a catalog item, without building a job."""
+        return {"name": meta["name"], "title": meta.get("title", meta["name"]), "description": meta.get("description", ""),
+                "schemaVersion": str(meta.get("version", "1.0.0")),
+                "argsSchema": meta.get("schema") or {"type": "object", "properties": {}}}
 
     def instance_args_schema(self) -> Dict[str, Any]:
         return self._schema
 
-    async def run(self, *, args: DictArgs, caller, correlation_id) -> JobResult:
-        payload = args.__root__
+    async def run(self, *, args: BaseModel, caller, correlation_id) -> JobResult:
+        # DictArgs wraps the raw payload; routers pass the model generated from the job schema
+        payload = args.root if isinstance(args, RootModel) else args.model_dump(exclude_unset=True)
         if not self.entitlements.allow(caller, self.name, payload):
             raise HTTPException(status.HTTP_403_FORBIDDEN, "AUTHZ_DENIED")
-        try:
-            json_validate(instance=payload, schema=self.instance_args_schema())
-        except ValidationError as e:
-            raise HTTPException(status.HTTP_400_BAD_REQUEST, f"SCHEMA_MISMATCH: {e.message}")
+        errors = compiled_schema(self.name, self.schema_version, self.instance_args_schema()).errors(payload)
+        if errors:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, {"error": "SCHEMA_MISMATCH", "errors": errors})
 
+        # a caller-supplied correlation id (bulk idempotency key) doubles as the ATAAS idempotency key
+        client_token = correlation_id if correlation_id and correlation_id != "auto" else payload.get("client_token")
         async with self.connector() as client:
-            ataas_job_id = await client.trigger(self.name, payload, client_token=payload.get("client_token"))
+            ataas_job_id = await client.trigger(self.name, payload, client_token=client_token)
         return JobResult(run_id=str(ataas_job_id), message="Enqueued", outputs={"ataasJobId": ataas_job_id})
\ No newline at end of file
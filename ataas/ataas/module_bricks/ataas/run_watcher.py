@@ -0,0 +1,223 @@
+from __future__ import annotations
+import asyncio, logging, os, time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set
+from ...connectors.ataas_connector import make_ataas_connector, ATAASAPIError
+from ...models.ataas import RunStatus
+
+log = logging.getLogger("ataas.run_watcher")
+
+TERMINAL_STATES = frozenset({"SUCCEEDED", "FAILED", "CANCELLED"})
+
+def as_run_status(run_id: str, raw: Any) -> RunStatus:
+    """Connector statuses as RunStatus: this package's connector returns one, ataas/connect.py a plain dict."""
+    if isinstance(raw, RunStatus): return raw
+    return RunStatus.model_validate({"run_id": run_id, **raw})
+
+class Subscription:
+    """
+    Status updates (dicts) for a set of runs. Iteration ends once every subscribed run
+    has reached a terminal state; a slow consumer loses the oldest queued updates.
+    """
+    def __init__(self, watcher: "RunWatcher", maxsize: int = 256):
+        self._watcher = watcher
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.pending: Set[str] = set()
+
+    def add(self, run_id: str):
+        if run_id not in self.pending:
+            self.pending.add(run_id)
+            self._watcher._attach(run_id, self)
+
+    def remove(self, run_id: str):
+        self.pending.discard(run_id)
+        self._watcher._detach(run_id, self)
+
+    def close(self):
+        for run_id in list(self.pending): self.remove(run_id)
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and self.queue.empty()
+
+    def push(self, update: Dict[str, Any]):
+        if update.get("state") in TERMINAL_STATES or "error" in update:
+            self.pending.discard(update["run_id"])
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(update)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next update, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __aiter__(self): return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self.done: raise StopAsyncIteration
+        return await self.queue.get()
+
+class _Watch:
+    __slots__ = ("run_id", "status", "fetched_at", "subscribers", "due", "interval")
+
+    def __init__(self, run_id: str, interval: float):
+        self.run_id = run_id
+        self.status: Optional[RunStatus] = None
+        self.fetched_at = 0.0
+        self.subscribers: Set[Subscription] = set()
+        self.due = time.monotonic()
+        self.interval = interval
+
+class RunWatcher:
+    """
+    One poller for every watched run: each active run is fetched from ATAAS once per interval
+    no matter how many clients follow it. Intervals adapt (fast while RUNNING, slower while
+    QUEUED, backing off while nothing changes or on errors) and polling stops at a terminal
+    state. Terminal statuses are kept in an LRU, so reads of finished runs never reach ATAAS;
+    concurrent reads of the same run share one upstream call.
+    """
+    def __init__(self, *, fast_interval: Optional[float] = None, slow_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, concurrency: Optional[int] = None, cache_size: Optional[int] = None):
+        self.fast_interval = fast_interval or float(os.getenv("ATAAS_WATCH_FAST_SEC", "1"))
+        self.slow_interval = slow_interval or float(os.getenv("ATAAS_WATCH_SLOW_SEC", "5"))
+        self.max_interval = max_interval or float(os.getenv("ATAAS_WATCH_MAX_SEC", "30"))
+        self.concurrency = concurrency or int(os.getenv("ATAAS_WATCH_CONCURRENCY", "20"))
+        self.cache_size = cache_size or int(os.getenv("ATAAS_RUN_CACHE_SIZE", "10000"))
+        self._active: Dict[str, _Watch] = {}
+        self._terminal: "OrderedDict[str, RunStatus]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.polls = self.cache_hits = self.coalesced = 0
+
+    # ---- Public API ----
+    async def status(self, run_id: str) -> RunStatus:
+        cached = self._terminal.get(run_id)
+        if cached is not None:
+            self._terminal.move_to_end(run_id)
+            self.cache_hits += 1
+            return cached
+        w = self._active.get(run_id)
+        if w is not None and w.status is not None and time.monotonic() - w.fetched_at < w.interval:
+            self.cache_hits += 1  # the poller's copy is at most one interval old
+            return w.status
+        return await asyncio.shield(self._fetch(run_id))
+
+    def subscribe(self, run_ids: Iterable[str] = ()) -> Subscription:
+        sub = Subscription(self)
+        for run_id in run_ids: sub.add(run_id)
+        return sub
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": len(self._active), "subscribers": sum(len(w.subscribers) for w in self._active.values()),
+                "terminal_cached": len(self._terminal), "polls": self.polls, "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced}
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._active.clear()
+
+    # ---- Internals ----
+    def _attach(self, run_id: str, sub: Subscription):
+        cached = self._terminal.get(run_id)
+        if cached is not None:
+            sub.push(cached.model_dump(mode="json"))
+            return
+        w = self._active.get(run_id)
+        if w is None:
+            w = self._active[run_id] = _Watch(run_id, self.fast_interval)
+        elif w.status is not None:
+            sub.push(w.status.model_dump(mode="json"))
+        w.subscribers.add(sub)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wake.set()
+
+    def _detach(self, run_id: str, sub: Subscription):
+        w = self._active.get(run_id)
+        if w is None: return
+        w.subscribers.discard(sub)
+        if not w.subscribers:
+            del self._active[run_id]  # nobody is watching: stop polling it
+
+    def _fetch(self, run_id: str) -> asyncio.Future:
+        fut = self._inflight.get(run_id)
+        if fut is not None:
+            self.coalesced += 1
+            return fut
+        fut = asyncio.ensure_future(self._fetch_status(run_id))
+        self._inflight[run_id] = fut
+        fut.add_done_callback(lambda f: self._inflight.pop(run_id, None))
+        return fut
+
+    async def _fetch_status(self, run_id: str) -> RunStatus:
+        async with make_ataas_connector() as c:
+            st = as_run_status(run_id, await c.status(run_id))
+        self.polls += 1
+        self._record(run_id, st)
+        return st
+
+    def _record(self, run_id: str, st: RunStatus):
+        terminal = st.state in TERMINAL_STATES
+        if terminal:
+            self._terminal[run_id] = st
+            self._terminal.move_to_end(run_id)
+            while len(self._terminal) > self.cache_size:
+                self._terminal.popitem(last=False)
+        w = self._active.get(run_id)
+        if w is None: return
+        changed = w.status is None or w.status != st
+        now = time.monotonic()
+        w.status, w.fetched_at = st, now
+        if changed:
+            w.interval = self.fast_interval if st.state == "RUNNING" else self.slow_interval
+            for sub in list(w.subscribers): sub.push(st.model_dump(mode="json"))
+        else:
+            w.interval = min(w.interval * 1.5, self.max_interval)
+        w.due = now + w.interval
+        if terminal:
+            del self._active[run_id]
+
+    async def _poll(self, w: _Watch, sem: asyncio.Semaphore):
+        async with sem:
+            try:
+                await asyncio.shield(self._fetch(w.run_id))
+            except ATAASAPIError as e:
+                if e.status == 404:
+                    self._active.pop(w.run_id, None)
+                    for sub in list(w.subscribers): sub.push({"run_id": w.run_id, "error": "RUN_NOT_FOUND", "status": 404})
+                    return
+                self._backoff(w, e)
+            except Exception as e:
+                self._backoff(w, e)
+
+    def _backoff(self, w: _Watch, e: Exception):
+        log.warning("ATAAS status poll failed for %s: %s", w.run_id, e)
+        w.interval = min(w.interval * 2, self.max_interval)
+        w.due = time.monotonic() + w.interval
+
+    async def _run(self):
+        sem = asyncio.Semaphore(self.concurrency)
+        while self._active:
+            now = time.monotonic()
+            due = [w for w in self._active.values() if w.due <= now]
+            if due:
+                await asyncio.gather(*(self._poll(w, sem) for w in due))
+            if not self._active: break
+            self._wake.clear()
+            delay = min(w.due for w in self._active.values()) - time.monotonic()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+run_watcher = RunWatcher()
@@ -0,0 +1,235 @@
+# srehubapp/connectors/circuit.py
+from __future__ import annotations
+
+import hashlib, json, logging, os, time
+from typing import Any, Dict, List, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+log = logging.getLogger("srehub.ataas")
+
+
+class _SharedState:
+    """
+    Breaker state in a small file per upstream so every worker on the host sees the
+    same open/closed decision; the half-open probe is claimed with an O_EXCL token file.
+    """
+
+    def __init__(self, directory: str, key: str):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:16])
+        self.path, self.probe_path = f"{base}.json", f"{base}.probe"
+        self._mtime = 0.0
+        self._checked = 0.0
+
+    def read(self, every: float = 0.5) -> Optional[Dict[str, Any]]:
+        """The stored state if the file changed since the last read (checked at most every `every` s)."""
+        now = time.time()
+        if now - self._checked < every: return None
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime: return None
+            with open(self.path) as f:
+                state = json.load(f)
+            self._mtime = mtime
+            return state
+        except (OSError, ValueError):
+            return None
+
+    def write(self, state: str, changed_at: float):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"state": state, "changed_at": changed_at}, f)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime
+
+    def claim_probe(self, ttl: float) -> bool:
+        try:
+            if time.time() - os.stat(self.probe_path).st_mtime > ttl:
+                os.unlink(self.probe_path)  # the prober died or hung
+        except OSError:
+            pass
+        try:
+            os.close(os.open(self.probe_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+        except OSError as e:  # cannot coordinate with the other workers; probe from this one
+            log.warning("Circuit probe token %s unavailable: %s", self.probe_path, e)
+            return True
+
+    def release_probe(self):
+        try:
+            os.unlink(self.probe_path)
+        except OSError:
+            pass
+
+
+class CircuitBreaker:
+    """
+    Sliding-window breaker for one upstream. Opens when, within the last `window_sec`, at least
+    `min_failures` calls failed and the failure ratio reached `error_rate`. After `reset_after`
+    seconds it turns half-open and admits exactly one probe: success closes it, failure re-opens it.
+    allow() hands out a ticket; only the probe's ticket decides the half-open outcome, so late
+    results from calls admitted while closed cannot flip it.
+    """
+
+    def __init__(self, key: str, *, window_sec: float = 30.0, buckets: int = 10, min_failures: int = 8,
+                 error_rate: float = 0.5, reset_after: float = 30.0, shared_dir: Optional[str] = None):
+        self.key = key
+        self.min_failures, self.error_rate, self.reset_after = min_failures, error_rate, reset_after
+        self._bucket_sec = window_sec / buckets
+        self._buckets: List[List[int]] = [[0, 0] for _ in range(buckets)]  # [successes, failures]
+        self._epochs: List[int] = [0] * buckets
+        self.state = CLOSED
+        self.changed_at = 0.0  # never changed here: any shared state is newer
+        self._probe_at: Optional[float] = None
+        self._probe: Optional[int] = None  # ticket of the outstanding half-open probe
+        self._tickets = 0
+        self._shared = _SharedState(shared_dir, key) if shared_dir else None
+        self.opened = self.rejected = self.probes = 0
+
+    # ---- window ----
+    def _bucket(self, now: float) -> List[int]:
+        epoch = int(now / self._bucket_sec)
+        i = epoch % len(self._buckets)
+        if self._epochs[i] != epoch:
+            self._epochs[i], self._buckets[i] = epoch, [0, 0]
+        return self._buckets[i]
+
+    def window(self) -> Dict[str, int]:
+        oldest = int(time.time() / self._bucket_sec) - len(self._buckets)
+        ok = fail = 0
+        for epoch, (s, f) in zip(self._epochs, self._buckets):
+            if epoch > oldest:
+                ok, fail = ok + s, fail + f
+        return {"successes": ok, "failures": fail}
+
+    # ---- state ----
+    def _transition(self, state: str, now: float):
+        self.state, self.changed_at = state, now
+        if state == OPEN:
+            self.opened += 1
+        if state == CLOSED:
+            self._buckets = [[0, 0] for _ in self._buckets]
+        if self._shared is not None and state != HALF_OPEN:
+            try:
+                self._shared.write(state, now)
+            except OSError as e:  # other workers find out on their own; never fail the caller
+                log.warning("Circuit state for %s not shared: %s", self.key, e)
+            self._shared.release_probe()
+
+    def _sync(self):
+        if self._shared is None: return
+        shared = self._shared.read()
+        if shared and shared["changed_at"] > self.changed_at and shared["state"] != self.state:
+            self.state, self.changed_at, self._probe_at, self._probe = shared["state"], shared["changed_at"], None, None
+
+    def allow(self) -> Optional[int]:
+        """A ticket for record()/abandon() (0 for an ordinary call), or None when the call is rejected."""
+        self._sync()
+        if self.state == CLOSED:
+            return 0
+        now = time.time()
+        if self.state == OPEN and now - self.changed_at >= self.reset_after:
+            self.state = HALF_OPEN  # local only; other workers learn the outcome of the probe
+        if self.state == HALF_OPEN:
+            if self._probe_at is not None and now - self._probe_at < self.reset_after:
+                self.rejected += 1
+                return None  # one probe at a time
+            if self._shared is None or self._shared.claim_probe(self.reset_after):
+                self._tickets += 1
+                self._probe, self._probe_at = self._tickets, now  # a hung probe is replaced after reset_after
+                self.probes += 1
+                return self._probe
+        self.rejected += 1
+        return None
+
+    def is_probe(self, ticket: Optional[int]) -> bool:
+        return bool(ticket) and ticket == self._probe
+
+    def record(self, success: bool, ticket: Optional[int] = 0):
+        now = time.time()
+        b = self._bucket(now)
+        b[0 if success else 1] += 1
+        if self.state == HALF_OPEN:
+            if self.is_probe(ticket):
+                self._probe = self._probe_at = None
+                self._transition(CLOSED if success else OPEN, now)
+        elif self.state == CLOSED and not success:
+            w = self.window()
+            total = w["successes"] + w["failures"]
+            if w["failures"] >= self.min_failures and w["failures"] / total >= self.error_rate:
+                self._transition(OPEN, now)
+
+    def abandon(self, ticket: Optional[int] = 0):
+        """The admitted call never produced an outcome (shed or cancelled); if it was the probe, let another through."""
+        if self.is_probe(ticket):
+            self._probe = self._probe_at = None
+            if self._shared is not None: self._shared.release_probe()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, **self.window(), "opened": self.opened, "rejected": self.rejected,
+                "probes": self.probes}
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit: grows by ~1 per `limit` successful calls, shrinks by `backoff`x on a
+    failure or a call slower than `latency_target`. Calls over the limit are shed immediately
+    rather than queued behind a struggling upstream.
+    """
+
+    def __init__(self, initial: int = 20, min_limit: int = 1, max_limit: int = 200, backoff: float = 0.7,
+                 latency_target: Optional[float] = None):
+        self.limit = float(initial)
+        self.min_limit, self.max_limit, self.backoff = min_limit, max_limit, backoff
+        self.latency_target = latency_target
+        self.inflight = 0
+        self.shed = 0
+
+    def try_acquire(self) -> bool:
+        if self.inflight >= int(self.limit):
+            self.shed += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, success: bool, latency: float):
+        self.inflight -= 1
+        if not success or (self.latency_target is not None and latency > self.latency_target):
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": int(self.limit), "inflight": self.inflight, "shed": self.shed}
+
+
+class UpstreamGuard:
+    __slots__ = ("breaker", "limiter")
+
+    def __init__(self, breaker: CircuitBreaker, limiter: AIMDLimiter):
+        self.breaker, self.limiter = breaker, limiter
+
+
+# upstream (base URL) -> guard, shared by every connector instance in the process
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def guard_for(key: str, config: Any) -> UpstreamGuard:
+    guard = _guards.get(key)
+    if guard is None:
+        guard = _guards[key] = UpstreamGuard(
+            CircuitBreaker(key, window_sec=config.cb_window_sec, min_failures=config.cb_error_threshold,
+                           error_rate=config.cb_error_rate, reset_after=config.cb_reset_after_sec,
+                           shared_dir=config.cb_shared_dir),
+            AIMDLimiter(initial=config.aimd_initial_limit, max_limit=config.aimd_max_limit,
+                        latency_target=config.aimd_latency_target_sec),
+        )
+    return guard
+
+
+def circuit_stats() -> Dict[str, Dict[str, Any]]:
+    return {key: {"breaker": g.breaker.stats(), "limiter": g.limiter.stats()} for key, g in _guards.items()}
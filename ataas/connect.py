@@ -12,6 +12,8 @@ from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 
+from .circuit import guard_for, circuit_stats
+
 # -----------------------------
 # Exceptions
 # -----------------------------
@@ -25,6 +27,9 @@ class ATAASAPIError(RuntimeError):
 class ATAASCircuitOpen(RuntimeError):
     pass
 
+class ATAASOverloaded(ATAASCircuitOpen):
+    """Shed by the adaptive concurrency limiter before the request reached ATAAS."""
+
 
 # -----------------------------
 # Config (env-driven, stateless)
@@ -44,12 +49,28 @@ class ATAASConfig:
     jitter: bool = True
 
     # Circuit breaker
-    cb_error_threshold: int = 8              # open after N consecutive failures
-    cb_reset_after_sec: float = 30.0         # half-open after this cool-off
+    cb_error_threshold: int = 8              # min failures in the window before it can open
+    cb_reset_after_sec: float = 30.0         # half-open (single probe) after this cool-off
+    cb_window_sec: float = 30.0              # sliding window for the error rate
+    cb_error_rate: float = 0.5               # open when failures/calls in the window reach this
+    cb_shared_dir: Optional[str] = None      # share breaker state across workers on this host
+
+    # Adaptive (AIMD) concurrency limit per upstream
+    aimd_initial_limit: int = 20
+    aimd_max_limit: int = 200
+    aimd_latency_target_sec: Optional[float] = None   # slower calls count as overload
 
     # Optional project default
     default_project: Optional[str] = None
 
+    # Connection pool (used by the app-scoped ATAASClientPool and per-call clients)
+    max_connections: int = 100
+    max_keepalive: int = 20
+    keepalive_expiry_sec: float = 30.0
+    http2: bool = False
+    catalog_page_size: int = 200
+    bulk_concurrency: int = 10
+
     @staticmethod
     def from_env() -> "ATAASConfig":
         return ATAASConfig(
@@ -64,44 +85,53 @@ class ATAASConfig:
             jitter=os.getenv("ATAAS_JITTER", "true").lower() != "false",
             cb_error_threshold=int(os.getenv("ATAAS_CB_ERROR_THRESHOLD", "8")),
             cb_reset_after_sec=float(os.getenv("ATAAS_CB_RESET_AFTER_SEC", "30")),
+            cb_window_sec=float(os.getenv("ATAAS_CB_WINDOW_SEC", "30")),
+            cb_error_rate=float(os.getenv("ATAAS_CB_ERROR_RATE", "0.5")),
+            cb_shared_dir=os.getenv("ATAAS_CB_SHARED_DIR") or None,
+            aimd_initial_limit=int(os.getenv("ATAAS_AIMD_INITIAL_LIMIT", "20")),
+            aimd_max_limit=int(os.getenv("ATAAS_AIMD_MAX_LIMIT", "200")),
+            aimd_latency_target_sec=(
+                float(os.environ["ATAAS_AIMD_LATENCY_TARGET_SEC"]) if os.getenv("ATAAS_AIMD_LATENCY_TARGET_SEC") else None
+            ),
             default_project=os.getenv("SREHUB_ATAAS_PROJECT"),
+            max_connections=int(os.getenv("ATAAS_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("ATAAS_MAX_KEEPALIVE", "20")),
+            keepalive_expiry_sec=float(os.getenv("ATAAS_KEEPALIVE_EXPIRY_SEC", "30")),
+            http2=os.getenv("ATAAS_HTTP2", "false").lower() == "true",
+            catalog_page_size=int(os.getenv("ATAAS_CATALOG_PAGE_SIZE", "200")),
+            bulk_concurrency=int(os.getenv("ATAAS_BULK_CONCURRENCY", "10")),
         )
 
 
-# -----------------------------
-# Low-boil circuit breaker
-# -----------------------------
-class _Circuit:
-    def __init__(self, threshold: int, reset_after: float) -> None:
-        self.threshold = threshold
-        self.reset_after = reset_after
-        self.failures = 0
-        self.opened_at: Optional[float] = None
-
-    def on_success(self) -> None:
-        self.failures = 0
-        self.opened_at = None
-
-    def on_failure(self) -> None:
-        self.failures += 1
-        if self.failures >= self.threshold and self.opened_at is None:
-            self.opened_at = time.time()
-
-    def allow(self) -> bool:
-        if self.opened_at is None:
-            return True
-        # half-open after cool-off
-        return (time.time() - self.opened_at) >= self.reset_after
-
-    def maybe_close_after_probe(self, success: bool) -> None:
-        if self.opened_at is None:
-            return
-        if success:
-            # Close circuit after a successful probe
-            self.on_success()
-        else:
-            # Reopen immediately
-            self.opened_at = time.time()
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2] extra)
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client(config: ATAASConfig, *, event_hooks: Optional[dict] = None) -> httpx.AsyncClient:
+    headers = {}
+    if config.token:
+        headers["Authorization"] = f"Bearer {config.token}"
+    if config.api_key:
+        headers["x-api-key"] = config.api_key
+    return httpx.AsyncClient(
+        base_url=config.base_url,
+        headers=headers,
+        timeout=httpx.Timeout(
+            config.timeout_sec,
+            connect=config.connect_timeout_sec,
+        ),
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive,
+            keepalive_expiry=config.keepalive_expiry_sec,
+        ),
+        http2=config.http2 and _http2_available(),
+        event_hooks=event_hooks,
+    )
 
 
 # -----------------------------
@@ -109,43 +139,33 @@ class _Circuit:
 # -----------------------------
 class ATAASConnector:
     """
-    Lightweight async client with retries, timeouts, and a simple circuit breaker.
+    Lightweight async client with retries, timeouts, a circuit breaker and an adaptive concurrency limit.
 
     Usage:
         async with ATAASConnector() as ataas:
             jobs = await ataas.list_jobs(project="platform-prod")
             run_id = await ataas.trigger("db-backup", payload={...}, client_token="idem-123")
             status = await ataas.status(run_id)
+
+    Pass `client` to borrow a shared (pooled) httpx client; the connector will not close it.
     """
 
-    def __init__(self, config: Optional[ATAASConfig] = None) -> None:
+    def __init__(self, config: Optional[ATAASConfig] = None, client: Optional[httpx.AsyncClient] = None) -> None:
         self.config = config or ATAASConfig.from_env()
         if not self.config.base_url:
             raise ValueError("ATAAS_BASE_URL must be set")
+        self._shared_client = client
         self._client: Optional[httpx.AsyncClient] = None
-        self._circuit = _Circuit(
-            threshold=self.config.cb_error_threshold,
-            reset_after=self.config.cb_reset_after_sec,
-        )
+        # breaker + limiter are shared per upstream, so they outlive this (per-request) connector
+        self._guard = guard_for(self.config.base_url, self.config)
 
     async def __aenter__(self) -> "ATAASConnector":
-        headers = {}
-        if self.config.token:
-            headers["Authorization"] = f"Bearer {self.config.token}"
-        if self.config.api_key:
-            headers["x-api-key"] = self.config.api_key
-        self._client = httpx.AsyncClient(
-            base_url=self.config.base_url,
-            headers=headers,
-            timeout=httpx.Timeout(
-                self.config.timeout_sec,
-                connect=self.config.connect_timeout_sec,
-            ),
-        )
+        self._client = self._shared_client or _build_client(self.config)
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
-        if self._client:
+        # shared clients belong to the pool; only close what we opened
+        if self._client and self._client is not self._shared_client:
             await self._client.aclose()
         self._client = None
 
@@ -165,6 +185,31 @@ class ATAASConnector:
             raise ATAASAPIError(500, "Unexpected response for list_jobs", payload={"body": resp})
         return resp
 
+    async def iter_jobs(self, project: Optional[str] = None, *, page_size: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields the project's catalog page by page.
+        Paged responses look like {"items": [...], "next_page_token": "..."}; a plain list is a single page.
+        """
+        project = project or self.config.default_project
+        if not project:
+            raise ValueError("project must be provided (env SREHUB_ATAAS_PROJECT or param)")
+
+        path = f"/api/v1/projects/{project}/jobs"
+        params: Dict[str, Any] = {"page_size": page_size or self.config.catalog_page_size}
+        while True:
+            resp = await self._request("GET", path, params=params)
+            if isinstance(resp, list):
+                yield resp
+                return
+            items = resp.get("items", resp.get("jobs")) if isinstance(resp, dict) else None
+            if not isinstance(items, list):
+                raise ATAASAPIError(500, "Unexpected response for list_jobs", payload={"body": resp})
+            yield items
+            token = resp.get("next_page_token") or resp.get("nextPageToken")
+            if not token:
+                return
+            params["page_token"] = token
+
     async def trigger(
         self,
         job: str,
@@ -184,6 +229,42 @@ class ATAASConnector:
             raise ATAASAPIError(500, "No run_id in trigger response", payload={"body": resp})
         return str(run_id)
 
+    async def trigger_many(
+        self,
+        job: str,
+        payloads: List[Dict[str, Any]],
+        *,
+        client_tokens: Optional[List[Optional[str]]] = None,   # per-item idempotency keys
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Triggers `job` once per payload over this connector's client with at most
+        `concurrency` (default config.bulk_concurrency) requests in flight.
+        Yields {"index", "run_id"} or {"index", "error", "status"} per item as each completes.
+        """
+        sem = asyncio.Semaphore(concurrency or self.config.bulk_concurrency)
+        tokens = client_tokens or [None] * len(payloads)
+
+        async def one(i: int) -> Dict[str, Any]:
+            async with sem:
+                try:
+                    return {"index": i, "run_id": await self.trigger(job, payloads[i], client_token=tokens[i])}
+                except ATAASAPIError as e:
+                    return {"index": i, "error": e.message, "status": e.status}
+                except ATAASCircuitOpen as e:
+                    return {"index": i, "error": str(e), "status": 503}
+                except Exception as e:
+                    return {"index": i, "error": str(e) or type(e).__name__, "status": 502}
+
+        tasks = [asyncio.ensure_future(one(i)) for i in range(len(payloads))]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            # consumer went away: don't leave triggers running
+            for t in tasks:
+                t.cancel()
+
     async def status(self, run_id: str) -> Dict[str, Any]:
         """
         Returns the status dict for a previously triggered run.
@@ -203,6 +284,7 @@ class ATAASConnector:
         *,
         json: Optional[dict] = None,
         headers: Optional[dict] = None,
+        params: Optional[dict] = None,
     ) -> Any:
         """
         Single entry for HTTP calls with retry + backoff + circuit breaker.
@@ -210,8 +292,11 @@ class ATAASConnector:
         if self._client is None:
             raise RuntimeError("Connector not started. Use 'async with ATAASConnector() as c:'")
 
-        # Circuit check
-        if not self._circuit.allow():
+        # Circuit check: the ticket tells the breaker whether this call is its half-open probe
+        breaker = self._guard.breaker
+        limiter = self._guard.limiter
+        ticket = breaker.allow()
+        if ticket is None:
             raise ATAASCircuitOpen("Circuit open for ATAAS; backing off")
 
         attempt = 0
@@ -222,12 +307,25 @@ class ATAASConnector:
             merged_headers.update(headers)
 
         while attempt <= self.config.retries:
-            probe_mode = (attempt > 0 and not self._circuit.allow())
+            if attempt > 0:
+                # back off before the retry, without holding a concurrency permit
+                await self._sleep_backoff(attempt - 1)
+                # stop retrying once the breaker has opened (possibly because of other callers)
+                if breaker.state != "closed":
+                    raise ATAASCircuitOpen("Circuit opened for ATAAS while retrying")
+            # shed instead of queueing behind a struggling upstream
+            if not limiter.try_acquire():
+                breaker.abandon(ticket)
+                raise ATAASOverloaded("ATAAS concurrency limit reached; shedding request")
+
+            ok = False
+            recorded = False
+            started = time.monotonic()
             try:
-                resp = await self._client.request(method, path, json=json, headers=merged_headers)
+                resp = await self._client.request(method, path, json=json, headers=merged_headers, params=params)
                 if 200 <= resp.status_code < 300:
-                    self._circuit.maybe_close_after_probe(True)
-                    self._circuit.on_success()
+                    ok = recorded = True
+                    breaker.record(True, ticket)
                     if resp.headers.get("content-type", "").startswith("application/json"):
                         return resp.json()
                     # fall back to text
@@ -237,30 +335,41 @@ class ATAASConnector:
                 body = _safe_json(resp)
                 # Consider 5xx and some 429 as retryable
                 if resp.status_code >= 500 or resp.status_code in (408, 429):
-                    self._circuit.on_failure()
-                    await self._sleep_backoff(attempt)
+                    recorded = True
+                    breaker.record(False, ticket)
                     attempt += 1
                     continue
 
-                # 4xx non-retryable
-                self._circuit.maybe_close_after_probe(False)
+                # 4xx non-retryable: the upstream answered, so it counts as healthy
+                ok = recorded = True
+                breaker.record(True, ticket)
                 raise ATAASAPIError(resp.status_code, body.get("error") or resp.text, payload=body)
 
+            except ATAASAPIError:
+                raise
+
             except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as e:
                 last_exc = e
-                self._circuit.on_failure()
-                await self._sleep_backoff(attempt)
+                recorded = True
+                breaker.record(False, ticket)
                 attempt += 1
                 continue
 
             except Exception as e:
                 last_exc = e
                 # unexpected; don't assume retryable unless network-ish
-                self._circuit.on_failure()
-                await self._sleep_backoff(attempt)
+                recorded = True
+                breaker.record(False, ticket)
                 attempt += 1
                 continue
 
+            finally:
+                # the permit covers the upstream call only; its latency feeds the limit
+                limiter.release(ok, time.monotonic() - started)
+                if not recorded:
+                    # cancelled mid-flight: let another probe through
+                    breaker.abandon(ticket)
+
         # Retries exhausted
         if last_exc:
             raise last_exc
@@ -281,6 +390,88 @@ def _safe_json(resp: httpx.Response) -> Dict[str, Any]:
         return {"text": resp.text}
 
 
+# --------------------------------
+# App-scoped connection pool
+# --------------------------------
+class ATAASClientPool:
+    """
+    One long-lived httpx client shared by every ATAASConnector so TCP/TLS
+    connections are reused across requests instead of re-handshaking.
+
+    Wire into FastAPI:
+        app.add_event_handler("startup", start_ataas_pool)
+        app.add_event_handler("shutdown", close_ataas_pool)
+    """
+
+    def __init__(self, config: Optional[ATAASConfig] = None) -> None:
+        self.config = config or ATAASConfig.from_env()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.leases = 0
+        self.requests = 0
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    async def start(self) -> "ATAASClientPool":
+        if self._client is None:
+            self._client = _build_client(self.config, event_hooks={"request": [self._on_request]})
+        return self
+
+    async def aclose(self) -> None:
+        if self._client:
+            await self._client.aclose()
+        self._client = None
+
+    def lease(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("ATAAS client pool not started")
+        self.leases += 1
+        return self._client
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool metrics: configured limits plus live/idle connection counts.
+        """
+        transport = getattr(self._client, "_transport", None)
+        conns = list(getattr(getattr(transport, "_pool", None), "connections", None) or [])
+        return {
+            "started": self.started,
+            "http2": bool(self._client and self.config.http2 and _http2_available()),
+            "max_connections": self.config.max_connections,
+            "max_keepalive": self.config.max_keepalive,
+            "keepalive_expiry_sec": self.config.keepalive_expiry_sec,
+            "connections": len(conns),
+            "idle_connections": sum(1 for c in conns if c.is_idle()),
+            "leases": self.leases,
+            "requests": self.requests,
+        }
+
+
+_pool: Optional[ATAASClientPool] = None
+
+
+async def start_ataas_pool(config: Optional[ATAASConfig] = None) -> ATAASClientPool:
+    global _pool
+    if _pool is None:
+        _pool = await ATAASClientPool(config).start()
+    return _pool
+
+
+async def close_ataas_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+    _pool = None
+
+
+def ataas_pool_stats() -> Dict[str, Any]:
+    return _pool.stats() if _pool is not None else {"started": False}
+
+
 # --------------------------------
 # Factory: keep your existing pattern
 # --------------------------------
@@ -289,8 +480,13 @@ async def make_ataas_connector(config: Optional[ATAASConfig] = None) -> AsyncIte
     """
     `async with make_ataas_connector() as client: ...`
     aligns with the pattern you've already been using in module bricks.
+    Hands out the app pool's client when started (no reconnect per call).
     """
-    conn = ATAASConnector(config=config)
+    config = config or ATAASConfig.from_env()
+    shared = None
+    if _pool is not None and _pool.started and _pool.config == config:
+        shared = _pool.lease()
+    conn = ATAASConnector(config=config, client=shared)
     try:
         async with conn as started:
             yield started
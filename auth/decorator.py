@@ -1,10 +1,41 @@
+from collections import OrderedDict
 from functools import wraps
 from typing import Callable, Iterable, Optional, Dict, Any
-import time, asyncio, jwt
-from jwt import PyJWKClient
+import os, time, asyncio, hashlib, jwt, httpx
 from fastapi import Request, HTTPException
 from .ping_oidc import PingOIDC
 
+
+class _ClaimsCache:
+    """
+    Bounded LRU of verified ID-token claims keyed on a token hash.
+    Entries never outlive the token's `exp`.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._d: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._d.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self._d.pop(key, None)
+            return None
+        self._d.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, claims: Dict[str, Any], expires_at: float) -> None:
+        self._d[key] = (claims, expires_at)
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+
+
+# Shared by all RequireAuth instances: the same session token is verified once, not once per route
+_claims_cache = _ClaimsCache(int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "4096")))
+
+
 class RequireAuth:
     """
     Class-based decorator for FastAPI routes.
@@ -22,6 +53,8 @@ class RequireAuth:
         require_roles_claim: Optional[str] = None,   # e.g., "roles" or "realm_access.roles"
         require_roles: Optional[Iterable[str]] = None,
         clock_skew: int = 60,
+        claims_ttl_secs: int = 300,
+        jwks_refresh_secs: int = 300,
     ):
         self.oidc = oidc
         self.require_scopes = set(require_scopes or [])
@@ -29,15 +62,66 @@ class RequireAuth:
         self.roles_claim = require_roles_claim
         self.require_roles = set(require_roles or [])
         self.clock_skew = clock_skew
-        self._jwks_client = None
+        self.claims_ttl_secs = claims_ttl_secs
+        self.jwks_refresh_secs = jwks_refresh_secs
+        self._jwks_keys: Dict[Optional[str], Any] = {}
+        self._jwks_fetched_at = 0.0
+        self._jwks_inflight: Optional[asyncio.Future] = None
         self._jwks_issuer = None
 
-    async def _jwks(self):
-        cfg = await self.oidc.discover()
-        if not self._jwks_client or self._jwks_issuer != cfg["issuer"]:
-            self._jwks_client = PyJWKClient(cfg["jwks_uri"])
-            self._jwks_issuer = cfg["issuer"]
-        return cfg, self._jwks_client
+    async def _fetch_jwks(self, jwks_uri: str) -> None:
+        async with httpx.AsyncClient(timeout=10) as c:
+            r = await c.get(jwks_uri)
+            r.raise_for_status()
+        self._jwks_keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict(r.json()).keys}
+        self._jwks_fetched_at = time.time()
+
+    def _start_jwks_fetch(self, jwks_uri: str) -> asyncio.Future:
+        # single-flight: concurrent kid misses share one fetch
+        if self._jwks_inflight is None or self._jwks_inflight.done():
+            self._jwks_inflight = asyncio.ensure_future(self._fetch_jwks(jwks_uri))
+            self._jwks_inflight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return self._jwks_inflight
+
+    async def _signing_key(self, cfg: Dict[str, Any], idt: str):
+        """
+        Resolve the signing key without blocking the event loop: keys are fetched
+        with httpx, prefetched in the background once stale, and refetched on kid miss.
+        """
+        if self._jwks_issuer != cfg["issuer"]:
+            self._jwks_keys, self._jwks_fetched_at, self._jwks_issuer = {}, 0.0, cfg["issuer"]
+        kid = jwt.get_unverified_header(idt).get("kid")
+        if not self._jwks_keys:
+            await asyncio.shield(self._start_jwks_fetch(cfg["jwks_uri"]))
+        elif time.time() - self._jwks_fetched_at > self.jwks_refresh_secs:
+            self._start_jwks_fetch(cfg["jwks_uri"])  # keep serving current keys meanwhile
+
+        key = self._jwks_keys.get(kid) if kid else next(iter(self._jwks_keys.values()), None)
+        if key is None and time.time() - self._jwks_fetched_at > 10:
+            # unknown kid: IdP probably rotated keys (rate-limited to one refetch per 10s)
+            await asyncio.shield(self._start_jwks_fetch(cfg["jwks_uri"]))
+            key = self._jwks_keys.get(kid) if kid else next(iter(self._jwks_keys.values()), None)
+        if key is None:
+            raise jwt.InvalidKeyError(f"No JWKS key for kid {kid!r}")
+        return key
+
+    async def _verify_id_token(self, cfg: Dict[str, Any], idt: str) -> Dict[str, Any]:
+        ck = hashlib.sha256(f"{cfg['issuer']}|{self.oidc.client_id}|{idt}".encode()).hexdigest()
+        claims = _claims_cache.get(ck)
+        if claims is None:
+            key = await self._signing_key(cfg, idt)
+            claims = jwt.decode(
+                idt, key.key,
+                algorithms=["RS256","RS384","RS512","ES256","ES384","ES512"],
+                audience=self.oidc.client_id,
+                issuer=cfg["issuer"],
+                leeway=self.clock_skew,
+            )
+            expires_at = time.time() + self.claims_ttl_secs
+            if claims.get("exp") is not None:
+                expires_at = min(expires_at, float(claims["exp"]))
+            _claims_cache.put(ck, claims, expires_at)
+        return dict(claims)  # callers may mutate request.state.user["claims"]
 
     async def _ensure_token(self, request: Request) -> Dict[str, Any]:
         tok = request.session.get("token")
@@ -88,17 +172,9 @@ class RequireAuth:
             if not idt:
                 raise HTTPException(401, "No ID token in session")
 
-            cfg, jwks_client = await self._jwks()
+            cfg = await self.oidc.discover()
             try:
-                key = jwks_client.get_signing_key_from_jwt(idt)
-                claims = jwt.decode(
-                    idt,
-                    key.key,
-                    algorithms=["RS256", "RS384", "RS512", "ES256", "ES384", "ES512"],
-                    audience=self.oidc.client_id,
-                    issuer=cfg["issuer"],
-                    leeway=self.clock_skew,
-                )
+                claims = await self._verify_id_token(cfg, idt)
             except Exception:
                 raise HTTPException(401, "Invalid ID token")
 
@@ -7,7 +7,7 @@ from fastapi.openapi.utils import get_openapi
 from starlette.middleware.sessions import SessionMiddleware
 
 from auth.sso import PingOIDC
-from auth.decorators import RequireAuth
+from auth.decorators import RequireAuth, close_authz_clients
 from auth import routes as auth_routes
 
 app = FastAPI(docs_url=None, redoc_url=None)
@@ -19,6 +19,8 @@ app.add_middleware(
     session_cookie=os.getenv("SESSION_COOKIE","srehubapp_sid"),
 )
 
+app.add_event_handler("shutdown", close_authz_clients)
+
 # mount auth routes
 app.include_router(auth_routes.router)
 
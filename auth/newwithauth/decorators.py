@@ -1,13 +1,194 @@
 # auth/decorators.py
+from collections import OrderedDict
 from functools import wraps
 from typing import Callable, Iterable, Optional, Dict, Any, Union
-import os, time, asyncio, jwt, httpx
-from jwt import PyJWKClient
+import os, time, asyncio, hashlib, jwt, httpx
 from fastapi import Request, HTTPException
 from fastapi.routing import APIRouter
 from .sso import PingOIDC
 
 
+class _ClaimsCache:
+    """
+    Bounded LRU of verified ID-token claims keyed on a token hash.
+    Entries never outlive the token's `exp`.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._d: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._d.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self._d.pop(key, None)
+            return None
+        self._d.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, claims: Dict[str, Any], expires_at: float) -> None:
+        self._d[key] = (claims, expires_at)
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+
+
+# Shared by all RequireAuth instances: the same session token is verified once, not once per route
+_claims_cache = _ClaimsCache(int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "4096")))
+
+
+class _DecisionCache:
+    """
+    O(1) LRU + TTL cache of authz decisions. Reads are lock-free (no awaits).
+    Entries are (allowed, fresh_until, stale_until); between the two they are
+    served stale while a background call revalidates them.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._d: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = self.stale_hits = self.misses = self.evictions = self.coalesced = 0
+
+    def get(self, key: str, now: float) -> tuple:
+        """Returns (allowed or None, is_stale)."""
+        entry = self._d.get(key)
+        if entry is not None:
+            allowed, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self._d.move_to_end(key)
+                self.hits += 1
+                return allowed, False
+            if now < stale_until:
+                self._d.move_to_end(key)
+                self.stale_hits += 1
+                return allowed, True
+            del self._d[key]
+        self.misses += 1
+        return None, False
+
+    def put(self, key: str, allowed: bool, ttl: float, stale_ttl: float, now: float) -> None:
+        self._d[key] = (allowed, now + ttl, now + ttl + stale_ttl)
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._d), "hits": self.hits, "stale_hits": self.stale_hits,
+                "misses": self.misses, "evictions": self.evictions, "coalesced": self.coalesced}
+
+
+class _AuthzClient:
+    """
+    Persistent pooled client for the external authz API.
+    With a batch URL and window, decisions queued within `batch_window_ms` go out
+    as one POST {"requests": [...]} -> {"results": [{"allowed": bool}, ...]} (same order),
+    one POST per distinct header set. Falls back to single calls for good if the bulk
+    endpoint is not supported.
+    """
+    def __init__(self, url: str, timeout_secs: float, batch_url: Optional[str] = None,
+                 batch_window_ms: float = 0.0, batch_max: int = 50):
+        self.url = url
+        self.timeout_secs = timeout_secs
+        self.batch_url = batch_url
+        self.batch_window_ms = batch_window_ms
+        self.batch_max = batch_max
+        self.batch_supported = bool(batch_url) and batch_window_ms > 0
+        self.calls = self.batch_calls = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: list = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._sending: set = set()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_secs,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        self._flush_now()
+        # let queued decisions finish on the client before closing it (else _http() would reopen one)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def decide(self, payload: Dict[str, Any], headers: Dict[str, str]) -> bool:
+        if not self.batch_supported:
+            return await self._single(payload, headers)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((payload, headers, fut))
+        if len(self._pending) >= self.batch_max:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window_ms / 1000, self._flush_now)
+        return await fut
+
+    def _flush_now(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        # headers carry the caller's credentials: only requests sharing them go out together
+        groups: Dict[tuple, list] = {}
+        for item in batch:
+            groups.setdefault(tuple(sorted(item[1].items())), []).append(item)
+        for items in groups.values():
+            task = asyncio.ensure_future(self._send_batch(items))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _single(self, payload: Dict[str, Any], headers: Dict[str, str]) -> bool:
+        self.calls += 1
+        r = await self._http().post(self.url, json=payload, headers=headers)
+        r.raise_for_status()
+        return bool(r.json().get("allowed"))
+
+    async def _send_batch(self, batch: list) -> None:
+        try:
+            self.batch_calls += 1
+            r = await self._http().post(self.batch_url, json={"requests": [p for p, _, _ in batch]}, headers=batch[0][1])
+            if r.status_code in (404, 405, 501):
+                self.batch_supported = False
+                results = await asyncio.gather(*(self._single(p, h) for p, h, _ in batch), return_exceptions=True)
+            else:
+                r.raise_for_status()
+                results = [bool(x.get("allowed")) for x in r.json()["results"]]
+                if len(results) != len(batch):
+                    raise ValueError("authz batch returned %d results for %d requests" % (len(results), len(batch)))
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, _, fut), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+
+# One client per authz endpoint/headers provider, so batches span every protected route
+_authz_clients: Dict[tuple, _AuthzClient] = {}
+
+
+def _authz_client_for(url: str, timeout_secs: float, headers_provider, batch_url: Optional[str],
+                      batch_window_ms: float, batch_max: int) -> _AuthzClient:
+    key = (url, batch_url, batch_window_ms, id(headers_provider))
+    if key not in _authz_clients:
+        _authz_clients[key] = _AuthzClient(url, timeout_secs, batch_url, batch_window_ms, batch_max)
+    return _authz_clients[key]
+
+
+async def close_authz_clients() -> None:
+    for c in list(_authz_clients.values()):
+        await c.aclose()
+    _authz_clients.clear()
+
+
 class RequireAuth:
     """
     OIDC authentication + optional external authorization.
@@ -23,15 +204,22 @@ class RequireAuth:
         require_roles_claim: Optional[str] = None,
         require_roles: Optional[Iterable[str]] = None,
         clock_skew: int = 60,
+        claims_ttl_secs: int = 300,
+        jwks_refresh_secs: int = 300,
 
         # External authorization API
         authz_api_url: Optional[str] = None,
         authz_action: Optional[str] = None,
         authz_timeout_secs: float = 3.0,
         authz_headers_provider: Optional[Callable[[], "dict|Awaitable[dict]"]] = None,
+        authz_batch_url: Optional[str] = None,
+        authz_batch_window_ms: float = 0.0,
+        authz_batch_max: int = 50,
 
         # Cache
         decision_ttl_secs: int = 30,
+        negative_ttl_secs: int = 5,
+        stale_ttl_secs: int = 30,
         decision_cache_size: int = 1024,
         deny_on_error: bool = True,
     ):
@@ -41,30 +229,86 @@ class RequireAuth:
         self.roles_claim = require_roles_claim
         self.require_roles = set(require_roles or [])
         self.clock_skew = clock_skew
+        self.claims_ttl_secs = claims_ttl_secs
+        self.jwks_refresh_secs = jwks_refresh_secs
 
         self.authz_api_url = authz_api_url or os.getenv("AUTHZ_API_URL")
         self.authz_action = authz_action
         self.authz_timeout_secs = authz_timeout_secs
         self.authz_headers_provider = authz_headers_provider
+        self.authz_batch_url = authz_batch_url or os.getenv("AUTHZ_BATCH_URL")
+        self.authz_batch_window_ms = authz_batch_window_ms or float(os.getenv("AUTHZ_BATCH_WINDOW_MS", "0"))
+        self.authz_batch_max = authz_batch_max
+        self._authz_client: Optional[_AuthzClient] = None
 
         self.decision_ttl_secs = decision_ttl_secs
+        self.negative_ttl_secs = negative_ttl_secs
+        self.stale_ttl_secs = stale_ttl_secs
         self.decision_cache_size = decision_cache_size
         self.deny_on_error = deny_on_error
 
-        self._decisions: Dict[str, tuple] = {}
-        self._decisions_order: list[str] = []
-        self._decisions_lock = asyncio.Lock()
+        self._decisions = _DecisionCache(decision_cache_size)
+        self._decisions_inflight: Dict[str, asyncio.Future] = {}
 
-        self._jwks_client = None
+        self._jwks_keys: Dict[Optional[str], Any] = {}
+        self._jwks_fetched_at = 0.0
+        self._jwks_inflight: Optional[asyncio.Future] = None
         self._jwks_issuer = None
 
     # --------- Helpers ----------
-    async def _jwks(self):
-        cfg = await self.oidc.discover()
-        if not self._jwks_client or self._jwks_issuer != cfg["issuer"]:
-            self._jwks_client = PyJWKClient(cfg["jwks_uri"])
-            self._jwks_issuer = cfg["issuer"]
-        return cfg, self._jwks_client
+    async def _fetch_jwks(self, jwks_uri: str) -> None:
+        async with httpx.AsyncClient(timeout=10) as c:
+            r = await c.get(jwks_uri)
+            r.raise_for_status()
+        self._jwks_keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict(r.json()).keys}
+        self._jwks_fetched_at = time.time()
+
+    def _start_jwks_fetch(self, jwks_uri: str) -> asyncio.Future:
+        # single-flight: concurrent kid misses share one fetch
+        if self._jwks_inflight is None or self._jwks_inflight.done():
+            self._jwks_inflight = asyncio.ensure_future(self._fetch_jwks(jwks_uri))
+            self._jwks_inflight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return self._jwks_inflight
+
+    async def _signing_key(self, cfg: Dict[str, Any], idt: str):
+        """
+        Resolve the signing key without blocking the event loop: keys are fetched
+        with httpx, prefetched in the background once stale, and refetched on kid miss.
+        """
+        if self._jwks_issuer != cfg["issuer"]:
+            self._jwks_keys, self._jwks_fetched_at, self._jwks_issuer = {}, 0.0, cfg["issuer"]
+        kid = jwt.get_unverified_header(idt).get("kid")
+        if not self._jwks_keys:
+            await asyncio.shield(self._start_jwks_fetch(cfg["jwks_uri"]))
+        elif time.time() - self._jwks_fetched_at > self.jwks_refresh_secs:
+            self._start_jwks_fetch(cfg["jwks_uri"])  # keep serving current keys meanwhile
+
+        key = self._jwks_keys.get(kid) if kid else next(iter(self._jwks_keys.values()), None)
+        if key is None and time.time() - self._jwks_fetched_at > 10:
+            # unknown kid: IdP probably rotated keys (rate-limited to one refetch per 10s)
+            await asyncio.shield(self._start_jwks_fetch(cfg["jwks_uri"]))
+            key = self._jwks_keys.get(kid) if kid else next(iter(self._jwks_keys.values()), None)
+        if key is None:
+            raise jwt.InvalidKeyError(f"No JWKS key for kid {kid!r}")
+        return key
+
+    async def _verify_id_token(self, cfg: Dict[str, Any], idt: str) -> Dict[str, Any]:
+        ck = hashlib.sha256(f"{cfg['issuer']}|{self.oidc.client_id}|{idt}".encode()).hexdigest()
+        claims = _claims_cache.get(ck)
+        if claims is None:
+            key = await self._signing_key(cfg, idt)
+            claims = jwt.decode(
+                idt, key.key,
+                algorithms=["RS256","RS384","RS512","ES256","ES384","ES512"],
+                audience=self.oidc.client_id,
+                issuer=cfg["issuer"],
+                leeway=self.clock_skew,
+            )
+            expires_at = time.time() + self.claims_ttl_secs
+            if claims.get("exp") is not None:
+                expires_at = min(expires_at, float(claims["exp"]))
+            _claims_cache.put(ck, claims, expires_at)
+        return dict(claims)  # callers may mutate request.state.user["claims"]
 
     async def _ensure_token(self, request: Request) -> Dict[str, Any]:
         tok = request.session.get("token")
@@ -109,38 +353,59 @@ class RequireAuth:
             h = await h
         return h or {}
 
+    def _authz(self) -> _AuthzClient:
+        if self._authz_client is None:
+            self._authz_client = _authz_client_for(
+                self.authz_api_url, self.authz_timeout_secs, self.authz_headers_provider,
+                self.authz_batch_url, self.authz_batch_window_ms, self.authz_batch_max,
+            )
+        return self._authz_client
+
+    def decision_cache_stats(self) -> Dict[str, int]:
+        stats = self._decisions.stats()
+        if self._authz_client is not None:
+            stats.update(authz_calls=self._authz_client.calls, authz_batch_calls=self._authz_client.batch_calls)
+        return stats
+
     async def _check_authorization(self, subject: str, email: Optional[str], action: Optional[str]) -> bool:
         """Call external authorization API. Expects { "allowed": true/false }."""
         if not self.authz_api_url:
             return True
 
         key = self._cache_key(subject, action)
-        now = time.time()
-        async with self._decisions_lock:
-            entry = self._decisions.get(key)
-            if entry and entry[1] > now:
-                return entry[0]
+        allowed, stale = self._decisions.get(key, time.time())
+        if allowed is not None:
+            if stale:
+                self._decide(key, subject, email, action)  # revalidate in background
+            return allowed
+        return await asyncio.shield(self._decide(key, subject, email, action))
 
+    def _decide(self, key: str, subject: str, email: Optional[str], action: Optional[str]) -> asyncio.Future:
+        # concurrent misses for the same subject|action share one authz call
+        fut = self._decisions_inflight.get(key)
+        if fut is not None:
+            self._decisions.coalesced += 1
+            return fut
+        fut = asyncio.ensure_future(self._fetch_decision(key, subject, email, action))
+        self._decisions_inflight[key] = fut
+        fut.add_done_callback(lambda _: self._decisions_inflight.pop(key, None))
+        return fut
+
+    async def _fetch_decision(self, key: str, subject: str, email: Optional[str], action: Optional[str]) -> bool:
         payload = {"subject": subject, "email": email, "action": action}
         try:
             headers = {"Content-Type": "application/json"}
             headers.update(await self._authz_headers())
-            async with httpx.AsyncClient(timeout=self.authz_timeout_secs) as c:
-                r = await c.post(self.authz_api_url, json=payload, headers=headers)
-            if r.status_code != 200:
-                return not self.deny_on_error
-            allowed = bool(r.json().get("allowed"))
+            allowed = await self._authz().decide(payload, headers)
         except Exception:
-            allowed = not self.deny_on_error
-
-        exp = now + max(1, self.decision_ttl_secs)
-        async with self._decisions_lock:
-            self._decisions[key] = (allowed, exp)
-            self._decisions_order.append(key)
-            if len(self._decisions_order) > self.decision_cache_size:
-                old = self._decisions_order.pop(0)
-                self._decisions.pop(old, None)
+            # an outage is not a decision: don't cache the fallback, and keep any stale entry serving
+            return not self.deny_on_error
 
+        # denials get a short TTL and are never served stale, so grants take effect quickly
+        if allowed:
+            self._decisions.put(key, True, max(1, self.decision_ttl_secs), self.stale_ttl_secs, time.time())
+        else:
+            self._decisions.put(key, False, max(1, self.negative_ttl_secs), 0, time.time())
         return allowed
 
     # --------- Wrapping ----------
@@ -164,16 +429,9 @@ class RequireAuth:
             if not idt:
                 raise HTTPException(401, "No ID token in session")
 
-            cfg, jwks_client = await self._jwks()
+            cfg = await self.oidc.discover()
             try:
-                key = jwks_client.get_signing_key_from_jwt(idt)
-                claims = jwt.decode(
-                    idt, key.key,
-                    algorithms=["RS256","RS384","RS512","ES256","ES384","ES512"],
-                    audience=self.oidc.client_id,
-                    issuer=cfg["issuer"],
-                    leeway=self.clock_skew,
-                )
+                claims = await self._verify_id_token(cfg, idt)
             except Exception:
                 raise HTTPException(401, "Invalid ID token")
 
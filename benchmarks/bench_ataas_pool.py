@@ -0,0 +1,64 @@
+"""
+Before/after: per-call ATAASConnector clients vs the app-scoped ATAASClientPool.
+
+Spins up a local stub ATAAS (uvicorn, 127.0.0.1) and fetches run status N times
+through make_ataas_connector(), first without the pool, then with it.
+
+    python benchmarks/bench_ataas_pool.py [N] [CONCURRENCY]
+"""
+import asyncio, os, socket, sys, threading, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ataas"))
+
+import uvicorn
+from fastapi import FastAPI
+
+stub = FastAPI()
+
+@stub.get("/api/v1/runs/{run_id}")
+async def _status(run_id: str):
+    return {"run_id": run_id, "state": "RUNNING", "progress": 42}
+
+
+def _serve() -> int:
+    sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def _run(n: int, concurrency: int) -> float:
+    from ataas.connectors.ataas_connectors import make_ataas_connector
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            async with make_ataas_connector() as c:
+                await c.status(f"run-{i}")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - t0
+
+
+async def main(n: int, concurrency: int):
+    from ataas.connectors import ataas_connectors as mod
+    before = await _run(n, concurrency)
+    await mod.start_ataas_pool()
+    after = await _run(n, concurrency)
+    stats = mod.ataas_pool_stats()
+    await mod.close_ataas_pool()
+    print(f"requests={n} concurrency={concurrency}")
+    print(f"per-call client : {before:.3f}s  {n / before:8.1f} req/s")
+    print(f"shared pool     : {after:.3f}s  {n / after:8.1f} req/s  ({before / after:.1f}x)")
+    print(f"pool stats      : {stats}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    os.environ["ATAAS_BASE_URL"] = f"http://127.0.0.1:{_serve()}"
+    os.environ.setdefault("ATAAS_API_KEY", "bench")
+    asyncio.run(main(n, concurrency))
@@ -0,0 +1,67 @@
+"""
+RequireAuth authz calls: pooled single calls vs micro-batched bulk calls.
+
+Spins up a local stub authz API (uvicorn, 127.0.0.1) exposing
+  POST /authz        {"subject","email","action"}  -> {"allowed": bool}
+  POST /authz/batch  {"requests": [...]}            -> {"results": [{"allowed": bool}, ...]}
+and resolves N distinct subject|action decisions concurrently (all cache misses).
+The third run points at a batch URL the stub does not serve, to show the fallback.
+
+    python benchmarks/bench_authz_batch.py [N]
+"""
+import asyncio, os, socket, sys, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+from auth.newwithauth.decorators import RequireAuth, close_authz_clients
+
+stub = FastAPI()
+hits = {"single": 0, "batch": 0}
+
+@stub.post("/authz")
+async def _single(request: Request):
+    hits["single"] += 1
+    body = await request.json()
+    return {"allowed": not body["subject"].startswith("deny")}
+
+@stub.post("/authz/batch")
+async def _batch(request: Request):
+    hits["batch"] += 1
+    body = await request.json()
+    return {"results": [{"allowed": not r["subject"].startswith("deny")} for r in body["requests"]]}
+
+
+def _serve() -> int:
+    sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def _run(label: str, n: int, **kw):
+    hits.update(single=0, batch=0)
+    guard = RequireAuth(oidc=None, authz_action="view", **kw)
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(guard._check_authorization(f"user-{label}-{i}", None, "view") for i in range(n)))
+    dt = time.perf_counter() - t0
+    assert all(results)
+    print(f"{label:<16} {dt * 1000:8.1f}ms  upstream single={hits['single']:<5} batch={hits['batch']}")
+    await close_authz_clients()
+
+
+async def main(n: int, base: str):
+    await _run("single", n, authz_api_url=f"{base}/authz")
+    await _run("batched-5ms", n, authz_api_url=f"{base}/authz",
+               authz_batch_url=f"{base}/authz/batch", authz_batch_window_ms=5)
+    await _run("batch-fallback", n, authz_api_url=f"{base}/authz",
+               authz_batch_url=f"{base}/authz/missing", authz_batch_window_ms=5)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    asyncio.run(main(n, f"http://127.0.0.1:{_serve()}"))
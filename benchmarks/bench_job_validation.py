@@ -0,0 +1,95 @@
+"""
+Triggers/second through GenericAtaasJob.run (in-memory connector) for a ~10-field job schema:
+jsonschema.validate per trigger (old) vs the cached compiled validator, with and without fastjsonschema.
+
+    python benchmarks/bench_job_validation.py [N]
+
+Needs jsonschema (and fastjsonschema for the fast path).
+"""
+import asyncio, os, sys, time
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ataas"))
+
+import jsonschema
+
+from ataas.module_bricks.ataas import generic
+from ataas.module_bricks.ataas.generic import DictArgs, GenericAtaasJob
+
+SCHEMA = {
+    "type": "object",
+    "required": ["cluster", "database", "retention_days"],
+    "additionalProperties": False,
+    "properties": {
+        "cluster": {"type": "string", "pattern": "^[a-z0-9-]+$"},
+        "database": {"type": "string", "minLength": 1},
+        "retention_days": {"type": "integer", "minimum": 1, "maximum": 365},
+        "compress": {"type": "boolean"},
+        "tier": {"enum": ["hot", "warm", "cold"]},
+        "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 20},
+        "window": {"type": "object", "properties": {"start": {"type": "string"}, "end": {"type": "string"}}},
+        "priority": {"type": "number"},
+        "notify": {"type": "array", "items": {"type": "string", "format": "email"}},
+        "client_token": {"type": "string"},
+    },
+}
+PAYLOAD = {"cluster": "pg-prod-1", "database": "orders", "retention_days": 30, "compress": True, "tier": "warm",
+           "tags": ["nightly", "critical"], "window": {"start": "01:00", "end": "03:00"}, "priority": 1.5}
+
+
+class _Client:
+    async def trigger(self, job, payload, client_token=None):
+        return "run-1"
+
+
+@asynccontextmanager
+async def _connector():
+    yield _Client()
+
+
+class _Allow:
+    def allow(self, caller, job_name, args):
+        return True
+
+
+class _OldJob(GenericAtaasJob):
+    async def run(self, *, args, caller, correlation_id):
+        payload = args.root
+        jsonschema.validate(instance=payload, schema=self.instance_args_schema())
+        async with self.connector() as client:
+            await client.trigger(self.name, payload)
+
+
+def _job(cls=GenericAtaasJob):
+    return cls(connector=_connector, entitlements=_Allow(), telemetry=None, queue=None,
+               meta={"name": "db-backup", "version": "1.1.0", "schema": SCHEMA})
+
+
+async def _bench(label: str, cls, n: int):
+    args = DictArgs(PAYLOAD)
+    await _job(cls).run(args=args, caller=None, correlation_id="warm")
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await _job(cls).run(args=args, caller=None, correlation_id="x")  # a job object per trigger, as the router does
+    print(f"{label:<34} {n / (time.perf_counter() - t0):10,.0f} triggers/s")
+
+
+async def main(n: int):
+    await _bench("jsonschema.validate (old)", _OldJob, max(1, n // 10))
+    generic.USE_FASTJSONSCHEMA = False
+    generic._VALIDATORS.clear()
+    await _bench("cached validator (jsonschema)", GenericAtaasJob, n)
+    if generic.fastjsonschema is not None:
+        generic.USE_FASTJSONSCHEMA = True
+        generic._VALIDATORS.clear()
+        await _bench("cached validator (fastjsonschema)", GenericAtaasJob, n)
+
+    bad = {"cluster": "PG_PROD", "retention_days": 0, "tier": "lukewarm"}
+    try:
+        await _job().run(args=DictArgs(bad), caller=None, correlation_id="x")
+    except Exception as e:
+        print("invalid payload ->", getattr(e, "status_code", None), e.detail["errors"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
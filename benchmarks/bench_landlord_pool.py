@@ -0,0 +1,117 @@
+"""
+Landlord proxied GETs: per-call AsyncClient (unstarted connector) vs the app-scoped
+pooled connector, against a local stub upstream (uvicorn, 127.0.0.1, separate process)
+served over TLS with a throwaway self-signed certificate, so every new connection pays
+the handshake (and every new client loads the CA bundle), as with the real Landlord.
+The response cache is disabled so every call reaches the upstream; each mode gets one
+warm-up pass. Reports req/s and per-request latency; --plain serves plain HTTP instead.
+Needs `cryptography` for the certificate.
+
+    python benchmarks/bench_landlord_pool.py [N] [CONCURRENCY] [--plain]
+"""
+import asyncio, datetime, ipaddress, multiprocessing, os, socket, statistics, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["LANDLORD_CACHE_ENABLED"] = "false"
+
+import uvicorn
+from fastapi import FastAPI
+
+stub = FastAPI()
+
+@stub.get("/api/v1/clusters")
+async def _clusters(datacenter_name: str = "dc1"):
+    return {"datacenter": datacenter_name, "clusters": [f"c{i}" for i in range(20)]}
+
+
+def _self_signed(directory: str):
+    """A certificate for 127.0.0.1 and its key, as PEM files; the certificate doubles as the CA bundle."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "landlord-stub")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+    certfile, keyfile = os.path.join(directory, "stub.pem"), os.path.join(directory, "stub.key")
+    with open(certfile, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return certfile, keyfile
+
+
+def _serve(tls=None) -> int:
+    sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+    ssl_kw = {"ssl_certfile": tls[0], "ssl_keyfile": tls[1]} if tls else {}
+    proc = multiprocessing.Process(
+        target=uvicorn.run, args=(stub,),
+        kwargs={"host": "127.0.0.1", "port": port, "log_level": "error", **ssl_kw}, daemon=True,
+    )
+    proc.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return port
+
+
+async def _load(conn, n: int, concurrency: int):
+    """Wall time and per-request latencies (seconds) of n GETs."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with sem:
+            t = time.perf_counter()
+            await conn.proxy_get("clusters", {"datacenter_name": f"dc{i % 5}"}, {})
+            latencies.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - t0, sorted(latencies)
+
+
+def _report(label: str, n: int, wall: float, lat):
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+    print(f"{label}: {n / wall:8.1f} req/s   latency ms p50 {pct(0.50):6.2f}  p95 {pct(0.95):6.2f}  "
+          f"p99 {pct(0.99):6.2f}  mean {statistics.fmean(lat) * 1000:6.2f}")
+
+
+async def main(n: int, concurrency: int, scheme: str):
+    import llcon
+    per_call = llcon.LandlordConnector()
+    await _load(per_call, n // 5, concurrency)
+    before, before_lat = await _load(per_call, n, concurrency)
+    conn = await llcon.start_landlord_connector()
+    await _load(conn, n // 5, concurrency)
+    after, after_lat = await _load(conn, n, concurrency)
+    await llcon.close_landlord_connector()
+    print(f"requests={n} concurrency={concurrency} upstream={scheme}")
+    _report("per-call client ", n, before, before_lat)
+    _report("pooled connector", n, after, after_lat)
+    print(f"speedup: {before / after:.1f}x req/s, "
+          f"{statistics.median(before_lat) / statistics.median(after_lat):.1f}x lower p50 latency")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 2000
+    concurrency = int(args[1]) if len(args) > 1 else 20
+    plain = "--plain" in sys.argv
+    tmp = tempfile.TemporaryDirectory()
+    tls = None if plain else _self_signed(tmp.name)
+    port = _serve(tls)
+    import llcon
+    llcon.LandlordConnector.BASE_URL = f"{'http' if plain else 'https'}://127.0.0.1:{port}"
+    llcon.CA_BUNDLE = tls[0] if tls else None  # as LANDLORD_CA_BUNDLE would
+    asyncio.run(main(n, concurrency, "http" if plain else "https"))
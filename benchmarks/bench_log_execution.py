@@ -0,0 +1,60 @@
+"""
+Per-request overhead of @log_execution on the src/app.py routes.
+
+For each route: bare handler vs decorated handler with the logger at INFO
+(records formatted into an in-memory stream) and at WARNING (disabled),
+then the full ASGI request through TestClient for scale.
+
+    python benchmarks/bench_log_execution.py [N]
+"""
+import asyncio, io, logging, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from log_config import LOGGER_NAME
+from src.app import app, healthz, readyz, root, update_log_level, LogLevelRequest
+
+
+def _per_call_us(fn, n: int) -> float:
+    async def loop():
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await fn()
+        return time.perf_counter() - t0
+    return asyncio.run(loop()) / n * 1e6
+
+
+def main(n: int):
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [logging.StreamHandler(io.StringIO())]
+    logger.propagate = False
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    routes = {"/healthz": healthz, "/readyz": readyz, "/": root}
+    print(f"{'route':<12} {'bare':>9} {'INFO':>9} {'WARNING':>9}   (us/call, N={n})")
+    for path, handler in routes.items():
+        bare = _per_call_us(handler.__wrapped__, n)
+        logger.setLevel(logging.INFO)
+        info = _per_call_us(handler, n)
+        logger.setLevel(logging.WARNING)
+        off = _per_call_us(handler, n)
+        print(f"{path:<12} {bare:9.2f} {info:9.2f} {off:9.2f}")
+
+    client = TestClient(app)
+    print(f"\n{'route':<22} {'INFO':>9} {'WARNING':>9}   (us/request via TestClient, N={n // 10})")
+    for method, path, body in (("GET", "/healthz", None), ("GET", "/", None),
+                               ("POST", "/config/log-level", {"level": "WARNING"})):
+        row = []
+        for lvl in (logging.INFO, logging.WARNING):
+            logger.setLevel(lvl)
+            t0 = time.perf_counter()
+            for _ in range(n // 10):
+                client.request(method, path, json=body)
+            row.append((time.perf_counter() - t0) / (n // 10) * 1e6)
+        print(f"{method + ' ' + path:<22} {row[0]:9.1f} {row[1]:9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
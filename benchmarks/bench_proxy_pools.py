@@ -0,0 +1,86 @@
+"""
+Upstream isolation in the proxier: a flood against a slow connector (each response takes 1s)
+while a fast connector is probed. With one shared client (the old module-level client) the flood
+holds every connection, so fast requests queue behind it; with per-connector pools the fast
+connector keeps its own connections and the slow one sheds its excess with PoolTimeout (503).
+Stub upstreams run under uvicorn on 127.0.0.1 in a separate process.
+
+    python benchmarks/bench_proxy_pools.py [FLOOD] [MAX_CONNECTIONS]
+"""
+import asyncio, multiprocessing, os, socket, statistics, sys, time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from proxy_pools import PoolSettings, UpstreamPool, pool_for, pool_stats, close_pools
+
+stub = FastAPI()
+
+@stub.get("/slow/{i}")
+async def _slow(i: int):
+    await asyncio.sleep(1.0)
+    return {"i": i}
+
+@stub.get("/fast/{i}")
+async def _fast(i: int):
+    return {"i": i}
+
+
+def _serve() -> int:
+    sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+    proc = multiprocessing.Process(
+        target=uvicorn.run, args=(stub,), kwargs={"host": "127.0.0.1", "port": port, "log_level": "error"}, daemon=True,
+    )
+    proc.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return port
+
+
+async def _get(pool: UpstreamPool, url: str):
+    t0 = time.perf_counter()
+    try:
+        await pool.send(pool.client.build_request("GET", url))
+        return time.perf_counter() - t0, None
+    except httpx.PoolTimeout:
+        return time.perf_counter() - t0, 503
+
+
+async def _run(label: str, slow: UpstreamPool, fast: UpstreamPool, base: str, flood: int):
+    flood_tasks = [asyncio.ensure_future(_get(slow, f"{base}/slow/{i}")) for i in range(flood)]
+    await asyncio.sleep(0.1)  # let the flood take the connections
+    fast_results = await asyncio.gather(*(_get(fast, f"{base}/fast/{i}") for i in range(50)))
+    slow_results = await asyncio.gather(*flood_tasks)
+    lat = sorted(r[0] * 1000 for r in fast_results)
+    shed = [r[0] * 1000 for r in slow_results if r[1] == 503]
+    print(f"{label}")
+    print(f"  fast connector : p50 {statistics.median(lat):7.1f} ms   max {lat[-1]:7.1f} ms")
+    print(f"  slow connector : {flood - len(shed)} served, {len(shed)} shed as 503"
+          + (f" after ~{statistics.median(shed):.0f} ms" if shed else ""))
+
+
+async def main(port: int, flood: int, max_connections: int):
+    base = f"http://127.0.0.1:{port}"
+    shared = UpstreamPool("shared", PoolSettings(max_connections=max_connections, max_keepalive=max_connections,
+                                                 pool_timeout=30.0))
+    await _run("shared client (old)", shared, shared, base, flood)
+    await shared.client.aclose()
+
+    up = SimpleNamespace(base_url=base, max_connections=max_connections, max_keepalive=max_connections, pool_timeout=0.5)
+    await _run("per-connector pools", pool_for("slow", up), pool_for("fast", up), base, flood)
+    print(pool_stats())
+    await close_pools()
+
+
+if __name__ == "__main__":
+    flood = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    max_connections = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(_serve(), flood, max_connections))
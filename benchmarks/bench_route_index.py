@@ -0,0 +1,67 @@
+"""
+Routing latency with 100 / 1k / 10k dynamic routes: Starlette's linear scan vs route_index.RouteIndex.
+Routes mimic the two families: GET /landlord/svc{i}/items/{item_id} and POST /jobs/job-{i}/runs.
+Times the router's match loop (the part that grows with route count) for a first, middle and last route.
+
+    python benchmarks/bench_route_index.py [iterations]
+"""
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import APIRouter
+from starlette.routing import Match
+
+from route_index import index_routes
+
+
+async def _endpoint():
+    return {}
+
+
+def _router(n: int) -> APIRouter:
+    router = APIRouter()
+    for i in range(n // 2):
+        router.add_api_route(f"/landlord/svc{i}/items/{{item_id}}", _endpoint, methods=["GET"])
+        router.add_api_route(f"/jobs/job-{i}/runs", _endpoint, methods=["POST"], name=f"run_job-{i}")
+    return router
+
+
+def _resolve(routes, scope):
+    # Starlette Router.app's match loop
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def _scope(method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "root_path": "", "path_params": {}}
+
+
+def _bench(routes, scopes, iters: int) -> float:
+    for scope in scopes:
+        assert _resolve(routes, scope) is not None, scope["path"]
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        for scope in scopes:
+            _resolve(routes, scope)
+    return (time.perf_counter() - t0) / (iters * len(scopes)) * 1e6
+
+
+def main(iters: int):
+    print(f"{'routes':>7} {'linear us/req':>15} {'indexed us/req':>15} {'speedup':>9}")
+    for n in (100, 1_000, 10_000):
+        half = n // 2
+        scopes = [_scope("GET", f"/landlord/svc{i}/items/42") for i in (0, half // 2, half - 1)]
+        scopes += [_scope("POST", f"/jobs/job-{i}/runs") for i in (0, half // 2, half - 1)]
+        router = _router(n)
+        linear = _bench(list(router.routes), scopes, max(1, iters * 100 // n))
+        indexed_routes = index_routes(router.routes, lambda r: r.path.startswith(("/landlord/", "/jobs/")))
+        indexed = _bench(indexed_routes, scopes, iters)
+        print(f"{n:>7} {linear:>15.1f} {indexed:>15.1f} {linear / indexed:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
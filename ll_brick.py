@@ -1,11 +1,23 @@
 from __future__ import annotations
 
-from srehubapp.connectors.landlord_connector import LandlordConnector
+from typing import Optional
+
+from srehubapp.connectors.landlord_connector import (
+    close_landlord_connector,
+    get_landlord_connector,
+    start_landlord_connector,
+)
 
 
 class LandlordBrick:
-    async def fetch_remote_get_paths(self) -> dict:
-        return await LandlordConnector().fetch_filtered_openapi()
+    async def start(self) -> None:
+        await start_landlord_connector()
+
+    async def close(self) -> None:
+        await close_landlord_connector()
+
+    async def fetch_remote_get_paths(self, etag: Optional[str] = None) -> Optional[dict]:
+        return await get_landlord_connector().fetch_filtered_openapi(if_none_match=etag)
 
     async def proxy_get(self, path: str, params: dict, headers: dict):
-        return await LandlordConnector().proxy_get(path, params, headers)
\ No newline at end of file
+        return await get_landlord_connector().proxy_get(path, params, headers)
\ No newline at end of file
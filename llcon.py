@@ -1,12 +1,150 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import json
+import logging
 import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
 import httpx
 
+log = logging.getLogger("srehub.landlord")
+
+
+def _ttl_by_tag(raw: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for item in raw.split(","):
+        if "=" in item:
+            tag, ttl = item.split("=", 1)
+            out[tag.strip()] = float(ttl)
+    return out
+
+
+# Response cache config: default TTL + stale-while-revalidate window; per-route TTL from OpenAPI tags
+CACHE_ENABLED = os.getenv("LANDLORD_CACHE_ENABLED", "true").lower() != "false"
+CACHE_TTL = float(os.getenv("LANDLORD_CACHE_TTL", "60"))
+CACHE_SWR = float(os.getenv("LANDLORD_CACHE_SWR", "30"))
+CACHE_SIZE = int(os.getenv("LANDLORD_CACHE_SIZE", "2048"))
+# shared: drop the caller's credentials and fetch with the connector's own; else entries are keyed per credential
+CACHE_SHARED = os.getenv("LANDLORD_CACHE_SHARED", "false").lower() == "true"
+CACHE_TTL_BY_TAG = _ttl_by_tag(os.getenv("LANDLORD_CACHE_TTL_BY_TAG", ""))  # e.g. "clusters=300,datacenters=3600"
+
+# Connection pool for the app-scoped connector
+MAX_CONNECTIONS = int(os.getenv("LANDLORD_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("LANDLORD_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY_SEC = float(os.getenv("LANDLORD_KEEPALIVE_EXPIRY_SEC", "30"))
+HTTP2 = os.getenv("LANDLORD_HTTP2", "false").lower() == "true"
+# TLS: a CA bundle path wins; LANDLORD_VERIFY_SSL=false turns verification off (not for production)
+CA_BUNDLE = os.getenv("LANDLORD_CA_BUNDLE") or None
+VERIFY_SSL = os.getenv("LANDLORD_VERIFY_SSL", "true").lower() != "false"
+
+_TTL_TAG = re.compile(r"cache-ttl[:=](\d+(?:\.\d+)?)")
+# caller validators must not leak into the shared upstream fetch
+_CALLER_CONDITIONALS = {"if-none-match", "if-modified-since"}
+# caller identity forwarded upstream; a cached body is only reused for the same values
+_CALLER_CREDENTIALS = {"authorization", "cookie"}
+
+
+class _CacheEntry:
+    __slots__ = ("body", "etag", "last_modified", "fresh_until", "stale_until")
+
+    def __init__(self, body: Any, etag: Optional[str], last_modified: Optional[str], ttl: float):
+        self.body, self.etag, self.last_modified = body, etag, last_modified
+        self.touch(ttl)
+
+    def touch(self, ttl: float) -> None:
+        now = time.monotonic()
+        self.fresh_until = now + ttl
+        self.stale_until = self.fresh_until + CACHE_SWR
+
+
+class ResponseCache:
+    """
+    In-process LRU + TTL cache of upstream GET bodies. Expired entries are kept
+    (until evicted) so their ETag/Last-Modified can be used to revalidate.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._d: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self.hits = self.stale_hits = self.misses = self.revalidated = self.coalesced = 0
+
+    def get(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._d.get(key)
+        if entry is not None:
+            self._d.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: _CacheEntry) -> None:
+        self._d[key] = entry
+        self._d.move_to_end(key)
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+
+    def clear(self) -> None:
+        self._d.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._d), "hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                "revalidated": self.revalidated, "coalesced": self.coalesced}
+
+
+_response_cache = ResponseCache()
+_inflight: Dict[str, asyncio.Future] = {}
+# upstream path -> (ttl, shared), filled from the OpenAPI tags by fetch_filtered_openapi
+_route_policies: Dict[str, Tuple[float, bool]] = {}
+
+
+def _policy_from_tags(tags: list) -> Tuple[float, bool]:
+    """
+    Tags drive caching per route: `no-cache`, `cache-ttl:<secs>`, `cache-shared`,
+    `cache-per-caller`, or any tag listed in LANDLORD_CACHE_TTL_BY_TAG.
+    """
+    ttl, shared = CACHE_TTL, CACHE_SHARED
+    for tag in tags or []:
+        if tag in CACHE_TTL_BY_TAG:
+            ttl = CACHE_TTL_BY_TAG[tag]
+        m = _TTL_TAG.fullmatch(tag)
+        if m:
+            ttl = float(m.group(1))
+        elif tag == "no-cache":
+            ttl = 0
+        elif tag == "cache-shared":
+            shared = True
+        elif tag == "cache-per-caller":
+            shared = False
+    return ttl, shared
+
+
+def cache_stats() -> Dict[str, int]:
+    return _response_cache.stats()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2] extra)
+        return True
+    except ImportError:
+        return False
+
 
 class LandlordConnector:
+    """
+    Use the app-scoped instance (get_landlord_connector / start_landlord_connector)
+    so every call shares one keep-alive pool; an unstarted instance falls back to
+    a short-lived client per call.
+    """
     BASE_URL = os.getenv("LANDLORD_BASE_URL", "http://localhost:8080")
 
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+
     async def get_client(self) -> httpx.AsyncClient:
         # TODO: replace token retrieval with your real auth flow
         token = os.getenv("LANDLORD_TOKEN", "")
@@ -14,33 +152,162 @@ class LandlordConnector:
             "Authorization": f"Bearer {token}" if token else "",
             "accept": "application/json",
         }
-        return httpx.AsyncClient(base_url=self.BASE_URL, headers=headers, verify=False)
+        return httpx.AsyncClient(
+            base_url=self.BASE_URL,
+            headers=headers,
+            verify=CA_BUNDLE or VERIFY_SSL,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SEC,
+            ),
+            http2=HTTP2 and _http2_available(),
+        )
+
+    async def start(self) -> "LandlordConnector":
+        if self._client is None:
+            self._client = await self.get_client()
+        return self
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self._client is not None:
+            yield self._client
+        else:
+            async with await self.get_client() as client:
+                yield client
 
-    async def fetch_filtered_openapi(self) -> dict:
+    async def fetch_filtered_openapi(self, if_none_match: Optional[str] = None) -> Optional[dict]:
         """
         Fetch landlord's OpenAPI (Swagger 2.0-style) and keep only GET ops.
-        Returns: {"paths": { "/foo": {"get": {...}}, ... }}
+        Returns: {"paths": { "/foo": {"get": {...}}, ... }, "etag": <upstream ETag or None>}
+        or None when `if_none_match` is given and the spec has not changed (304).
+        Also records each route's cache policy from its tags, replacing those of the previous spec.
         """
-        async with await self.get_client() as client:
+        headers = {"If-None-Match": if_none_match} if if_none_match else None
+        async with self._session() as client:
             # Adjust if your upstream serves it elsewhere
-            resp = await client.get("/swagger/doc.json", follow_redirects=True)
+            resp = await client.get("/swagger/doc.json", headers=headers, follow_redirects=True)
+            if resp.status_code == 304 and if_none_match:
+                return None
             resp.raise_for_status()
             spec = resp.json()
 
         filtered_paths: dict = {}
+        policies: Dict[str, Tuple[float, bool]] = {}
         for path, methods in spec.get("paths", {}).items():
             get_method = (methods or {}).get("get")
             if get_method:
                 filtered_paths[path] = {"get": get_method}
+                policies[path] = _policy_from_tags(get_method.get("tags") or [])
+        # replace, not merge: routes gone from the spec drop their policy
+        _route_policies.clear()
+        _route_policies.update(policies)
 
-        return {"paths": filtered_paths}
+        return {"paths": filtered_paths, "etag": resp.headers.get("etag")}
 
     async def proxy_get(self, path: str, params: dict, headers: dict) -> dict:
         """
         Proxy a GET to upstream `/api/v1/{path}` with provided params/headers.
+        Served from the response cache when the route's TTL allows; identical
+        concurrent misses share one upstream call. Callers get their own copy of the body.
         """
-        async with await self.get_client() as client:
+        ttl, shared = _route_policies.get("/" + path.lstrip("/"), (CACHE_TTL, CACHE_SHARED))
+        if not CACHE_ENABLED or ttl <= 0:
+            return await self._get(path, params, headers)
+
+        if shared:
+            headers = {k: v for k, v in (headers or {}).items() if k.lower() not in _CALLER_CREDENTIALS}
+        key = self._cache_key(path, params, headers)
+        entry = _response_cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.fresh_until:
+            _response_cache.hits += 1
+            return copy.deepcopy(entry.body)
+        if entry is not None and now < entry.stale_until:
+            _response_cache.stale_hits += 1
+            self._refresh(key, path, params, headers, ttl)  # revalidate in background
+            return copy.deepcopy(entry.body)
+        _response_cache.misses += 1
+        return copy.deepcopy(await asyncio.shield(self._refresh(key, path, params, headers, ttl)))
+
+    # ---------- Cache internals ----------
+
+    @staticmethod
+    def _cache_key(path: str, params: dict, headers: Optional[dict]) -> str:
+        key = f"{path.lstrip('/')}?{json.dumps(params or {}, sort_keys=True, default=str)}"
+        # the shared fetch goes out with these credentials, so only the same caller may reuse it
+        ident = sorted((k.lower(), v) for k, v in (headers or {}).items() if k.lower() in _CALLER_CREDENTIALS)
+        if ident:
+            key += "|" + hashlib.sha256(repr(ident).encode()).hexdigest()
+        return key
+
+    def _refresh(self, key: str, path: str, params: dict, headers: dict, ttl: float) -> asyncio.Future:
+        fut = _inflight.get(key)
+        if fut is not None:
+            _response_cache.coalesced += 1
+            return fut
+        fut = asyncio.ensure_future(self._fetch_into_cache(key, path, params, headers, ttl))
+        _inflight[key] = fut
+
+        def _done(f: asyncio.Future) -> None:
+            _inflight.pop(key, None)
+            if not f.cancelled() and f.exception() is not None:
+                log.warning("Landlord fetch failed for %s: %s", path, f.exception())
+
+        fut.add_done_callback(_done)
+        return fut
+
+    async def _fetch_into_cache(self, key: str, path: str, params: dict, headers: dict, ttl: float) -> Any:
+        entry = _response_cache.get(key)
+        cond = {k: v for k, v in (headers or {}).items() if k.lower() not in _CALLER_CONDITIONALS}
+        if entry is not None:
+            if entry.etag:
+                cond["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                cond["If-Modified-Since"] = entry.last_modified
+
+        async with self._session() as client:
+            url = f"/api/v1/{path.lstrip('/')}"
+            resp = await client.get(url, params=params, headers=cond, follow_redirects=True)
+        if resp.status_code == 304 and entry is not None:
+            _response_cache.revalidated += 1
+            entry.touch(ttl)
+            return entry.body
+        resp.raise_for_status()
+        body = resp.json()
+        if "no-store" not in resp.headers.get("cache-control", ""):
+            _response_cache.put(key, _CacheEntry(body, resp.headers.get("etag"), resp.headers.get("last-modified"), ttl))
+        return body
+
+    async def _get(self, path: str, params: dict, headers: dict) -> dict:
+        async with self._session() as client:
             url = f"/api/v1/{path.lstrip('/')}"
             resp = await client.get(url, params=params, headers=headers, follow_redirects=True)
             resp.raise_for_status()
-            return resp.json()
\ No newline at end of file
+            return resp.json()
+
+
+# ---------- App-scoped connector ----------
+_connector: Optional[LandlordConnector] = None
+
+
+def get_landlord_connector() -> LandlordConnector:
+    global _connector
+    if _connector is None:
+        _connector = LandlordConnector()
+    return _connector
+
+
+async def start_landlord_connector() -> LandlordConnector:
+    return await get_landlord_connector().start()
+
+
+async def close_landlord_connector() -> None:
+    if _connector is not None:
+        await _connector.aclose()
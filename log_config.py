@@ -1,16 +1,193 @@
 import os
+import copy
+import asyncio
+import queue
+import atexit
 import yaml
 import logging
 import logging.config
+import logging.handlers
+
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:  # stdlib fallback
+    import json
+
+    _dumps = json.JSONEncoder(default=str, ensure_ascii=False, separators=(",", ":")).encode
 
 LOGGER_NAME = "srehubapp_logger"
 
-def setup_logger(config_path="config/logger.yaml"):
+# Set when setup_logger runs in queue mode
+_listener = None
+_queue_handler = None
+
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One valid JSON object per record, serialized with orjson when installed.
+    `static_fields` (e.g. service, env) are merged into every record; extras such as
+    request_id or duration_ms are included as top-level keys. The timestamp prefix is
+    cached per second.
+    """
+
+    def __init__(self, fmt=None, datefmt=None, style="%", validate=True, *, static_fields=None):
+        super().__init__(datefmt=datefmt)
+        self.static_fields = dict(static_fields or {})
+        self._time_cache = (None, "")  # (second, prefix), swapped as one object so threads never mix them
+
+    def _time(self, record) -> str:
+        sec = int(record.created)
+        cached_sec, prefix = self._time_cache
+        if sec != cached_sec:
+            prefix = self.formatTime(logging.makeLogRecord({"created": sec}), self.datefmt or "%Y-%m-%d %H:%M:%S")
+            self._time_cache = (sec, prefix)
+        return f"{prefix},{int(record.msecs):03d}"
+
+    def format(self, record):
+        out = dict(self.static_fields)
+        out["time"] = self._time(record)
+        out["level"] = record.levelname
+        out["logger"] = record.name
+        out["filename"] = record.filename
+        out["line"] = record.lineno
+        out["message"] = record.getMessage()
+        for k, v in record.__dict__.items():
+            if k not in _RECORD_ATTRS:
+                out[k] = v
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:  # queued records carry only the text
+            out["exc_info"] = record.exc_text
+        if record.stack_info:
+            out["stack_info"] = self.formatStack(record.stack_info)
+        return _dumps(out)
+
+
+_exc_formatter = logging.Formatter()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue-only handler: the caller never formats or does I/O.
+    When the queue is full the record waits up to block_timeout ("block"), is
+    dropped ("drop"), or replaces the oldest queued record ("drop_oldest").
+    "block" never waits on a thread running an asyncio loop, where it would stall
+    every coroutine: there a full queue drops the record. Every lost record is
+    counted in `dropped`.
+    """
+
+    def __init__(self, q, policy: str = "block", block_timeout: float = 0.05):
+        super().__init__(q)
+        if policy not in ("drop", "drop_oldest", "block"):
+            raise ValueError(f"Invalid log queue policy: {policy}")
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread, so freeze what can still change: the args may be
+        # mutable objects the caller keeps using, and the traceback holds its frames alive
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.policy == "block" and not _on_event_loop():
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        if self.policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+                self.queue.put_nowait(record)
+                return
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+
+
+def setup_logger(config_path="config/logger.yaml", use_queue=None, queue_size=None, queue_policy=None):
+    """
+    Apply the YAML dictConfig. In queue mode (YAML `queue.enabled`, LOG_QUEUE_ENABLED or use_queue)
+    the srehubapp logger's handlers move behind a QueueListener thread and the logger itself only enqueues.
+    """
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"Logger config not found at {config_path}")
     with open(config_path, "r") as f:
         config = yaml.safe_load(f)
-        logging.config.dictConfig(config)
+    queue_cfg = config.pop("queue", None) or {}
+    stop_queue_listener()
+    logging.config.dictConfig(config)
+
+    if use_queue is None:
+        use_queue = os.getenv("LOG_QUEUE_ENABLED", str(queue_cfg.get("enabled", False))).lower() == "true"
+    if use_queue:
+        _start_queue_listener(
+            int(queue_size or os.getenv("LOG_QUEUE_SIZE", queue_cfg.get("maxsize", 10000))),
+            queue_policy or os.getenv("LOG_QUEUE_POLICY", queue_cfg.get("policy", "block")),
+        )
+
+
+def _start_queue_listener(maxsize: int, policy: str):
+    global _listener, _queue_handler
+    logger = logging.getLogger(LOGGER_NAME)
+    handlers = list(logger.handlers)
+    q = queue.Queue(maxsize=maxsize)
+    _queue_handler = BoundedQueueHandler(q, policy=policy)
+    for h in handlers:
+        logger.removeHandler(h)
+    logger.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_queue_listener():
+    """Flush queued records and stop the background thread; handlers go back on the logger."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.removeHandler(_queue_handler)
+    for h in _listener.handlers:
+        logger.addHandler(h)
+    _listener = _queue_handler = None
+
+
+atexit.register(stop_queue_listener)
+
+
+def dropped_log_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
 
 def set_log_level(level_name: str):
     """
@@ -21,6 +198,7 @@ def set_log_level(level_name: str):
     if not isinstance(level, int):
         raise ValueError(f"Invalid log level: {level_name}")
     logger.setLevel(level)
-    for handler in logger.handlers:
+    handlers = list(logger.handlers) + (list(_listener.handlers) if _listener is not None else [])
+    for handler in handlers:
         handler.setLevel(level)
-    logger.info(f"Log level changed dynamically to: {level_name}")
\ No newline at end of file
+    logger.info(f"Log level changed dynamically to: {level_name}")
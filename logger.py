@@ -1,16 +1,85 @@
+import asyncio
+import logging
+import reprlib
+import time
 from functools import wraps
 
-def log_execution(logger):
+
+class _Lazy:
+    """Defers repr() of args/results until a handler actually formats the record."""
+    __slots__ = ("obj", "_repr")
+
+    def __init__(self, obj, repr_):
+        self.obj = obj
+        self._repr = repr_
+
+    def __str__(self):
+        return self._repr.repr(self.obj)
+
+
+def _summarizer(max_len: int) -> reprlib.Repr:
+    r = reprlib.Repr()
+    r.maxstring = r.maxother = max_len
+    r.maxlist = r.maxtuple = r.maxdict = r.maxset = 10
+    r.maxlevel = 3
+    return r
+
+
+def log_execution(logger, level: int = logging.INFO, max_len: int = 200):
+    """
+    Log call, result and duration of a sync or async function.
+    Nothing is formatted unless `level` is enabled; large payloads are summarized to ~max_len chars.
+    Records carry structured extras: func, duration_ms.
+    """
+    summarize = _summarizer(max_len)
+
     def decorator(func):
+        name = func.__name__
+
+        def _before(args, kwargs):
+            logger.log(level, "Calling: %s | args=%s kwargs=%s", name,
+                       _Lazy(args, summarize), _Lazy(kwargs, summarize), extra={"func": name})
+
+        def _after(result, start):
+            ms = (time.perf_counter() - start) * 1000
+            logger.log(level, "Returned: %s => %s (%.2fms)", name, _Lazy(result, summarize), ms,
+                       extra={"func": name, "duration_ms": round(ms, 3)})
+
+        def _error(e, start):
+            ms = (time.perf_counter() - start) * 1000
+            logger.exception("Error in %s: %s (%.2fms)", name, e, ms,
+                             extra={"func": name, "duration_ms": round(ms, 3)})
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                enabled = logger.isEnabledFor(level)
+                if enabled:
+                    _before(args, kwargs)
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    _error(e, start)
+                    raise
+                if enabled:
+                    _after(result, start)
+                return result
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            logger.info(f"Calling: {func.__name__} | args={args} kwargs={kwargs}")
+            enabled = logger.isEnabledFor(level)
+            if enabled:
+                _before(args, kwargs)
+            start = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                logger.info(f"Returned: {func.__name__} => {result}")
-                return result
             except Exception as e:
-                logger.exception(f"Error in {func.__name__}: {e}")
+                _error(e, start)
                 raise
+            if enabled:
+                _after(result, start)
+            return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,76 @@
+# utils/model_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+log = logging.getLogger("srehub.model_cache")
+
+
+def spec_key(spec: Any) -> str:
+    """Content hash of a JSON-able spec (OAS parameters, JSON schema, ...)."""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ModelCache:
+    """
+    Content-hash keyed cache for dynamically generated Pydantic models: identical
+    specs share one model, built on first use.
+
+    With `cache_dir` (env MODEL_CACHE_DIR) the generated JSON schemas are persisted
+    per namespace, so lazily-built routes can publish full docs after a restart
+    without constructing their models at startup.
+    """
+
+    def __init__(self, namespace: str, cache_dir: Optional[str] = None):
+        self.namespace = namespace
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv("MODEL_CACHE_DIR")
+        self._models: Dict[str, type[BaseModel]] = {}
+        self._schemas: Dict[str, dict] = self._load()
+        self._dirty = False
+        self.hits = self.builds = 0
+
+    @property
+    def _path(self) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{self.namespace}.schemas.json") if self.cache_dir else None
+
+    def _load(self) -> Dict[str, dict]:
+        if not self._path or not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable model schema cache %s: %s", self._path, e)
+            return {}
+
+    def get_or_build(self, key: str, build: Callable[[], type[BaseModel]]) -> type[BaseModel]:
+        model = self._models.get(key)
+        if model is not None:
+            self.hits += 1
+            return model
+        model = self._models[key] = build()
+        self.builds += 1
+        if self.cache_dir and key not in self._schemas:
+            self._schemas[key] = model.model_json_schema()
+            self._dirty = True
+        return model
+
+    def schema(self, key: str) -> Optional[dict]:
+        """JSON schema for `key` if known (built this run or persisted by a previous one)."""
+        return self._schemas.get(key)
+
+    def save(self) -> None:
+        if not self._path or not self._dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self._path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._schemas, f)
+        os.replace(tmp, self._path)
+        self._dirty = False
@@ -1,31 +1,28 @@
 # utils/proxy.py
 from typing import Dict, Mapping, Callable, Awaitable
-import asyncio, logging, httpx, os
+import asyncio, logging, httpx, os, time
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask, BackgroundTasks
 from starlette.datastructures import Headers
 from urllib.parse import urljoin
 from models.proxy import UpstreamInfo
 from common.connectors import registry
+from utils.proxy_pools import UpstreamPool, pool_for, pool_stats as proxy_pool_stats, close_pools as close_proxy_clients
+from utils.proxy_cache import (CachePolicy, CACHEABLE_STATUS, CALLER_CONDITIONALS, Entry, cache_control, freshness,
+                               http_cache, merge_304, not_modified, policy_for as cache_policy_for, request_key,
+                               revalidation_headers)
+from utils.proxy_coalesce import SharedResponse, coalescer, flight_key
+from utils.proxy_compress import maybe_compress, upstream_accept_encoding
+from utils.proxy_ratelimit import Admission, Rejected, admission_for, caller_identity, retry_after
 
 HOP_BY_HOP = {
     "connection","proxy-connection","keep-alive","proxy-authenticate",
     "proxy-authorization","te","trailer","transfer-encoding","upgrade"
 }
 
-client = httpx.AsyncClient(
-    timeout=httpx.Timeout(
-        connect=float(os.getenv("PROXY_CONNECT_TIMEOUT", 5)),
-        read=float(os.getenv("PROXY_READ_TIMEOUT", 60)),
-        write=float(os.getenv("PROXY_WRITE_TIMEOUT", 60)),
-    ),
-    limits=httpx.Limits(
-        max_keepalive_connections=int(os.getenv("PROXY_MAX_KEEPALIVE", 100)),
-        max_connections=int(os.getenv("PROXY_MAX_CONNECTIONS", 200)),
-    ),
-    verify=(os.getenv("PROXY_CA_BUNDLE") or (os.getenv("PROXY_VERIFY_SSL","true").lower() != "false")),
-    follow_redirects=False,
-)
+# Stream caller bodies upstream and upstream bodies back as they arrive (no buffering)
+STREAMING = os.getenv("PROXY_STREAMING", "true").lower() != "false"
 
 log = logging.getLogger("srehub.proxier")
 
@@ -54,25 +51,78 @@ def _filtered_response_headers(incoming: Mapping[str, str]) -> Dict[str, str]:
         out[k] = v
     return out
 
-async def _backoff_retry(coro_factory: Callable[[], Awaitable[httpx.Response]], retries: int = int(os.getenv("PROXY_RETRIES", 1))):
+async def _backoff_retry(coro_factory: Callable[[], Awaitable[httpx.Response]], retries: int = int(os.getenv("PROXY_RETRIES", 1)),
+                         can_retry: Callable[[], bool] = lambda: True):
     last = None
     for attempt in range(retries + 1):
         try:
             return await coro_factory()
+        except httpx.PoolTimeout:
+            raise  # the pool is saturated; retrying would only queue again
         except (httpx.TransportError, httpx.ReadTimeout) as e:
             last = e
-            if attempt >= retries:
+            # a streamed body cannot be replayed once bytes have gone upstream
+            if attempt >= retries or not can_retry():
                 break
             await asyncio.sleep(0.5 * (2 ** attempt))
     raise last  # type: ignore
 
+async def _aiter(chunks):
+    for chunk in chunks:
+        yield chunk
+
+async def _release(pool: UpstreamPool, resp):
+    if isinstance(resp, SharedResponse):
+        await resp.aclose()  # the flight hands the upstream response back to the pool
+    else:
+        await pool.release(resp)
+
+def _saturated(connector: str, pool: UpstreamPool) -> HTTPException:
+    log.warning("Upstream pool for %s saturated (%d active)", connector, pool.active)
+    return HTTPException(status_code=503, detail=f"Upstream {connector} busy; retry shortly",
+                         headers={"Retry-After": str(max(1, round(pool.settings.pool_timeout)))})
+
+def _limited(connector: str, caller: str, e: Rejected) -> HTTPException:
+    log.warning("Proxy to %s rejected for %s: %s", connector, caller, e.reason)
+    detail = "Too many requests" if e.status == 429 else f"Upstream {connector} busy; retry shortly"
+    return HTTPException(status_code=e.status, detail=detail, headers={"Retry-After": retry_after(e.retry_after)})
+
+def _after_body(response: Response, admission: Admission):
+    """Free the admission slot once the response body has gone out (or the caller left)."""
+    async def _free():
+        admission.release()
+    tasks = BackgroundTasks()
+    tasks.add_task(_free)
+    if response.background is not None:
+        tasks.tasks.append(response.background)
+    response.background = tasks
+
 async def proxy_request(request: Request, connector: str, path: str) -> Response:
     up: UpstreamInfo = registry.resolve(connector)
+    admission = admission_for(connector, up)
+    caller = caller_identity(request, admission.policy)
+    try:
+        await admission.acquire(caller)
+    except Rejected as e:
+        raise _limited(connector, caller, e)
+    try:
+        response = await _proxy(request, connector, up, path)
+    except BaseException:
+        admission.release()
+        raise
+    _after_body(response, admission)
+    return response
+
+async def _proxy(request: Request, connector: str, up: UpstreamInfo, path: str) -> Response:
+    pool = pool_for(connector, up)
     target = urljoin(up.base_url, path)
     if request.url.query:
         target = f"{target}?{request.url.query}"
 
     headers = _filtered_request_headers(request.headers)
+    # upstream bodies are passed through still encoded, so only ask for codings the caller accepts
+    headers = {k: v for k, v in headers.items() if k.lower() != "accept-encoding"}
+    headers["accept-encoding"] = upstream_accept_encoding(request.headers.get("accept-encoding"))
 
     # X-Forwarded-*
     client_host = request.client.host if request.client else ""
@@ -89,22 +139,156 @@ async def proxy_request(request: Request, connector: str, path: str) -> Response
     # Inject connector credentials
     headers.update(up.auth_headers)
 
+    if request.method == "GET":
+        policy = cache_policy_for(connector, up)
+        if policy.enabled:
+            primary = request_key(connector, policy, target, headers, request.headers)
+            if primary is not None:
+                return await _proxy_cached(request, connector, pool, policy, primary, target, headers)
+            http_cache.bypassed += 1
+
+    if STREAMING:
+        return await _proxy_streaming(request, connector, pool, target, headers)
+
     body = await request.body()
 
     async def _go():
-        return await client.request(request.method, target, headers=headers, content=(body if body else None))
+        req = pool.client.build_request(request.method, target, headers=headers, content=(body if body else None))
+        return await pool.send(req, stream=True)
 
     try:
         resp = await _backoff_retry(_go)
+        try:
+            raw = b"".join([chunk async for chunk in resp.aiter_raw()])
+        finally:
+            await pool.release(resp)
+    except httpx.PoolTimeout:
+        raise _saturated(connector, pool)
+    except httpx.HTTPError as e:
+        log.warning("Upstream error %s %s -> %s: %s", request.method, request.url.path, target, e)
+        raise HTTPException(status_code=502, detail="Bad gateway (upstream error)")
+
+    out_headers, content = maybe_compress(request.headers, request.method, resp.status_code,
+                                          _filtered_response_headers(resp.headers), _aiter([raw]), len(raw))
+    return StreamingResponse(content, status_code=resp.status_code, media_type=out_headers.get("content-type"),
+                             headers=out_headers)
+
+async def _proxy_streaming(request: Request, connector: str, pool: UpstreamPool, target: str, headers: Dict[str, str]) -> Response:
+    """
+    End-to-end streaming: caller body -> upstream, upstream body -> caller, chunk by chunk.
+    Retries only happen while no request bytes have been sent upstream.
+    """
+    sent = False
+    has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+
+    async def _body():
+        nonlocal sent
+        async for chunk in request.stream():
+            if chunk:
+                sent = True
+                yield chunk
+
+    async def _go():
+        req = pool.client.build_request(request.method, target, headers=headers, content=(_body() if has_body else None))
+        return await pool.send(req, stream=True)
+
+    try:
+        if request.method == "GET" and not has_body:
+            # identical concurrent GETs share one upstream request
+            resp = await coalescer.fetch(flight_key("GET", target, headers), lambda: _backoff_retry(_go), pool.release)
+        else:
+            resp = await _backoff_retry(_go, can_retry=lambda: not sent)
+    except httpx.PoolTimeout:
+        raise _saturated(connector, pool)
     except httpx.HTTPError as e:
         log.warning("Upstream error %s %s -> %s: %s", request.method, request.url.path, target, e)
         raise HTTPException(status_code=502, detail="Bad gateway (upstream error)")
 
-    out_headers = _filtered_response_headers(resp.headers)
-    media_type = out_headers.get("content-type")
+    async def _iter():
+        try:
+            async for chunk in resp.aiter_raw():
+                yield chunk
+        except httpx.HTTPError as e:
+            # headers are already on the wire; all we can do is cut the body short
+            log.warning("Upstream stream aborted %s %s -> %s: %s", request.method, request.url.path, target, e)
+
+    out_headers, content = maybe_compress(request.headers, request.method, resp.status_code,
+                                          _filtered_response_headers(resp.headers), _iter())
+    return StreamingResponse(content, status_code=resp.status_code, media_type=out_headers.get("content-type"),
+                             headers=out_headers, background=BackgroundTask(_release, pool, resp))
+
+def _cached_response(request: Request, entry: Entry, status: str) -> Response:
+    headers = dict(entry.headers)
+    headers["age"] = str(int(time.time() - entry.stored_at))
+    headers["x-cache"] = status
+    if not_modified(entry, request.headers):
+        keep = ("etag", "last-modified", "cache-control", "expires", "vary", "date", "age", "x-cache")
+        return Response(status_code=304, headers={k: v for k, v in headers.items() if k in keep})
+    out_headers, content = maybe_compress(request.headers, "GET", entry.status, headers, _aiter(entry.iter_body()), entry.size)
+    if entry.body is not None and out_headers.get("content-encoding") == headers.get("content-encoding"):
+        return Response(content=entry.body, status_code=entry.status, headers=out_headers)
+    return StreamingResponse(content, status_code=entry.status, headers=out_headers)
+
+async def _proxy_cached(request: Request, connector: str, pool: UpstreamPool, policy: CachePolicy, primary: str,
+                        target: str, headers: Dict[str, str]) -> Response:
+    """
+    GET through the shared cache: fresh entries never reach the upstream, expired ones are
+    revalidated (served STALE if the upstream fails), misses stream to the caller while captured.
+    """
+    caller_cc = cache_control(request.headers.get("cache-control"))
+    lookup = {k: v for k, v in headers.items() if k.lower() not in CALLER_CONDITIONALS}
+    entry = http_cache.get(primary, lookup)
+    now = time.time()
+    if entry is not None and entry.fresh(now) and "no-cache" not in caller_cc and caller_cc.get("max-age") != "0":
+        http_cache.hits += 1
+        return _cached_response(request, entry, "HIT")
+    stale_ok = entry is not None and now < entry.stale_until
+    upstream_headers = {**lookup, **revalidation_headers(entry)}
 
+    async def _go():
+        return await pool.send(pool.client.build_request("GET", target, headers=upstream_headers), stream=True)
+
+    try:
+        resp = await coalescer.fetch(flight_key("GET", target, upstream_headers), lambda: _backoff_retry(_go), pool.release)
+    except httpx.HTTPError as e:
+        if stale_ok:
+            http_cache.stale += 1
+            return _cached_response(request, entry, "STALE")
+        if isinstance(e, httpx.PoolTimeout):
+            raise _saturated(connector, pool)
+        log.warning("Upstream error GET %s -> %s: %s", request.url.path, target, e)
+        raise HTTPException(status_code=502, detail="Bad gateway (upstream error)")
+
+    if entry is not None and (resp.status_code == 304 or (resp.status_code >= 500 and stale_ok)):
+        await _release(pool, resp)
+        if resp.status_code == 304:
+            merge_304(entry, resp.headers)
+            entry.refresh(freshness(entry.headers, policy) or 0.0, policy.stale_if_error)
+            http_cache.revalidated += 1
+            return _cached_response(request, entry, "HIT")
+        http_cache.stale += 1
+        return _cached_response(request, entry, "STALE")
+
+    http_cache.misses += 1
+    stored_headers = _filtered_response_headers(resp.headers)
+    ttl = freshness(resp.headers, policy) if resp.status_code in CACHEABLE_STATUS and "no-store" not in caller_cc else None
     async def _iter():
-        async for chunk in resp.aiter_bytes():
-            yield chunk
+        captured, size = ([] if ttl is not None else None), 0
+        try:
+            async for chunk in resp.aiter_raw():
+                if captured is not None:
+                    size += len(chunk)
+                    if size > policy.max_body_bytes:
+                        captured = None  # too large to keep; still streams through
+                    else:
+                        captured.append(chunk)
+                yield chunk
+        except httpx.HTTPError as e:
+            log.warning("Upstream stream aborted GET %s -> %s: %s", request.url.path, target, e)
+            return
+        if captured is not None and resp.claim():  # coalesced callers got the same body; store it once
+            await http_cache.put(primary, lookup, resp.status_code, stored_headers, b"".join(captured), ttl, policy)
 
-    return StreamingResponse(_iter(), status_code=resp.status_code, media_type=media_type, headers=out_headers)
\ No newline at end of file
+    out_headers, content = maybe_compress(request.headers, "GET", resp.status_code, {**stored_headers, "x-cache": "MISS"}, _iter())
+    return StreamingResponse(content, status_code=resp.status_code, media_type=stored_headers.get("content-type"),
+                             headers=out_headers, background=BackgroundTask(_release, pool, resp))
@@ -0,0 +1,282 @@
+# utils/proxy_cache.py
+"""
+Opt-in shared HTTP cache for proxied GETs. Freshness follows the upstream's Cache-Control
+(s-maxage / max-age, Age, Expires) with a per-connector fallback TTL; expired entries are
+revalidated with their ETag / Last-Modified and served STALE when the upstream errors.
+Vary is honoured per primary key. Bodies live in memory; with PROXY_CACHE_DIR set, large
+ones go to files served through mmap.
+"""
+from dataclasses import dataclass
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Mapping, Optional, Set, Tuple
+import asyncio, hashlib, mmap, os, re, shutil, tempfile, time, uuid
+
+from utils.proxy_pools import resolve_settings
+
+MEMORY_BYTES = int(float(os.getenv("PROXY_CACHE_MEMORY_MB", "64")) * 2**20)
+DISK_DIR = os.getenv("PROXY_CACHE_DIR") or None
+DISK_BYTES = int(float(os.getenv("PROXY_CACHE_DISK_MB", "1024")) * 2**20)
+MMAP_MIN_BYTES = int(float(os.getenv("PROXY_CACHE_MMAP_MIN_KB", "256")) * 2**10)
+CHUNK = 64 * 1024
+
+CACHEABLE_STATUS = {200, 203, 301, 404, 410}
+# request headers that carry caller or connector identity
+AUTH_HEADERS = {"authorization", "proxy-authorization", "cookie", "x-api-key"}
+# caller validators are answered from the cache, never forwarded with a shared fetch
+CALLER_CONDITIONALS = {"if-none-match", "if-modified-since"}
+_DIRECTIVE = re.compile(r'([a-z-]+)(?:=("[^"]*"|[^,\s]*))?')
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    enabled: bool = False
+    default_ttl: float = 0.0          # freshness when the upstream sends none (0: store only for revalidation)
+    stale_if_error: float = 60.0      # serve an expired entry this long when the upstream fails
+    max_body_bytes: int = 8 * 2**20
+    authenticated: bool = False       # allow caching with auth headers (entries keyed per credential)
+
+
+_policies: Dict[str, CachePolicy] = {}
+
+
+def policy_for(connector: str, up: Any) -> CachePolicy:
+    """UpstreamInfo `cache_<field>`, else PROXY_<CONNECTOR>_CACHE_<FIELD>, else PROXY_CACHE_<FIELD>."""
+    policy = _policies.get(connector)
+    if policy is None:
+        policy = _policies[connector] = resolve_settings(CachePolicy, connector, up, group="cache")
+    return policy
+
+
+def cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    return {m.group(1): (m.group(2) or "").strip('"') or None for m in _DIRECTIVE.finditer((value or "").lower())}
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness(headers: Mapping[str, str], policy: CachePolicy) -> Optional[float]:
+    """Seconds the response stays fresh, or None when a shared cache must not store it."""
+    cc = cache_control(headers.get("cache-control"))
+    if "no-store" in cc or "private" in cc or headers.get("vary", "").strip() == "*" or "set-cookie" in headers:
+        return None
+    if "no-cache" in cc:
+        return 0.0
+    age = float(headers["age"]) if (headers.get("age") or "").isdigit() else 0.0
+    for directive in ("s-maxage", "max-age"):
+        if (cc.get(directive) or "").isdigit():
+            return max(0.0, int(cc[directive]) - age)
+    expires = _http_date(headers.get("expires"))
+    if expires is not None:
+        return max(0.0, expires - (_http_date(headers.get("date")) or time.time()) - age)
+    return policy.default_ttl
+
+
+def request_key(connector: str, policy: CachePolicy, target: str, headers: Mapping[str, str],
+                caller_headers: Mapping[str, str]) -> Optional[str]:
+    """Primary key of a cacheable GET, or None when it must bypass the cache."""
+    cc = cache_control(caller_headers.get("cache-control"))
+    if "no-store" in cc:
+        return None
+    auth = sorted((k.lower(), v) for k, v in headers.items() if k.lower() in AUTH_HEADERS)
+    if auth and not policy.authenticated:
+        return None  # may be per-user data
+    ident = hashlib.sha256(repr(auth).encode()).hexdigest()[:16] if auth else "-"
+    coding = next((v for k, v in headers.items() if k.lower() == "accept-encoding"), "")
+    return f"{connector} {ident} {coding} {target}"  # bodies are stored in their upstream content-coding
+
+
+class Entry:
+    __slots__ = ("primary", "key", "status", "headers", "body", "path", "size", "etag", "last_modified",
+                 "stored_at", "fresh_until", "stale_until")
+
+    def __init__(self, primary: str, key: str, status: int, headers: Dict[str, str], size: int):
+        self.primary, self.key, self.status, self.headers, self.size = primary, key, status, headers, size
+        self.body: Optional[bytes] = None
+        self.path: Optional[str] = None
+        self.etag = headers.get("etag")
+        self.last_modified = headers.get("last-modified")
+
+    def refresh(self, ttl: float, stale_if_error: float):
+        self.stored_at = time.time()
+        self.fresh_until = self.stored_at + ttl
+        self.stale_until = self.fresh_until + stale_if_error
+
+    def fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def iter_body(self) -> Iterator[bytes]:
+        if self.body is not None:
+            yield self.body
+            return
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                view = memoryview(m)
+                try:
+                    for i in range(0, self.size, CHUNK):
+                        yield bytes(view[i:i + CHUNK])
+                finally:
+                    view.release()
+        except (OSError, ValueError):
+            return  # evicted (unlinked) before we opened it; the status line is already out
+
+
+def _write_file(path: str, body: bytes):
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+class HttpCache:
+    """Byte-bounded LRU in memory plus an optional byte-bounded LRU of mmap'd body files."""
+
+    def __init__(self, memory_bytes: int = MEMORY_BYTES, disk_dir: Optional[str] = DISK_DIR,
+                 disk_bytes: int = DISK_BYTES, mmap_min_bytes: int = MMAP_MIN_BYTES):
+        self.memory_bytes, self.disk_bytes, self.mmap_min_bytes = memory_bytes, disk_bytes, mmap_min_bytes
+        self._dir = tempfile.mkdtemp(prefix=f"proxy-cache-{os.getpid()}-", dir=disk_dir) if disk_dir else None
+        self._mem: "OrderedDict[str, Entry]" = OrderedDict()
+        self._disk: "OrderedDict[str, Entry]" = OrderedDict()
+        self._vary: Dict[str, Tuple[str, ...]] = {}  # primary key -> request headers the upstream varies on
+        self._variants: Dict[str, Set[str]] = {}     # primary key -> stored variant keys; _vary lives as long as one does
+        self.mem_used = self.disk_used = 0
+        self.hits = self.misses = self.stale = self.revalidated = self.bypassed = self.stores = self.evictions = 0
+
+    @staticmethod
+    def _variant(primary: str, names: Tuple[str, ...], headers: Mapping[str, str]) -> str:
+        if not names:
+            return primary
+        lower = {k.lower(): v for k, v in headers.items()}
+        return primary + "\x00" + "\x00".join(f"{n}={lower.get(n, '')}" for n in names)
+
+    def get(self, primary: str, headers: Mapping[str, str]) -> Optional[Entry]:
+        key = self._variant(primary, self._vary.get(primary, ()), headers)
+        for tier in (self._mem, self._disk):
+            entry = tier.get(key)
+            if entry is not None:
+                tier.move_to_end(key)
+                return entry
+        return None
+
+    async def put(self, primary: str, headers: Mapping[str, str], status: int, resp_headers: Dict[str, str],
+                  body: bytes, ttl: float, policy: CachePolicy) -> Optional[Entry]:
+        names = tuple(sorted(n.strip().lower() for n in resp_headers.get("vary", "").split(",") if n.strip()))
+        key = self._variant(primary, names, headers)
+        entry = Entry(primary, key, status, resp_headers, len(body))
+        entry.refresh(ttl, policy.stale_if_error)
+        if self._dir is not None and self.mmap_min_bytes <= entry.size <= self.disk_bytes:
+            entry.path = os.path.join(self._dir, uuid.uuid4().hex)
+            try:
+                await asyncio.to_thread(_write_file, entry.path, body)  # keep the event loop off the disk
+            except OSError:
+                self._unlink(entry)
+                return None
+        elif entry.size <= self.memory_bytes:
+            entry.body = body
+        else:
+            return None
+
+        if self._vary.get(primary, names) != names:  # the upstream changed its Vary: older variants are unreachable
+            for old in list(self._variants.get(primary, ())):
+                self._drop(old)
+        self._drop(key)
+        self._vary[primary] = names
+        self._variants.setdefault(primary, set()).add(key)
+        if entry.path is not None:
+            self._disk[key] = entry
+            self.disk_used += entry.size
+        else:
+            self._mem[key] = entry
+            self.mem_used += entry.size
+        self.stores += 1
+        self._evict()
+        return entry
+
+    def _drop(self, key: str):
+        entry = self._mem.pop(key, None)
+        if entry is not None:
+            self.mem_used -= entry.size
+            self._forget(entry)
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self.disk_used -= entry.size
+            self._forget(entry)
+            self._unlink(entry)
+
+    def _forget(self, entry: Entry):
+        keys = self._variants.get(entry.primary)
+        if keys is None:
+            return
+        keys.discard(entry.key)
+        if not keys:  # last variant gone
+            del self._variants[entry.primary]
+            self._vary.pop(entry.primary, None)
+
+    @staticmethod
+    def _unlink(entry: Entry):
+        try:
+            os.unlink(entry.path)  # open mmaps keep serving the old inode
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self.mem_used > self.memory_bytes and self._mem:
+            _, entry = self._mem.popitem(last=False)
+            self.mem_used -= entry.size
+            self._forget(entry)
+            self.evictions += 1
+        while self.disk_used > self.disk_bytes and self._disk:
+            _, entry = self._disk.popitem(last=False)
+            self.disk_used -= entry.size
+            self._forget(entry)
+            self._unlink(entry)
+            self.evictions += 1
+
+    def clear(self):
+        for key in list(self._mem) + list(self._disk):
+            self._drop(key)
+        self._vary.clear()
+        self._variants.clear()
+
+    def close(self):
+        self.clear()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"memory_entries": len(self._mem), "memory_bytes": self.mem_used, "disk_entries": len(self._disk),
+                "disk_bytes": self.disk_used, "hits": self.hits, "misses": self.misses, "stale": self.stale,
+                "revalidated": self.revalidated, "bypassed": self.bypassed, "stores": self.stores,
+                "evictions": self.evictions}
+
+
+def not_modified(entry: Entry, caller_headers: Mapping[str, str]) -> bool:
+    """Whether the caller's own validators match the cached entry (answer 304)."""
+    inm = caller_headers.get("if-none-match")
+    if inm is not None:  # weak comparison: a recompressed response carries W/<etag>
+        weak = lambda t: t.strip()[2:] if t.strip().startswith("W/") else t.strip()
+        return entry.etag is not None and (inm.strip() == "*" or weak(entry.etag) in [weak(t) for t in inm.split(",")])
+    since, modified = _http_date(caller_headers.get("if-modified-since")), _http_date(entry.last_modified)
+    return since is not None and modified is not None and modified <= since
+
+
+def revalidation_headers(entry: Optional[Entry]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    if entry is not None and entry.etag:
+        out["If-None-Match"] = entry.etag
+    if entry is not None and entry.last_modified:
+        out["If-Modified-Since"] = entry.last_modified
+    return out
+
+
+def merge_304(entry: Entry, headers: Mapping[str, str]):
+    """Fold a 304's refreshed metadata into the entry."""
+    for k in ("cache-control", "expires", "date", "age", "etag", "last-modified"):
+        if k in headers:
+            entry.headers[k] = headers[k]
+    entry.etag, entry.last_modified = entry.headers.get("etag"), entry.headers.get("last-modified")
+
+
+http_cache = HttpCache()
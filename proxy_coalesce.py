@@ -0,0 +1,185 @@
+# utils/proxy_coalesce.py
+"""
+Single-flight for proxied GETs: concurrent requests with the same method, target and
+response-affecting headers share one upstream request. A pump task reads the upstream body
+into a bounded chunk buffer that each attached caller drains at its own pace. Callers can
+join until the first chunk has to leave the buffer; after that a new caller starts its own flight.
+"""
+import asyncio, hashlib, os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional
+import httpx
+
+ENABLED = os.getenv("PROXY_COALESCE", "true").lower() != "false"
+BUFFER_BYTES = int(float(os.getenv("PROXY_COALESCE_BUFFER_KB", "1024")) * 2**10)
+
+# per-request noise that must not split otherwise identical upstream requests
+_IGNORED_HEADERS = {"x-forwarded-for", "x-forwarded-proto", "x-forwarded-host", "traceparent", "tracestate",
+                    "x-request-id", "x-correlation-id", "user-agent", "content-length"}
+
+
+def flight_key(method: str, target: str, headers: Mapping[str, str]) -> str:
+    relevant = sorted((k.lower(), v) for k, v in headers.items() if k.lower() not in _IGNORED_HEADERS)
+    return f"{method} {target} " + hashlib.sha256(repr(relevant).encode()).hexdigest()[:16]
+
+
+class _Flight:
+    def __init__(self, owner: "Coalescer", key: Optional[str], max_buffer: int):
+        self.owner, self.key, self.max_buffer = owner, key, max_buffer
+        self.response: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.response.add_done_callback(lambda f: f.cancelled() or f.exception())  # may have no waiter left
+        self.chunks: List[bytes] = []
+        self.base = 0  # absolute index of chunks[0]
+        self.buffered = 0
+        self.positions: Dict[int, int] = {}  # reader -> next absolute chunk index
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.claimed = False
+        self.changed = asyncio.Condition()
+        self._readers = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def joinable(self) -> bool:
+        return self.base == 0 and self.error is None and bool(self.positions)
+
+    def start(self, send: Callable[[], Awaitable[httpx.Response]], release: Callable[[httpx.Response], Awaitable[Any]]):
+        self._task = asyncio.ensure_future(self._pump(send, release))
+
+    def attach(self) -> int:
+        self._readers += 1
+        self.positions[self._readers] = self.base
+        return self._readers
+
+    def detach(self, reader: int):
+        # sync so it can run from a cancelled caller; the pump is woken separately
+        if self.positions.pop(reader, None) is not None and not self.done:
+            asyncio.ensure_future(self._wake())
+
+    async def _wake(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    def _trim(self) -> bool:
+        """Drop chunks every reader has consumed; the flight stops being joinable."""
+        low = min(self.positions.values(), default=self.base + len(self.chunks))
+        n = low - self.base
+        if n <= 0: return False
+        self.buffered -= sum(len(c) for c in self.chunks[:n])
+        del self.chunks[:n]
+        self.base = low
+        return True
+
+    async def _pump(self, send, release):
+        try:
+            resp = await send()
+        except Exception as e:
+            self.error = e
+            self.response.set_exception(e)
+            self._finish()
+            return
+        self.response.set_result((resp.status_code, resp.headers))
+        try:
+            async for chunk in resp.aiter_raw():  # content-coding untouched
+                async with self.changed:
+                    # backpressure: wait for the slowest reader once the buffer is full
+                    while self.positions and self.buffered >= self.max_buffer and not self._trim():
+                        await self.changed.wait()
+                    if not self.positions:
+                        break  # every caller went away
+                    self.chunks.append(chunk)
+                    self.buffered += len(chunk)
+                    self.changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self.changed:
+                self._finish()
+                self.changed.notify_all()
+            await release(resp)
+
+    def _finish(self):
+        self.done = True
+        self.owner._forget(self)
+
+
+class SharedResponse:
+    """One caller's view of a flight: status, headers and its own cursor over the body."""
+
+    def __init__(self, flight: _Flight, reader: int, status_code: int, headers: httpx.Headers):
+        self._flight, self._reader = flight, reader
+        self.status_code, self.headers = status_code, headers
+
+    async def aiter_raw(self) -> AsyncIterator[bytes]:
+        f = self._flight
+        try:
+            while True:
+                async with f.changed:
+                    pos = f.positions.get(self._reader)
+                    if pos is None: return
+                    while pos >= f.base + len(f.chunks) and not f.done:
+                        await f.changed.wait()
+                    if pos < f.base + len(f.chunks):
+                        chunk = f.chunks[pos - f.base]
+                        f.positions[self._reader] = pos + 1
+                        f.changed.notify_all()
+                    elif f.error is not None:
+                        raise f.error
+                    else:
+                        return
+                yield chunk
+        finally:
+            f.detach(self._reader)  # also when the caller disconnects mid-body
+
+    async def aclose(self):
+        self._flight.detach(self._reader)
+
+    def claim(self) -> bool:
+        """True for the first caller of the flight to ask, so per-response work (storing it) runs once."""
+        if self._flight.claimed:
+            return False
+        self._flight.claimed = True
+        return True
+
+
+class Coalescer:
+    def __init__(self, max_buffer: int = BUFFER_BYTES, enabled: bool = ENABLED):
+        self.max_buffer, self.enabled = max_buffer, enabled
+        self._inflight: Dict[str, _Flight] = {}
+        self.flights = self.coalesced = self.too_late = 0
+
+    async def fetch(self, key: Optional[str], send: Callable[[], Awaitable[httpx.Response]],
+                    release: Callable[[httpx.Response], Awaitable[Any]]) -> SharedResponse:
+        """
+        Join the in-flight request for `key` or start one with `send` (released with `release`
+        when the body is done). `key=None` never shares. Exceptions from `send` reach every caller.
+        """
+        key = key if self.enabled else None
+        flight = self._inflight.get(key) if key is not None else None
+        if flight is not None and flight.joinable:
+            self.coalesced += 1
+        else:
+            if flight is not None:
+                self.too_late += 1
+            flight = _Flight(self, key, self.max_buffer)
+            self.flights += 1
+            if key is not None:
+                self._inflight[key] = flight
+            flight.start(send, release)
+        reader = flight.attach()
+        try:
+            status, headers = await asyncio.shield(flight.response)
+        except BaseException:
+            flight.detach(reader)
+            raise
+        return SharedResponse(flight, reader, status, headers)
+
+    def _forget(self, flight: _Flight):
+        if flight.key is not None and self._inflight.get(flight.key) is flight:
+            del self._inflight[flight.key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"enabled": self.enabled, "inflight": len(self._inflight), "upstream_requests": self.flights,
+                "coalesced": self.coalesced, "too_late": self.too_late}
+
+
+coalescer = Coalescer()
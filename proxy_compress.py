@@ -0,0 +1,170 @@
+# utils/proxy_compress.py
+"""
+Content-coding for the proxier. Upstream bodies are forwarded exactly as received (an upstream
+gzip/br/zstd body is never decoded and re-encoded), so the Accept-Encoding sent upstream is
+narrowed to what the caller itself accepts. Optionally, large uncompressed JSON/text is
+compressed on the way out for callers that accept it, within a CPU-time budget.
+"""
+from typing import AsyncIterator, Callable, Dict, Mapping, Optional, Tuple
+import os, time, zlib
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+def _list_env(name: str, default: str):
+    return [s.strip().lower() for s in os.getenv(name, default).split(",") if s.strip()]
+
+
+# codings the upstream may send back untouched
+UPSTREAM_ENCODINGS = _list_env("PROXY_UPSTREAM_ENCODINGS", "gzip,br,zstd,deflate")
+# recompression of uncompressed upstream bodies
+COMPRESS = os.getenv("PROXY_COMPRESS", "false").lower() == "true"
+COMPRESS_ENCODINGS = _list_env("PROXY_COMPRESS_ENCODINGS", "zstd,br,gzip")  # server preference
+COMPRESS_MIN_BYTES = int(os.getenv("PROXY_COMPRESS_MIN_BYTES", "8192"))
+COMPRESS_TYPES = _list_env("PROXY_COMPRESS_TYPES", "application/json,application/problem+json,text/")
+COMPRESS_CPU_BUDGET = float(os.getenv("PROXY_COMPRESS_CPU_BUDGET", "0.2"))  # fraction of one core
+LEVELS = {"gzip": int(os.getenv("PROXY_COMPRESS_GZIP_LEVEL", "5")),
+          "br": int(os.getenv("PROXY_COMPRESS_BR_LEVEL", "4")),
+          "zstd": int(os.getenv("PROXY_COMPRESS_ZSTD_LEVEL", "3"))}
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}, without q=0 entries."""
+    out: Dict[str, float] = {}
+    for part in (header or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding: continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            out[coding.strip()] = q
+    return out
+
+
+def upstream_accept_encoding(caller_header: Optional[str]) -> str:
+    """What to ask the upstream for: only codings the caller accepts, else identity."""
+    accepted = accepted_encodings(caller_header)
+    codings = [c for c in UPSTREAM_ENCODINGS if c in accepted or "*" in accepted]
+    return ", ".join(codings) or "identity"
+
+
+def _available(coding: str) -> bool:
+    return coding == "gzip" or (coding == "br" and brotli is not None) or (coding == "zstd" and zstandard is not None)
+
+
+def _encoder(coding: str) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    if coding == "br":
+        c = brotli.Compressor(quality=LEVELS["br"])
+        return c.process, c.finish
+    if coding == "zstd":
+        c = zstandard.ZstdCompressor(level=LEVELS["zstd"]).compressobj()
+        return c.compress, c.flush
+    c = zlib.compressobj(LEVELS["gzip"], zlib.DEFLATED, 31)  # gzip container
+    return c.compress, c.flush
+
+
+class _CpuBudget:
+    """Seconds of compression allowed per one-second window."""
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self._window = 0
+        self._spent = 0.0
+        self.spent_total = 0.0
+
+    def _roll(self):
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window, self._spent = window, 0.0
+
+    def available(self) -> bool:
+        self._roll()
+        return self._spent < self.fraction
+
+    def charge(self, seconds: float):
+        self._roll()
+        self._spent += seconds
+        self.spent_total += seconds
+
+
+budget = _CpuBudget(COMPRESS_CPU_BUDGET)
+_counters = {"compressed": 0, "skipped_cpu_budget": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def choose_encoding(request_headers: Mapping[str, str], method: str, status: int,
+                    headers: Mapping[str, str], size: Optional[int]) -> Optional[str]:
+    """The coding to compress this response with, or None to forward it as is."""
+    if not COMPRESS or method == "HEAD" or status in (204, 206, 304) or status < 200:
+        return None
+    if headers.get("content-encoding") or "no-transform" in headers.get("cache-control", "").lower():
+        return None
+    ctype = headers.get("content-type", "").lower()
+    if not any(ctype.startswith(t) for t in COMPRESS_TYPES):
+        return None
+    if size is None and headers.get("content-length", "").isdigit():
+        size = int(headers["content-length"])
+    if size is not None and size < COMPRESS_MIN_BYTES:
+        return None
+    accepted = accepted_encodings(request_headers.get("accept-encoding"))
+    candidates = [c for c in COMPRESS_ENCODINGS if c in accepted and _available(c)]
+    if not candidates:
+        return None
+    if not budget.available():
+        _counters["skipped_cpu_budget"] += 1
+        return None
+    return max(candidates, key=lambda c: accepted[c])  # ties keep server preference order
+
+
+def compressed_headers(headers: Mapping[str, str], coding: str) -> Dict[str, str]:
+    out = {k: v for k, v in headers.items() if k.lower() != "content-length"}
+    out["content-encoding"] = coding
+    vary = [v.strip() for v in out.get("vary", "").split(",") if v.strip()]
+    if "accept-encoding" not in (v.lower() for v in vary):
+        out["vary"] = ", ".join(vary + ["Accept-Encoding"])
+    etag = out.get("etag")
+    if etag and not etag.startswith("W/"):
+        out["etag"] = f"W/{etag}"  # the bytes differ from the upstream representation
+    return out
+
+
+async def compress_stream(body: AsyncIterator[bytes], coding: str) -> AsyncIterator[bytes]:
+    compress, flush = _encoder(coding)
+    _counters["compressed"] += 1
+    async for chunk in body:
+        t0 = time.perf_counter()
+        out = compress(chunk)
+        budget.charge(time.perf_counter() - t0)
+        _counters["bytes_in"] += len(chunk)
+        _counters["bytes_out"] += len(out)
+        if out:
+            yield out
+    t0 = time.perf_counter()
+    tail = flush()
+    budget.charge(time.perf_counter() - t0)
+    _counters["bytes_out"] += len(tail)
+    if tail:
+        yield tail
+
+
+def maybe_compress(request_headers: Mapping[str, str], method: str, status: int, headers: Mapping[str, str],
+                   body: AsyncIterator[bytes], size: Optional[int] = None) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    coding = choose_encoding(request_headers, method, status, headers, size)
+    if coding is None:
+        return dict(headers), body
+    return compressed_headers(headers, coding), compress_stream(body, coding)
+
+
+def compression_stats() -> Dict[str, object]:
+    return {"enabled": COMPRESS, "encodings": [c for c in COMPRESS_ENCODINGS if _available(c)], **_counters,
+            "cpu_seconds": round(budget.spent_total, 3)}
@@ -0,0 +1,146 @@
+# utils/proxy_pools.py
+"""
+One httpx client per connector for the proxier, so a slow upstream can only exhaust
+its own connections. Settings come from the connector's UpstreamInfo when it carries
+them, else PROXY_<CONNECTOR>_<SETTING>, else the global PROXY_<SETTING>.
+"""
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+import os, httpx
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (httpx[http2] extra)
+        return True
+    except ImportError:
+        return False
+
+
+def _bool(v: Any) -> bool:
+    return str(v).lower() not in ("false", "0", "no")
+
+
+_CAST = {int: int, float: float, bool: _bool}
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    max_connections: int = 200
+    max_keepalive: int = 100
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    write_timeout: float = 60.0
+    pool_timeout: float = 2.0  # max wait for a free connection before answering 503
+    http2: bool = False
+    ca_bundle: Optional[str] = None
+    verify_ssl: bool = True
+
+    @staticmethod
+    def resolve(connector: str, up: Any) -> "PoolSettings":
+        return resolve_settings(PoolSettings, connector, up)
+
+
+def resolve_settings(cls: Any, connector: str, up: Any, group: str = "") -> Any:
+    """
+    Build the settings dataclass `cls` for a connector: UpstreamInfo attribute `<group_><field>`,
+    else env PROXY_<CONNECTOR>_<GROUP_><FIELD>, else PROXY_<GROUP_><FIELD>, else the default.
+    """
+    scope = f"{group}_" if group else ""
+    prefix = f"PROXY_{connector.upper().replace('-', '_')}_"
+    values: Dict[str, Any] = {}
+    for f in fields(cls):
+        name = scope + f.name
+        v = getattr(up, name, None)
+        if v is None:
+            raw = os.getenv(prefix + name.upper()) or os.getenv("PROXY_" + name.upper())
+            if raw:
+                v = raw if f.default is None else _CAST[type(f.default)](raw)
+        if v is not None:
+            values[f.name] = v
+    return cls(**values)
+
+
+class UpstreamPool:
+    """
+    A connector's client plus saturation counters. `active` counts requests from send until
+    the response is released; beyond max_connections they are queued inside httpx, and a queue
+    wait longer than pool_timeout raises httpx.PoolTimeout (the proxier answers 503).
+    """
+
+    def __init__(self, connector: str, settings: PoolSettings):
+        self.connector, self.settings = connector, settings
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=settings.connect_timeout, read=settings.read_timeout,
+                                  write=settings.write_timeout, pool=settings.pool_timeout),
+            limits=httpx.Limits(max_connections=settings.max_connections,
+                                max_keepalive_connections=settings.max_keepalive),
+            verify=settings.ca_bundle or settings.verify_ssl,
+            http2=settings.http2 and _http2_available(),
+            follow_redirects=False,
+        )
+        self.active = self.peak_active = 0
+        self.requests = self.pool_timeouts = 0
+
+    async def send(self, request: httpx.Request, *, stream: bool = False) -> httpx.Response:
+        """Send on this pool; a streamed response must be handed back via release()."""
+        self.requests += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        held = False
+        try:
+            resp = await self.client.send(request, stream=stream)
+            held = stream
+            return resp
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        finally:
+            if not held:
+                self.active -= 1
+
+    async def release(self, resp: httpx.Response):
+        try:
+            await resp.aclose()
+        finally:
+            self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        s = self.settings
+        conns = list(getattr(getattr(self.client._transport, "_pool", None), "connections", None) or [])
+        return {
+            "http2": s.http2 and _http2_available(),
+            "max_connections": s.max_connections,
+            "pool_timeout_sec": s.pool_timeout,
+            "active": self.active,
+            "peak_active": self.peak_active,
+            # HTTP/1.1 estimate: requests beyond max_connections are waiting for a connection
+            "queued": max(0, self.active - s.max_connections),
+            "saturation": round(self.active / s.max_connections, 3),
+            "connections": len(conns),
+            "idle_connections": sum(1 for c in conns if c.is_idle()),
+            "requests": self.requests,
+            "pool_timeouts": self.pool_timeouts,
+        }
+
+
+_pools: Dict[str, UpstreamPool] = {}
+
+
+def pool_for(connector: str, up: Any) -> UpstreamPool:
+    """The connector's pool, created on first use (targets are absolute, so base_url changes need no rebuild)."""
+    pool = _pools.get(connector)
+    if pool is None:
+        pool = _pools[connector] = UpstreamPool(connector, PoolSettings.resolve(connector, up))
+    return pool
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: p.stats() for name, p in _pools.items()}
+
+
+async def close_pools():
+    pools = list(_pools.values())
+    _pools.clear()
+    for p in pools:
+        await p.client.aclose()
@@ -0,0 +1,324 @@
+# utils/proxy_ratelimit.py
+"""
+Admission control for the proxier. Each request takes a token from its caller's bucket and
+from the connector's bucket (429 / 503 with Retry-After when empty), then waits for one of the
+connector's `max_concurrent` upstream slots in a bounded queue that serves callers round-robin,
+so one busy caller cannot starve the others. Buckets live in process memory, or with
+PROXY_RATE_SHARED_DIR in small lock-protected files shared by every worker on the host
+(files of buckets that have refilled are swept); the queue is always per worker.
+Off unless PROXY_RATE_ENABLED (or the connector's rate_enabled) is set: behind a load balancer
+unauthenticated callers are told apart only with PROXY_RATE_TRUSTED_PROXIES.
+"""
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+import asyncio, fcntl, hashlib, math, os, struct, time
+
+from utils.proxy_pools import resolve_settings
+
+_MAX_CALLERS = 10_000  # in-process caller buckets kept (LRU); an evicted caller starts with a full bucket
+_WAIT_SAMPLES = 1024
+_SWEEP_INTERVAL = 60.0  # seconds between sweeps of a shared bucket directory
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    enabled: bool = False
+    caller_rate: float = 20.0         # requests/s per caller (0: unlimited)
+    caller_burst: float = 40.0
+    connector_rate: float = 0.0       # requests/s across all callers (0: unlimited)
+    connector_burst: float = 200.0
+    max_concurrent: int = 100         # requests in flight to the upstream
+    queue_size: int = 200             # requests waiting for a slot
+    caller_queue: int = 20            # of which from one caller
+    queue_timeout: float = 5.0        # max wait for a slot before answering 503
+    caller_header: Optional[str] = None  # header naming the caller (set by a trusted gateway), else the authenticated user / IP
+    trusted_proxies: int = 0          # proxies in front that append to X-Forwarded-For; the client IP is read past them
+    shared_dir: Optional[str] = None  # share the buckets between workers through files here
+
+
+class Rejected(Exception):
+    """Not admitted; answer `status` with Retry-After `retry_after` seconds."""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status, self.reason, self.retry_after = status, reason, retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, max(burst, 1.0)
+        self.tokens, self.stamp = self.burst, time.monotonic()
+
+    def take(self) -> float:
+        """0 when a token was taken, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1.0)
+
+
+class FileTokenBucket:
+    """The same bucket kept in a 32-byte file under flock, so all workers draw from it."""
+
+    _STATE = struct.Struct("dddd")  # tokens, wall-clock stamp, rate, burst (the sweep needs the last two)
+
+    def __init__(self, directory: str, key: str, rate: float, burst: float):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:16] + ".bucket")
+        self.rate, self.burst = rate, max(burst, 1.0)
+
+    def _update(self, delta: float) -> float:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            now = time.time()
+            raw = os.pread(fd, self._STATE.size, 0)
+            tokens, stamp = self._STATE.unpack(raw)[:2] if len(raw) == self._STATE.size else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - stamp) * self.rate)
+            wait = 0.0
+            if tokens + delta >= 0.0:
+                tokens = min(self.burst, tokens + delta)
+            else:
+                wait = (-delta - tokens) / self.rate
+            os.pwrite(fd, self._STATE.pack(tokens, now, self.rate, self.burst), 0)
+            return wait
+        finally:
+            os.close(fd)  # also drops the lock
+
+    def take(self) -> float:
+        return self._update(-1.0)
+
+    def refund(self):
+        self._update(1.0)
+
+
+def sweep_buckets(directory: str) -> int:
+    """
+    Remove bucket files that have refilled: a missing file reads as a full bucket, so
+    nothing changes for their callers. Returns the number removed.
+    """
+    removed, now = 0, time.time()
+    try:
+        names = [e.name for e in os.scandir(directory) if e.name.endswith(".bucket")]
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except OSError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, FileTokenBucket._STATE.size, 0)
+            if len(raw) == FileTokenBucket._STATE.size:
+                tokens, stamp, rate, burst = FileTokenBucket._STATE.unpack(raw)
+                if tokens + max(0.0, now - stamp) * rate < burst:
+                    continue
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    return removed
+
+
+class FairQueue:
+    """
+    At most `limit` holders; waiters are queued per caller and a freed slot goes to the next
+    caller in round-robin order. `acquire` raises Rejected when the queue is full or the wait
+    exceeds `timeout`; every successful acquire must be paired with release().
+    """
+
+    def __init__(self, limit: int, size: int, per_caller: int, timeout: float):
+        self.limit, self.size, self.per_caller, self.timeout = limit, size, per_caller, timeout
+        self.active = self.queued = self.peak_queued = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.waited = 0
+        self.wait_total = self.wait_max = 0.0
+        self.queue_full = self.queue_timeouts = 0
+
+    async def acquire(self, caller: str):
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            self._record(0.0)
+            return
+        mine = self._waiters.get(caller)
+        if self.queued >= self.size or (mine is not None and len(mine) >= self.per_caller):
+            self.queue_full += 1
+            raise Rejected(503, "queue full", self.timeout)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(caller, deque()).append(fut)
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                self.release()  # the slot arrived as we gave up; pass it on
+            else:
+                fut.cancel()
+                self._discard(caller, fut)
+            if isinstance(e, asyncio.TimeoutError):
+                self.queue_timeouts += 1
+                raise Rejected(503, "queue timeout", self.timeout)
+            raise
+        finally:
+            self._record(time.monotonic() - t0)
+
+    def _discard(self, caller: str, fut: asyncio.Future):
+        waiters = self._waiters.get(caller)
+        if waiters is not None and fut in waiters:
+            waiters.remove(fut)
+            self.queued -= 1
+            if not waiters:
+                del self._waiters[caller]
+
+    def release(self):
+        """Hand the slot to the next caller in turn, or free it."""
+        while self._waiters:
+            caller, waiters = next(iter(self._waiters.items()))
+            fut = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._waiters.move_to_end(caller)  # round-robin: this caller goes to the back
+            else:
+                del self._waiters[caller]
+            if not fut.done():
+                fut.set_result(None)  # `active` is unchanged: the slot moves to the waiter
+                return
+        self.active -= 1
+
+    def _record(self, wait: float):
+        self.waits.append(wait)
+        self.waited += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+        pct = lambda p: round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+        return {"active": self.active, "limit": self.limit, "queued": self.queued, "peak_queued": self.peak_queued,
+                "callers_waiting": len(self._waiters), "queue_size": self.size, "queue_full": self.queue_full,
+                "queue_timeouts": self.queue_timeouts, "waited": self.waited,
+                "wait_ms_avg": round(self.wait_total / self.waited * 1000, 1) if self.waited else 0.0,
+                "wait_ms_p50": pct(0.50), "wait_ms_p95": pct(0.95), "wait_ms_max": round(self.wait_max * 1000, 1)}
+
+
+class Admission:
+    """One connector's buckets and queue."""
+
+    def __init__(self, connector: str, policy: RatePolicy):
+        self.connector, self.policy = connector, policy
+        self.queue = FairQueue(policy.max_concurrent, policy.queue_size, policy.caller_queue, policy.queue_timeout)
+        self._connector_bucket = self._bucket(f"{connector} *", policy.connector_rate, policy.connector_burst)
+        self._callers: "OrderedDict[str, Any]" = OrderedDict()
+        self._swept_at = time.monotonic()
+        self.admitted = self.limited_caller = self.limited_connector = self.swept = 0
+
+    def _bucket(self, key: str, rate: float, burst: float) -> Optional[Any]:
+        if rate <= 0:
+            return None
+        if self.policy.shared_dir:
+            return FileTokenBucket(self.policy.shared_dir, key, rate, burst)
+        return TokenBucket(rate, burst)
+
+    def _caller_bucket(self, caller: str) -> Optional[Any]:
+        if self.policy.caller_rate <= 0:
+            return None
+        bucket = self._callers.get(caller)
+        if bucket is None:
+            if self.policy.shared_dir and time.monotonic() - self._swept_at >= _SWEEP_INTERVAL:
+                self._swept_at = time.monotonic()  # a new caller adds a file: drop the ones no longer needed
+                self.swept += sweep_buckets(self.policy.shared_dir)
+            bucket = self._callers[caller] = self._bucket(f"{self.connector} {caller}", self.policy.caller_rate,
+                                                          self.policy.caller_burst)
+            if len(self._callers) > _MAX_CALLERS:
+                self._callers.popitem(last=False)
+        else:
+            self._callers.move_to_end(caller)
+        return bucket
+
+    async def acquire(self, caller: str):
+        """Take the caller's and the connector's tokens, then wait for a slot (raises Rejected)."""
+        if not self.policy.enabled:
+            return
+        caller_bucket = self._caller_bucket(caller)
+        wait = caller_bucket.take() if caller_bucket is not None else 0.0
+        if wait:
+            self.limited_caller += 1
+            raise Rejected(429, "caller rate limit", wait)
+        wait = self._connector_bucket.take() if self._connector_bucket is not None else 0.0
+        if wait:
+            if caller_bucket is not None:
+                caller_bucket.refund()  # the caller did not get through
+            self.limited_connector += 1
+            raise Rejected(503, "connector rate limit", wait)
+        await self.queue.acquire(caller)
+        self.admitted += 1
+
+    def release(self):
+        if self.policy.enabled:
+            self.queue.release()
+
+    def stats(self) -> Dict[str, Any]:
+        p = self.policy
+        return {"enabled": p.enabled, "shared": bool(p.shared_dir), "caller_rate": p.caller_rate,
+                "connector_rate": p.connector_rate, "admitted": self.admitted, "limited_caller": self.limited_caller,
+                "limited_connector": self.limited_connector, "callers": len(self._callers), "swept": self.swept,
+                **self.queue.stats()}
+
+
+def client_ip(request: Any, trusted_proxies: int) -> str:
+    """
+    The peer address, or with `trusted_proxies` hops in front the X-Forwarded-For entry the
+    outermost trusted proxy saw; entries left of it are caller-supplied and ignored.
+    """
+    peer = request.client.host if request.client else "-"
+    if trusted_proxies <= 0:
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    # fewer hops than trusted proxies: the leftmost one may be the caller's own, so it is not trusted
+    return hops[-trusted_proxies] if len(hops) >= trusted_proxies else peer
+
+
+def caller_identity(request: Any, policy: RatePolicy) -> str:
+    """
+    The configured header, else the authenticated subject, else the client IP. Unverified
+    credentials are never a key: a caller could send a new one per request for a fresh bucket.
+    """
+    if policy.caller_header and request.headers.get(policy.caller_header):
+        return f"h:{request.headers[policy.caller_header]}"
+    user = getattr(request.state, "user", None)
+    if isinstance(user, dict) and user.get("sub"):
+        return f"u:{user['sub']}"
+    return f"ip:{client_ip(request, policy.trusted_proxies)}"
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+_admissions: Dict[str, Admission] = {}
+
+
+def admission_for(connector: str, up: Any) -> Admission:
+    """UpstreamInfo `rate_<field>`, else PROXY_<CONNECTOR>_RATE_<FIELD>, else PROXY_RATE_<FIELD>."""
+    admission = _admissions.get(connector)
+    if admission is None:
+        admission = _admissions[connector] = Admission(connector, resolve_settings(RatePolicy, connector, up, group="rate"))
+    return admission
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: a.stats() for name, a in _admissions.items()}
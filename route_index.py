@@ -0,0 +1,134 @@
+# utils/route_index.py
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from starlette.types import Receive, Scope, Send
+
+try:
+    from starlette._utils import get_route_path
+except ImportError:  # older starlette: no root_path stripping helper
+    def get_route_path(scope: Scope) -> str:
+        return scope["path"]
+
+# `{name}` or `{name:str|int|float|uuid}` filling a whole segment; `{x:path}` spans segments and is not indexable
+_PARAM_SEGMENT = re.compile(r"^\{[a-zA-Z_][a-zA-Z0-9_]*(:(str|int|float|uuid))?\}$")
+
+
+def _skip(scope: Scope) -> Tuple[Match, Scope]:
+    return Match.NONE, {}
+
+
+class _Node:
+    __slots__ = ("children", "param", "routes")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Node] = {}
+        self.param: Optional[_Node] = None
+        self.routes: List[BaseRoute] = []
+
+
+class RouteIndex(BaseRoute):
+    """
+    Resolves a family of routes through a path-segment trie instead of Starlette's
+    linear regex scan: lookup cost follows the path length, not the route count.
+    Literal segments are preferred over `{param}` segments; the matched route's own
+    `matches()` then runs once to convert params and check the method (405 stays PARTIAL).
+
+    Indexed routes stay in the router's list so OpenAPI still documents them, but
+    their linear matching is switched off. Build it with `index_routes`.
+    """
+
+    def __init__(self, name: str = "route_index") -> None:
+        self.root = _Node()
+        self.routes: List[BaseRoute] = []
+        self.include_in_schema = False
+        self.name = name
+        self.path = None  # include_router skips it and copies the indexed routes as plain ones
+
+    @staticmethod
+    def indexable(route: BaseRoute) -> bool:
+        path = getattr(route, "path", None)
+        if not path or not hasattr(route, "path_regex"):
+            return False
+        return all("{" not in seg or _PARAM_SEGMENT.match(seg) for seg in path.split("/")[1:])
+
+    def add(self, route: BaseRoute) -> None:
+        node = self.root
+        for seg in route.path.split("/")[1:]:
+            if seg.startswith("{"):
+                node.param = node.param or _Node()
+                node = node.param
+            else:
+                node = node.children.setdefault(seg, _Node())
+        node.routes.append(route)
+        self.routes.append(route)
+        route.matches = _skip  # linear scan skips it; the index calls the class' matches
+
+    def _candidates(self, node: _Node, segs: List[str], i: int) -> Iterator[List[BaseRoute]]:
+        if i == len(segs):
+            if node.routes:
+                yield node.routes
+            return
+        child = node.children.get(segs[i])
+        if child is not None:
+            yield from self._candidates(child, segs, i + 1)
+        if node.param is not None and segs[i]:
+            yield from self._candidates(node.param, segs, i + 1)
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if scope["type"] != "http":
+            return Match.NONE, {}
+        partial: Optional[Tuple[Match, Scope]] = None
+        for routes in self._candidates(self.root, get_route_path(scope).split("/")[1:], 0):
+            for route in routes:
+                match, child_scope = type(route).matches(route, scope)
+                if match == Match.NONE:
+                    continue
+                child_scope["route"] = route
+                if match == Match.FULL:
+                    return match, child_scope
+                partial = partial or (match, child_scope)
+        return partial or (Match.NONE, {})
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await scope["route"].handle(scope, receive, send)
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        for route in self.routes:
+            try:
+                return route.url_path_for(name, **path_params)
+            except NoMatchFound:
+                pass
+        raise NoMatchFound(name, path_params)
+
+
+def index_routes(routes: List[BaseRoute], predicate: Callable[[BaseRoute], bool],
+                 name: str = "route_index") -> List[BaseRoute]:
+    """
+    Return a new route list where the routes selected by `predicate` resolve through one
+    RouteIndex called `name`, inserted at the position of the first of them. Safe to re-run on a
+    list it produced: only the previous index of the same name is dropped, so route families
+    sharing a router each keep their own; routes the trie cannot express keep linear matching.
+    Assign the result in one step (`router.routes = index_routes(...)`) so in-flight requests are unaffected.
+    """
+    index = RouteIndex(name)
+    # routes held by another family's index stay with it
+    owned = {id(route) for other in routes if isinstance(other, RouteIndex) and other.name != name
+             for route in other.routes}
+    out: List[BaseRoute] = []
+    for route in routes:
+        if isinstance(route, RouteIndex):
+            if route.name != name:
+                out.append(route)
+            continue
+        if id(route) not in owned:
+            route.__dict__.pop("matches", None)
+            if predicate(route) and RouteIndex.indexable(route):
+                if not index.routes:
+                    out.append(index)
+                index.add(route)
+        out.append(route)
+    return out
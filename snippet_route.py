@@ -1,14 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
 from typing import Any, Dict, Optional, Tuple, List
 
-from fastapi import APIRouter, Depends, Request
-from pydantic import BaseModel, Field, create_model
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field, ValidationError, create_model
 
 from srehubapp.modulebricks.landlord_brick import LandlordBrick
+from srehubapp.utils.model_cache import ModelCache, spec_key
+from srehubapp.utils.route_index import index_routes
+
+log = logging.getLogger("srehub.landlord")
 
 brick = LandlordBrick()
 router = APIRouter(tags=["landlord"])
+# one pooled Landlord client for the app's lifetime
+router.add_event_handler("startup", brick.start)
+router.add_event_handler("shutdown", brick.close)
+
+# Identical query-param sets share one model; LANDLORD_LAZY_MODELS defers building to the first request
+_models = ModelCache("landlord")
+router.add_event_handler("shutdown", _models.save)
+LAZY_MODELS = os.getenv("LANDLORD_LAZY_MODELS", "false").lower() == "true"
+ROUTES_REFRESH_SEC = float(os.getenv("LANDLORD_ROUTES_REFRESH_SEC", "300"))
 
 # -------------------------
 # Helpers: OAS2 → Pydantic
@@ -32,19 +50,12 @@ def _field_default(param: Dict[str, Any]):
         return param["default"]
     return ... if param.get("required") else None
 
-def build_param_model_from_oas(parameters: Optional[list], *, name: str) -> Optional[type[BaseModel]]:
-    """
-    Build a Pydantic model for **query** params from OAS2 'parameters'.
-    (Path params are handled via request.path_params; we don't need to
-    declare them explicitly in the function signature.)
-    """
-    if not parameters:
-        return None
+def _query_params(parameters: Optional[list]) -> list:
+    return [p for p in (parameters or []) if p.get("in") == "query"]
 
+def _build_param_model(params: list, key: str) -> type[BaseModel]:
     fields: Dict[str, Tuple[type, Field]] = {}
-    for par in parameters:
-        if par.get("in") != "query":
-            continue
+    for par in params:
         py_t = _py_type(par)
         default = _field_default(par)
         fkw: Dict[str, Any] = {"description": par.get("description")}
@@ -52,11 +63,40 @@ def build_param_model_from_oas(parameters: Optional[list], *, name: str) -> Opti
             # Keep enum visible in docs; validation can be tightened later
             fkw["json_schema_extra"] = {"enum": par["enum"]}
         fields[par["name"]] = (py_t, Field(default, **fkw))
+    # named by content hash: the model is shared by every path with these params
+    return create_model(f"Params_{key[:12]}", **fields)  # type: ignore
 
-    if not fields:
+def build_param_model_from_oas(parameters: Optional[list], *, name: str) -> Optional[type[BaseModel]]:
+    """
+    Build a Pydantic model for **query** params from OAS2 'parameters'.
+    (Path params are handled via request.path_params; we don't need to
+    declare them explicitly in the function signature.)
+    Models are cached by content hash, so identical parameter sets share one,
+    named after the hash rather than `name`.
+    """
+    params = _query_params(parameters)
+    if not params:
         return None
+    key = spec_key(params)
+    return _models.get_or_build(key, lambda: _build_param_model(params, key))
 
-    return create_model(f"{name}Params", **fields)  # type: ignore
+def _openapi_query_params(params: list, key: str) -> list:
+    """Docs for lazy routes: persisted model schema when available, else the raw OAS2 param."""
+    props = (_models.schema(key) or {}).get("properties", {})
+    out = []
+    for p in params:
+        schema = props.get(p["name"]) or {k: p[k] for k in ("type", "items", "enum", "default", "format") if k in p}
+        out.append({"name": p["name"], "in": "query", "required": bool(p.get("required")),
+                    "description": p.get("description"), "schema": schema})
+    return out
+
+def _query_dict(request: Request, Model: type[BaseModel]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for k in request.query_params.keys():
+        field = Model.model_fields.get(k)
+        vals = request.query_params.getlist(k)
+        out[k] = vals if field is not None and getattr(field.annotation, "__origin__", None) is list else vals[-1]
+    return out
 
 
 # -------------------------
@@ -71,52 +111,157 @@ async def get_clusters(datacenter_name: str):
 # ---------------------------------------
 # Dynamically add GET routes from upstream
 # ---------------------------------------
-async def add_dynamic_routes():
-    remote_spec = await brick.fetch_remote_get_paths()
-    paths = remote_spec.get("paths", {})
+_DYNAMIC_NAME = "landlord_dynamic"
+# fastapi path -> (operation hash, route); lets a refresh rebuild only what changed
+_dynamic: Dict[str, Tuple[str, APIRoute]] = {}
+_spec_etag: Optional[str] = None
+_spec_digest: Optional[str] = None
+_synced: Optional[Tuple[APIRouter, str]] = None  # router and prefix the routes were last swapped into
+_refresher: Optional[asyncio.Task] = None
+
 
-    def make_dynamic_get(upstream_path: str, ParamModel: Optional[type[BaseModel]]):
-        if ParamModel:
-            async def dynamic_get(params: ParamModel = Depends(), request: Request = None):  # type: ignore
-                # Query params (validated)
-                q = {k: v for k, v in params.dict(exclude_none=True).items()}
-                # Path params from FastAPI
-                if request:
-                    q.update(request.path_params or {})
-                    headers = dict(request.headers)
-                else:
-                    headers = {}
-                return await brick.proxy_get(upstream_path.lstrip("/"), q, headers)
-        else:
-            async def dynamic_get(request: Request):
-                q = dict(request.query_params)
+def _make_dynamic_get(upstream_path: str, ParamModel: Optional[type[BaseModel]]):
+    if ParamModel:
+        async def dynamic_get(params: BaseModel = Depends(ParamModel), request: Request = None):
+            # Query params (validated)
+            q = {k: v for k, v in params.dict(exclude_none=True).items()}
+            # Path params from FastAPI
+            if request:
                 q.update(request.path_params or {})
                 headers = dict(request.headers)
-                return await brick.proxy_get(upstream_path.lstrip("/"), q, headers)
-        return dynamic_get
+            else:
+                headers = {}
+            return await brick.proxy_get(upstream_path.lstrip("/"), q, headers)
+    else:
+        async def dynamic_get(request: Request):
+            q = dict(request.query_params)
+            q.update(request.path_params or {})
+            headers = dict(request.headers)
+            return await brick.proxy_get(upstream_path.lstrip("/"), q, headers)
+    return dynamic_get
+
+def _make_lazy_get(upstream_path: str, params: list, name: str):
+    key = spec_key(params)
+
+    async def dynamic_get(request: Request):
+        ParamModel = _models.get_or_build(key, lambda: _build_param_model(params, key))
+        try:
+            q = ParamModel.model_validate(_query_dict(request, ParamModel)).model_dump(exclude_none=True)
+        except ValidationError as e:
+            raise RequestValidationError([{**err, "loc": ("query", *err["loc"])} for err in e.errors(include_url=False)])
+        q.update(request.path_params or {})
+        return await brick.proxy_get(upstream_path.lstrip("/"), q, dict(request.headers))
+    return dynamic_get
 
+def _make_route(fastapi_path: str, path: str, get_op: dict) -> APIRoute:
+    name = path.replace("/", "_") or "root"
+    params = _query_params(get_op.get("parameters"))
+    openapi_extra = None
+    if LAZY_MODELS and params:
+        endpoint = _make_lazy_get(path, params, name)
+        openapi_extra = {"parameters": _openapi_query_params(params, spec_key(params))}
+    else:
+        # Preserve query parameters in docs
+        endpoint = _make_dynamic_get(path, build_param_model_from_oas(params, name=name))
+
+    return APIRoute(
+        fastapi_path,
+        endpoint,
+        methods=["GET"],
+        name=f"{_DYNAMIC_NAME}:{fastapi_path}",
+        include_in_schema=True,
+        tags=router.tags + (get_op.get("tags") or ["landlord"]),
+        summary=get_op.get("summary"),
+        description=get_op.get("description"),
+        openapi_extra=openapi_extra,
+    )
+
+def _is_dynamic(route) -> bool:
+    return getattr(route, "name", "").startswith(_DYNAMIC_NAME)
+
+async def add_dynamic_routes(app: Optional[FastAPI] = None, prefix: str = "") -> bool:
+    """
+    Sync the /landlord/... GET routes with the upstream spec; safe to call repeatedly.
+    Unchanged specs (ETag 304 or same content hash) are a no-op and only operations whose
+    definition changed are rebuilt. The route list is replaced in a single assignment, so
+    in-flight requests finish against the list they matched.
+    Pass `app` once the router is included (include_router copies routes), with the `prefix`
+    it was included with (e.g. "/api/v1"). Returns True if routes changed.
+    """
+    global _dynamic, _spec_etag, _spec_digest, _synced
+    target = app.router if app is not None else router
+    synced = _synced == (target, prefix)
+    remote_spec = await brick.fetch_remote_get_paths(etag=_spec_etag if synced else None)
+    if remote_spec is None:
+        return False
+    paths = remote_spec.get("paths", {})
+    digest = spec_key(paths)
+    _spec_etag = remote_spec.get("etag")
+    if digest == _spec_digest and synced:
+        return False
+
+    # Explicit routes always win over upstream ones
+    static = {r.path for r in target.routes if not _is_dynamic(r)}
+    current: Dict[str, Tuple[str, APIRoute]] = {}
     for path, methods in paths.items():
         get_op = methods.get("get")
         if not get_op:
             continue
+        # Mount under <prefix>/landlord + upstream path, the same form as the static routes' paths
+        fastapi_path = prefix + "/landlord" + (path if path.startswith("/") else f"/{path}")
+        if fastapi_path in static:
+            continue
+        op_hash = spec_key(get_op)
+        prev = _dynamic.get(fastapi_path)
+        current[fastapi_path] = prev if prev is not None and prev[0] == op_hash else (op_hash, _make_route(fastapi_path, path, get_op))
 
-        # Preserve query parameters in docs
-        ParamModel = build_param_model_from_oas(
-            get_op.get("parameters"),
-            name=(path.replace("/", "_") or "root")
-        )
-
-        # Mount under /landlord + upstream path (no /api/v1 here; app adds that)
-        fastapi_path = "/landlord" + (path if path.startswith("/") else f"/{path}")
-
-        # Avoid duplicates if re-run
-        if fastapi_path not in [r.path for r in router.routes]:
-            router.add_api_route(
-                fastapi_path,
-                make_dynamic_get(path, ParamModel),
-                methods=["GET"],
-                include_in_schema=True,
-                tags=get_op.get("tags") or ["landlord"],
-                summary=get_op.get("summary"),
-                description=get_op.get("description"),
-            )
\ No newline at end of file
+    added = current.keys() - _dynamic.keys()
+    removed = _dynamic.keys() - current.keys()
+    updated = [p for p in current.keys() & _dynamic.keys() if current[p] is not _dynamic[p]]
+    # Dynamic routes resolve through a trie index rather than Starlette's linear scan
+    target.routes = index_routes([r for r in target.routes if not _is_dynamic(r)] + [route for _, route in current.values()],
+                                 _is_dynamic, name="landlord_routes")
+    _dynamic, _spec_digest, _synced = current, digest, (target, prefix)
+    if app is not None:
+        app.openapi_schema = None  # regenerate docs on next /openapi.json
+    _models.save()
+    log.info("Landlord routes synced: %d added, %d removed, %d updated", len(added), len(removed), len(updated))
+    return bool(added or removed or updated)
+
+
+async def _refresh_routes(app: Optional[FastAPI], prefix: str, interval: float) -> None:
+    retry = 1.0
+    while True:
+        try:
+            await add_dynamic_routes(app, prefix)
+            delay, retry = interval, 1.0
+        except Exception as e:  # upstream unreachable: keep serving the routes we have
+            log.warning("Landlord route refresh failed: %s", e)
+            delay, retry = retry, min(retry * 2, interval)
+        await asyncio.sleep(delay)
+
+
+async def start_route_refresher(app: Optional[FastAPI] = None, prefix: str = "",
+                                interval: float = ROUTES_REFRESH_SEC) -> None:
+    """
+    Load and periodically refresh the dynamic routes in the background, so startup
+    does not wait on (or fail with) the upstream. Wire it after include_router, e.g.
+    app.add_event_handler("startup", functools.partial(start_route_refresher, app, "/api/v1")).
+    """
+    global _refresher
+    if _refresher is None or _refresher.done():
+        _refresher = asyncio.create_task(_refresh_routes(app, prefix, interval))
+
+
+async def stop_route_refresher() -> None:
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        try:
+            await _refresher
+        except asyncio.CancelledError:
+            pass
+    _refresher = None
+
+
+router.add_event_handler("shutdown", stop_route_refresher)
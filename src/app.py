@@ -42,20 +42,20 @@ class LogLevelRequest(BaseModel):
 
 @app.get("/healthz", tags=["ops"])  # Kubernetes-friendly health endpoint
 @log_execution(logger)
-def healthz():
+async def healthz():
 	return {"status": "ok"}
 
 
 @app.get("/readyz", tags=["ops"])  # Placeholder for readiness checks
 @log_execution(logger)
-def readyz():
+async def readyz():
 	# Add checks like DB, cache, dependencies here
 	return {"status": "ready"}
 
 
 @app.post("/config/log-level", tags=["ops"])  # Dynamic log level
 @log_execution(logger)
-def update_log_level(payload: LogLevelRequest):
+async def update_log_level(payload: LogLevelRequest):
 	try:
 		set_log_level(payload.level)
 		return {"message": f"log level set to {payload.level}"}
@@ -65,6 +65,6 @@ def update_log_level(payload: LogLevelRequest):
 
 @app.get("/", tags=["default"])  # Simple landing route
 @log_execution(logger)
-def root():
+async def root():
 	return {"service": app.title, "version": app.version}
 
@@ -0,0 +1,142 @@
+"""
+Import helpers for the snippet trees, whose modules are saved flat or under other names than the
+ones they import each other by:
+- `srehubapp` maps srehubapp.* (connectors.landlord_connector is llcon.py, ...) to the root files;
+- `utils` imports the proxier modules (`# utils/proxy_*.py`) as utils.*;
+- `serve` runs an ASGI stub on 127.0.0.1 for code that builds its own httpx clients;
+- `ataas_app` loads ataas/ataas, whose top-level name is taken by ataas.py, under an alias, with
+  connectors/ataas_connectors.py and module_bricks/ataas/descovery.py under their import names, and
+  utils.route_index as the root route_index.py both apps share.
+"""
+import asyncio
+import importlib
+import importlib.util
+import os
+import socket
+import sys
+import threading
+import time
+import types
+
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SREHUBAPP = {
+    "srehubapp.connectors.landlord_connector": "llcon",
+    "srehubapp.modulebricks.landlord_brick": "ll_brick",
+    "srehubapp.utils.model_cache": "model_cache",
+    "srehubapp.utils.route_index": "route_index",
+}
+
+ATAAS_PKG = "_ataas_app"
+_ATAAS_RENAMED = {
+    "connectors.ataas_connector": "connectors/ataas_connectors.py",
+    "module_bricks.ataas.discovery": "module_bricks/ataas/descovery.py",
+}
+_ATAAS_SHARED = {"utils.route_index": "route_index"}
+
+
+def _package(name: str, path: str) -> types.ModuleType:
+    pkg = sys.modules.get(name)
+    if pkg is None:
+        pkg = sys.modules[name] = types.ModuleType(name)
+        pkg.__path__ = [path]
+    return pkg
+
+
+def _load_file(name: str, path: str) -> types.ModuleType:
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def serve():
+    """`serve(app)` starts `app` with uvicorn on a free local port and returns its base URL."""
+    import uvicorn
+
+    servers = []
+
+    def _serve(app) -> str:
+        sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        servers.append((server, thread))
+        return f"http://127.0.0.1:{port}"
+
+    yield _serve
+    for server, thread in servers:
+        server.should_exit = True
+        thread.join(5)
+
+
+@pytest.fixture(scope="session")
+def srehubapp():
+    """`srehubapp("snippet_route")` imports a root module that uses srehubapp.* imports."""
+    for name, module in SREHUBAPP.items():
+        parent = name.rpartition(".")[0]
+        for pkg in (parent.partition(".")[0], parent):
+            _package(pkg, os.path.join(ROOT, *pkg.split(".")))
+        sys.modules.setdefault(name, importlib.import_module(module))
+    return importlib.import_module
+
+
+@pytest.fixture(scope="session")
+def utils():
+    """`utils("proxy_cache")` imports a root module as utils.<name>, where the proxier modules live."""
+    _package("utils", ROOT)
+    return lambda name: importlib.import_module(f"utils.{name}")
+
+
+@pytest.fixture(scope="session")
+def ataas_app():
+    """`ataas_app("api.v1.routers.ataas")` imports a module of ataas/ataas."""
+    pytest.importorskip("jsonschema")  # module_bricks/ataas/generic.py
+    base = os.path.join(ROOT, "ataas", "ataas")
+    _package(ATAAS_PKG, base)
+    for alias, relpath in _ATAAS_RENAMED.items():
+        _load_file(f"{ATAAS_PKG}.{alias}", os.path.join(base, relpath))
+    for alias, module in _ATAAS_SHARED.items():
+        parent = alias.rpartition(".")[0]
+        _package(f"{ATAAS_PKG}.{parent}", os.path.join(base, *parent.split(".")))
+        sys.modules.setdefault(f"{ATAAS_PKG}.{alias}", importlib.import_module(module))
+    return lambda name: importlib.import_module(f"{ATAAS_PKG}.{name}")
+
+
+class _Upstream:
+    """Requests the ATAAS client pool sent, answered by `handler` (an httpx.MockTransport handler)."""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = lambda request: httpx.Response(404, json={"error": "not stubbed"})
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+
+@pytest.fixture
+def ataas_upstream(ataas_app, monkeypatch):
+    """Starts the app-scoped ATAAS pool against an in-process upstream; breakers start closed."""
+    monkeypatch.setenv("ATAAS_BASE_URL", "http://ataas")
+    monkeypatch.setenv("ATAAS_RETRIES", "0")
+    monkeypatch.setenv("ATAAS_API_KEY", "test-key")
+    connectors = ataas_app("connectors.ataas_connector")
+    circuit = ataas_app("connectors.circuit")
+    circuit._guards.clear()
+    upstream = _Upstream()
+    pool = asyncio.run(connectors.start_ataas_pool())
+    asyncio.run(pool._client.aclose())
+    pool._client = httpx.AsyncClient(base_url="http://ataas", transport=httpx.MockTransport(upstream))
+    yield upstream
+    asyncio.run(connectors.close_ataas_pool())
+    circuit._guards.clear()
@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def auth(ataas_app, monkeypatch):
+    """auth_base with a fresh token cache and a token endpoint that counts its calls."""
+    module = ataas_app("auth.auth_base")
+    posts = []
+
+    async def token_endpoint(request):
+        posts.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"access_token": f"t{len(posts)}", "expires_in": 3600})
+
+    monkeypatch.setattr(module, "_TOKENS", {})
+    monkeypatch.setattr(module, "_token_http", httpx.AsyncClient(transport=httpx.MockTransport(token_endpoint)))
+    return module, posts
+
+
+def _cc(module, secret="s"):
+    return module.OAuth2ClientCredentials("http://idp/token", "hub", secret)
+
+
+def test_concurrent_callers_share_one_refresh(auth):
+    module, posts = auth
+
+    async def run():
+        a, b = _cc(module), _cc(module)  # e.g. two auth_from_env() calls
+        headers = await asyncio.gather(*(c.headers() for c in (a, b, a, b)))
+        await module.close_token_client()
+        return headers
+
+    assert asyncio.run(run()) == [{"Authorization": "Bearer t1"}] * 4
+    assert len(posts) == 1
+
+
+def test_other_credentials_get_their_own_token(auth):
+    module, posts = auth
+
+    async def run():
+        first = await _cc(module).headers()
+        other = await _cc(module, secret="other").headers()
+        await module.close_token_client()
+        return first, other
+
+    assert asyncio.run(run()) == ({"Authorization": "Bearer t1"}, {"Authorization": "Bearer t2"})
+
+
+def test_cancelled_waiter_does_not_cancel_the_refresh(auth):
+    module, posts = auth
+
+    async def run():
+        c = _cc(module)
+        impatient = asyncio.ensure_future(c.headers())
+        patient = asyncio.ensure_future(c.headers())
+        await asyncio.sleep(0)
+        impatient.cancel()
+        result = await patient
+        await module.close_token_client()
+        return result
+
+    assert asyncio.run(run()) == {"Authorization": "Bearer t1"}
+    assert len(posts) == 1
+
+
+def test_token_is_refreshed_ahead_of_expiry(auth):
+    module, posts = auth
+
+    async def run():
+        c = module.OAuth2ClientCredentials("http://idp/token", "hub", "s", refresh_ahead_sec=1e9)
+        await c.headers()
+        c._state.expires_at = module.time.time() + 0.02  # prefetch runs at half the remaining lifetime
+        c._schedule_prefetch()
+        await asyncio.sleep(0.05)
+        prefetched = (c._state.access_token, len(posts))
+        headers = await c.headers()
+        await module.close_token_client()
+        return prefetched, headers
+
+    prefetched, headers = asyncio.run(run())
+    assert prefetched == ("t2", 2)  # fetched in the background, before any caller needed it
+    assert headers == {"Authorization": "Bearer t2"} and len(posts) == 2
+
+
+def test_client_secret_post(auth):
+    module, posts = auth
+
+    async def run():
+        await module.OAuth2ClientCredentials("http://idp/token", "hub", "s", scope="jobs",
+                                             auth_method="client_secret_post").headers()
+        await module.close_token_client()
+
+    asyncio.run(run())
+    body = posts[0].content.decode()
+    assert "client_secret=s" in body and "scope=jobs" in body and "authorization" not in posts[0].headers
+
+
+def test_idle_credentials_stop_prefetching(auth):
+    module, posts = auth
+
+    async def run():
+        c = module.OAuth2ClientCredentials("http://idp/token", "hub", "s", refresh_ahead_sec=1e9,
+                                           prefetch_idle_sec=0.01)
+        await c.headers()
+        await asyncio.sleep(0.02)  # idle longer than prefetch_idle_sec
+        c._state.expires_at = module.time.time() + 0.02
+        c._schedule_prefetch()
+        await asyncio.sleep(0.05)
+        prefetch = c._state.prefetch
+        await module.close_token_client()
+        return prefetch
+
+    prefetch = asyncio.run(run())
+    assert prefetch.done() and len(posts) == 1  # no background fetch, and nothing re-armed
+
+
+def test_each_credential_set_uses_its_own_timeout(auth):
+    module, posts = auth
+
+    async def run():
+        await module.OAuth2ClientCredentials("http://idp/token", "hub", "s", timeout_sec=2.0).headers()
+        await module.OAuth2ClientCredentials("http://idp/token", "hub", "other", timeout_sec=7.0).headers()
+        await module.close_token_client()
+
+    asyncio.run(run())
+    assert [p.extensions["timeout"]["read"] for p in posts] == [2.0, 7.0]
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+JOBS = [
+    {"name": "db-backup", "tags": ["db", "prod"]},
+    {"name": "db-restore", "tags": ["db"]},
+    {"name": "cache-flush", "tags": ["prod"]},
+]
+
+
+@pytest.fixture
+def discovery(ataas_app, monkeypatch, tmp_path):
+    for name in ("SREHUB_ATAAS_ALLOW", "SREHUB_ATAAS_DENY", "SREHUB_ATAAS_REQUIRE_TAGS", "SREHUB_ATAAS_PROJECTS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("SREHUB_ATAAS_CATALOG_SNAPSHOT", str(tmp_path / "catalog.json"))
+    module = ataas_app("module_bricks.ataas.discovery")
+    monkeypatch.setattr(module, "_tag_index", {})
+    return module
+
+
+def _names(items):
+    return sorted(j["name"] for j in items)
+
+
+def test_snapshot_is_narrowed_by_the_current_filters(discovery, monkeypatch):
+    discovery.save_snapshot(JOBS)
+    assert _names(discovery.load_snapshot()) == ["cache-flush", "db-backup", "db-restore"]
+
+    monkeypatch.setenv("SREHUB_ATAAS_DENY", "*-restore")
+    monkeypatch.setenv("SREHUB_ATAAS_REQUIRE_TAGS", "db")
+    assert _names(discovery.load_snapshot()) == ["db-backup"]
+    assert discovery.jobs_with_tags("prod") == {"db-backup"}
+
+
+def test_unreadable_snapshot_is_ignored(discovery, tmp_path):
+    (tmp_path / "catalog.json").write_text("{not json")
+    assert discovery.load_snapshot() is None
+
+
+def test_discovery_pages_and_filters_every_project(discovery, ataas_upstream, monkeypatch):
+    monkeypatch.setenv("SREHUB_ATAAS_PROJECTS", "a,b")
+    monkeypatch.setenv("SREHUB_ATAAS_ALLOW", "db-*")
+    pages = {
+        ("a", None): {"items": JOBS[:1], "next_page_token": "t2"},
+        ("a", "t2"): {"items": JOBS[1:]},
+        ("b", None): [{"name": "db-backup", "tags": []}, {"name": "db-vacuum", "tags": []}],
+    }
+    ataas_upstream.handler = lambda request: httpx.Response(
+        200, json=pages[(request.url.path.split("/")[4], request.url.params.get("page_token"))])
+
+    items = asyncio.run(discovery.discover_filtered_jobs())
+    assert _names(items) == ["db-backup", "db-restore", "db-vacuum"]
+    assert next(j for j in items if j["name"] == "db-backup")["project"] == "a"  # first listed project wins
+
+
+def test_shutdown_cancels_the_background_refresh(discovery, ataas_app, ataas_upstream):
+    bootstrap = ataas_app("module_bricks.ataas.bootstrap")
+    discovery.save_snapshot(JOBS)
+
+    async def never(request):
+        await asyncio.Event().wait()
+
+    ataas_upstream.handler = never
+
+    async def run():
+        _, factories = await bootstrap.build_catalog()
+        task = bootstrap._refresh_task
+        await asyncio.sleep(0.01)
+        await bootstrap.stop_refresh()
+        return factories, task
+
+    factories, task = asyncio.run(run())
+    assert sorted(factories) == ["cache-flush", "db-backup", "db-restore"]  # served from the snapshot
+    assert task.cancelled() and bootstrap._refresh_task is None
+    assert json.loads(open(discovery._snapshot_path()).read()) == JOBS  # the refresh never saved over it
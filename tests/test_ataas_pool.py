@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+
+# Stub ATAAS upstream, served by `serve`: real sockets, so connection reuse shows in the pool stats
+upstream = FastAPI()
+
+
+@upstream.get("/api/v1/runs/{run_id}")
+async def _run(run_id: str):
+    return {"run_id": run_id, "state": "RUNNING"}
+
+
+@pytest.fixture(scope="module")
+def upstream_url(serve):
+    return serve(upstream)
+
+
+@pytest.fixture
+def connectors(ataas_app, upstream_url, monkeypatch):
+    monkeypatch.setenv("ATAAS_BASE_URL", upstream_url)
+    monkeypatch.setenv("ATAAS_RETRIES", "0")
+    ataas_app("connectors.circuit")._guards.clear()
+    module = ataas_app("connectors.ataas_connector")
+    monkeypatch.setattr(module, "_pool", None)  # each test closes its pool inside its own event loop
+    return module
+
+
+def test_connectors_reuse_the_pool_connection(connectors):
+    async def run():
+        pool = await connectors.start_ataas_pool()
+        clients = []
+        for i in range(3):
+            async with connectors.make_ataas_connector() as c:
+                assert (await c.status(f"r{i}")).state == "RUNNING"
+                clients.append(c._client)
+        stats = connectors.ataas_pool_stats()
+        await connectors.close_ataas_pool()
+        return pool, clients, stats
+
+    pool, clients, stats = asyncio.run(run())
+    assert all(c is clients[0] for c in clients)
+    assert stats["leases"] == stats["requests"] == 3
+    assert stats["connections"] == stats["idle_connections"] == 1
+    assert not pool.started and connectors.ataas_pool_stats() == {"started": False}
+
+
+def test_connector_does_not_close_the_borrowed_client(connectors):
+    async def run():
+        pool = await connectors.start_ataas_pool()
+        async with connectors.make_ataas_connector() as c:
+            await c.status("r1")
+        closed = pool._client.is_closed  # leaving the connector must not close the shared client
+        await connectors.close_ataas_pool()
+        return closed
+
+    assert asyncio.run(run()) is False
+
+
+def test_other_upstreams_and_no_pool_get_their_own_client(connectors, upstream_url):
+    async def run():
+        async with connectors.make_ataas_connector() as c:  # pool not started
+            own = c._client
+            await c.status("r1")
+        pool = await connectors.start_ataas_pool()
+        other = connectors.ATAASConfig(base_url=upstream_url + "/", retries=0)  # a different upstream key
+        async with connectors.make_ataas_connector(other) as c:
+            await c.status("r2")
+            borrowed = c._client is pool._client
+        await connectors.close_ataas_pool()
+        return own, borrowed, pool.leases
+
+    own, borrowed, leases = asyncio.run(run())
+    assert own.is_closed and not borrowed and leases == 0
+
+
+def test_lease_requires_a_started_pool(connectors):
+    with pytest.raises(RuntimeError):
+        connectors.ATAASClientPool().lease()
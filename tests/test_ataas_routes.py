@@ -0,0 +1,158 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+BACKUP = {"name": "db-backup", "version": "1.0.0",
+          "schema": {"type": "object", "properties": {"db": {"type": "string"}, "keep_days": {"type": "integer"}},
+                     "required": ["db"]}}
+
+
+@pytest.fixture
+def router_module(ataas_app, monkeypatch):
+    module = ataas_app("api.v1.routers.ataas")
+    # job routes and catalog state are module globals; give each test its own
+    monkeypatch.setattr(module, "_live_app", None)
+    monkeypatch.setattr(module, "_live", (module.ataas_router, ""))
+    monkeypatch.setattr(module, "_DYNAMIC_FACTORIES", {})
+    monkeypatch.setattr(module, "_JOB_META", {})
+    monkeypatch.setattr(module, "_JOBS_LISTING", module._JOBS_LISTING)
+    return module
+
+
+@pytest.fixture
+def served(router_module, ataas_app):
+    bootstrap = ataas_app("module_bricks.ataas.bootstrap")
+    app = FastAPI()
+    app.include_router(router_module.ataas_router, prefix="/hub")
+    router_module.serve_jobs_from(app, "/hub")
+    router_module._register_dynamic_jobs(bootstrap._factories([BACKUP], {}))
+    return app, bootstrap
+
+
+def test_job_routes_are_served_from_the_app_router_with_the_prefix(served, router_module, ataas_upstream):
+    app, _ = served
+    index = [r for r in app.router.routes if type(r).__name__ == "RouteIndex"]
+    assert len(index) == 1
+    assert [r.path for r in index[0].routes] == ["/hub/api/v1/ataas/jobs/db-backup/runs"]
+    assert not any(getattr(r, "name", "") == "run_db-backup" for r in router_module.ataas_router.routes)
+
+    ataas_upstream.handler = lambda request: httpx.Response(200, json={"run_id": "r-1"})
+    client = TestClient(app)  # no startup: it would discover the catalog again
+    resp = client.post("/hub/api/v1/ataas/jobs/db-backup/runs", json={"db": "orders"})
+    assert resp.status_code == 202, resp.text
+    assert resp.json()["run_id"] == "r-1"
+    assert client.post("/api/v1/ataas/jobs/db-backup/runs", json={"db": "orders"}).status_code == 404
+    assert "/hub/api/v1/ataas/jobs/db-backup/runs" in client.get("/openapi.json").json()["paths"]
+    assert ataas_upstream.requests[0].url.path == "/api/v1/jobs/db-backup/runs"
+
+
+def test_catalog_refresh_replaces_job_routes(served, router_module):
+    app, bootstrap = served
+    restore = {"name": "db-restore", "schema": {"type": "object", "properties": {}}}
+    router_module._on_catalog_refresh({}, bootstrap._factories([restore], {}))
+
+    job_paths = [r.path for r in app.router.routes if getattr(r, "name", "").startswith("run_db-")]
+    assert job_paths == ["/hub/api/v1/ataas/jobs/db-restore/runs"]  # db-backup is gone
+    assert sum(type(r).__name__ == "RouteIndex" for r in app.router.routes) == 1
+
+
+def test_job_listing_is_served_with_an_etag(served, router_module):
+    app, bootstrap = served
+    client = TestClient(app)
+    resp = client.get("/hub/api/v1/ataas/jobs")
+    etag = resp.headers["etag"]
+    assert [j["name"] for j in resp.json()] == ["db-backup"]
+    for header in (etag, f'W/{etag}', f'"other", {etag}', "*"):
+        again = client.get("/hub/api/v1/ataas/jobs", headers={"If-None-Match": header})
+        assert again.status_code == 304 and again.headers["etag"] == etag and again.content == b""
+
+    router_module._on_catalog_refresh({}, bootstrap._factories([BACKUP, {"name": "db-restore"}], {}))
+    changed = client.get("/hub/api/v1/ataas/jobs", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert [j["name"] for j in changed.json()] == ["db-backup", "db-restore"]
+
+
+def test_job_metadata_is_memoized_until_the_catalog_changes(served, router_module, ataas_app, monkeypatch):
+    app, bootstrap = served
+    client = TestClient(app)
+    meta = client.get("/hub/api/v1/ataas/jobs/db-backup").json()
+    assert meta["source"] == "ataas" and meta["argsSchema"]["required"] == ["db"]
+
+    # the memo answers from now on; the discovered factory is never instantiated for reads
+    generic = ataas_app("module_bricks.ataas.generic")
+    with monkeypatch.context() as m:
+        m.setattr(generic.GenericAtaasJob, "describe", staticmethod(lambda meta: pytest.fail("described again")))
+        m.setattr(generic.GenericAtaasJob, "__init__", lambda *a, **kw: pytest.fail("job built"))
+        assert client.get("/hub/api/v1/ataas/jobs/db-backup").json() == meta
+        assert client.get("/hub/api/v1/ataas/jobs/nope").status_code == 404
+
+    router_module._on_catalog_refresh({}, bootstrap._factories([{**BACKUP, "version": "2.0.0"}], {}))
+    assert client.get("/hub/api/v1/ataas/jobs/db-backup").json()["schemaVersion"] == "2.0.0"
+
+
+def _ndjson(resp):
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_bulk_trigger_runs_discovered_jobs_like_single_triggers(served, router_module, ataas_app, ataas_upstream,
+                                                                  monkeypatch):
+    app, _ = served
+    generic = ataas_app("module_bricks.ataas.generic")
+    runs, checked = [], []
+    real_run = generic.GenericAtaasJob.run
+
+    async def spy_run(self, **kw):
+        runs.append(kw["correlation_id"])
+        return await real_run(self, **kw)
+
+    class Recording:
+        def allow(self, caller, job_name, args):
+            checked.append(args)
+            return True
+
+    monkeypatch.setattr(generic.GenericAtaasJob, "run", spy_run)
+    monkeypatch.setattr(router_module, "entitlements", Recording())
+
+    def upstream(request):
+        db = json.loads(request.content)["db"]
+        if db == "broken":
+            return httpx.Response(409, json={"message": "already running"})
+        return httpx.Response(200, json={"run_id": f"r-{db}"})
+
+    ataas_upstream.handler = upstream
+    client = TestClient(app)
+    client.post("/hub/api/v1/ataas/jobs/db-backup/runs", json={"db": "single"})
+    resp = client.post("/hub/api/v1/ataas/jobs/db-backup/runs/bulk", json={"items": [
+        {"args": {"db": "orders"}, "idempotency_key": "k-orders"},
+        {"args": {"db": "broken"}},
+    ]})
+    assert resp.status_code == 202
+    lines = _ndjson(resp)
+    by_index = {r["index"]: r for r in lines[:-1]}
+    assert by_index[0]["run_id"] == "r-orders"
+    assert by_index[1]["status"] == 409
+    assert lines[-1] == {"summary": {"total": 2, "succeeded": 1, "failed": 1}}
+
+    assert sorted(runs) == ["auto", "auto", "k-orders"]  # every item went through GenericAtaasJob.run
+    assert all(args.keys() == {"db", "keep_days"} for args in checked)  # same dump as the single trigger
+    keys = {json.loads(r.content)["db"]: r.headers.get("idempotency-key") for r in ataas_upstream.requests}
+    assert keys == {"single": None, "orders": "k-orders", "broken": None}
+
+
+def test_bulk_trigger_validates_every_item_first(served, ataas_upstream):
+    app, _ = served
+    resp = TestClient(app).post("/hub/api/v1/ataas/jobs/db-backup/runs/bulk",
+                                json={"items": [{"args": {"db": "orders"}}, {"args": {}}]})
+    assert resp.status_code == 422
+    assert [i["index"] for i in resp.json()["detail"]["items"]] == [1]
+    assert ataas_upstream.requests == []
+
+
+def test_shared_args_models_are_named_by_content_hash(router_module, monkeypatch):
+    monkeypatch.setattr(router_module, "_models", router_module.ModelCache("ataas", cache_dir=""))
+    model = router_module.model_from_jsonschema("db-backup", BACKUP["schema"])
+    assert router_module.model_from_jsonschema("db-restore", BACKUP["schema"]) is model
+    assert model.__name__ == f"Args_{router_module.spec_key(BACKUP['schema'])[:12]}"
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def watcher(ataas_app, monkeypatch):
+    """A fast-polling watcher in place of the shared one (its event loop is the test's)."""
+    module = ataas_app("module_bricks.ataas.run_watcher")
+    router = ataas_app("api.v1.routers.ataas")
+    w = module.RunWatcher(fast_interval=0.01, slow_interval=0.01, max_interval=0.05)
+    monkeypatch.setattr(router, "run_watcher", w)
+    return module, w
+
+
+@pytest.fixture
+def runs(ataas_upstream):
+    """Upstream run states, served in turn per run id (the last one repeats)."""
+    states = {"r1": ["QUEUED", "RUNNING", "SUCCEEDED"], "r2": ["FAILED"]}
+
+    def handler(request):
+        run_id = request.url.path.rsplit("/", 1)[-1]
+        if run_id not in states:
+            return httpx.Response(404, json={"message": "no such run"})
+        seq = states[run_id]
+        return httpx.Response(200, json={"run_id": run_id, "state": seq.pop(0) if len(seq) > 1 else seq[0]})
+
+    ataas_upstream.handler = handler
+    return ataas_upstream
+
+
+@pytest.fixture
+def client(ataas_app, watcher, runs):
+    app = FastAPI()
+    app.include_router(ataas_app("api.v1.routers.ataas").ataas_router)
+    return TestClient(app)
+
+
+def test_dict_statuses_are_normalized(watcher, monkeypatch):
+    module, w = watcher
+
+    class DictConnector:  # ataas/connect.py's status() returns the raw dict
+        async def status(self, run_id):
+            return {"state": "SUCCEEDED", "progress": 100}
+
+    @asynccontextmanager
+    async def connector():
+        yield DictConnector()
+
+    monkeypatch.setattr(module, "make_ataas_connector", connector)
+
+    async def run():
+        first = await w.status("r9")
+        again = await w.status("r9")
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first.run_id == "r9" and first.state == "SUCCEEDED" and again is first
+    assert w.stats()["polls"] == 1  # terminal: served from the cache
+
+
+def test_sse_streams_changes_until_every_run_is_terminal(client):
+    with client.stream("GET", "/api/v1/ataas/runs/events", params=[("run_id", "r1"), ("run_id", "r2")]) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in resp.iter_lines() if line.startswith("data: ")]
+    r1 = [e["state"] for e in events if e["run_id"] == "r1"]
+    assert r1 == ["QUEUED", "RUNNING", "SUCCEEDED"]
+    assert [e["state"] for e in events if e["run_id"] == "r2"] == ["FAILED"]
+
+
+def test_sse_reports_unknown_runs(client):
+    with client.stream("GET", "/api/v1/ataas/runs/events", params={"run_id": "nope"}) as resp:
+        events = [json.loads(line[len("data: "):]) for line in resp.iter_lines() if line.startswith("data: ")]
+    assert events == [{"run_id": "nope", "error": "RUN_NOT_FOUND", "status": 404}]
+
+
+def test_websocket_follows_subscribed_runs(client):
+    with client.websocket_connect("/api/v1/ataas/runs/ws") as ws:
+        ws.send_json({"subscribe": ["r1"]})
+        states = [ws.receive_json()["state"] for _ in range(3)]
+    assert states == ["QUEUED", "RUNNING", "SUCCEEDED"]
+
+
+def test_status_endpoint_serves_finished_runs_from_cache(client, runs):
+    first = client.get("/api/v1/ataas/runs/r2").json()
+    again = client.get("/api/v1/ataas/runs/r2").json()
+    assert first["state"] == again["state"] == "FAILED"
+    assert len(runs.requests) == 1
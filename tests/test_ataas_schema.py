@@ -0,0 +1,36 @@
+import pytest
+
+SCHEMA = {"type": "object", "required": ["db"],
+          "properties": {"db": {"type": "string"}, "keep_days": {"type": "integer", "default": 7}}}
+
+
+@pytest.fixture(params=[True, False], ids=["fastjsonschema", "jsonschema"])
+def generic(request, ataas_app, monkeypatch):
+    module = ataas_app("module_bricks.ataas.generic")
+    if request.param and module.fastjsonschema is None:
+        pytest.skip("fastjsonschema not installed")
+    monkeypatch.setattr(module, "USE_FASTJSONSCHEMA", request.param)
+    monkeypatch.setattr(module, "_VALIDATORS", {})
+    return module
+
+
+def test_validation_leaves_the_payload_alone(generic):
+    payload = {"db": "orders"}
+    assert generic.compiled_schema("backup", "1", SCHEMA).errors(payload) == []
+    assert payload == {"db": "orders"}  # no keep_days filled in, whichever validator ran
+
+
+def test_every_error_is_reported(generic):
+    errors = generic.compiled_schema("backup", "1", SCHEMA).errors({"keep_days": "x"})
+    assert sorted((e["path"], e["validator"]) for e in errors) == [("", "required"), ("keep_days", "type")]
+
+
+def test_compiled_schema_follows_schema_changes(generic, monkeypatch):
+    first = generic.compiled_schema("backup", "1", SCHEMA)
+    reloaded = dict(SCHEMA)
+    assert generic.compiled_schema("backup", "1", reloaded) is first
+    with monkeypatch.context() as m:
+        m.setattr(generic, "spec_key", lambda schema: pytest.fail("hashed again"))
+        assert generic.compiled_schema("backup", "1", reloaded) is first  # hashed once per new schema object
+    changed = {**SCHEMA, "required": []}
+    assert generic.compiled_schema("backup", "1", changed).errors({}) == []
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("jwt")
+pytest.importorskip("authlib")
+from fastapi import FastAPI, Request
+
+from auth.newwithauth.decorators import RequireAuth, _AuthzClient, close_authz_clients
+
+# Stub authz API, as in benchmarks/bench_authz_batch.py, served by `serve`; it records each call's subjects and Authorization
+stub = FastAPI()
+calls = []
+
+
+@stub.post("/authz")
+async def _single(request: Request):
+    body = await request.json()
+    calls.append(("single", [body["subject"]], request.headers.get("authorization")))
+    return {"allowed": not body["subject"].startswith("deny")}
+
+
+@stub.post("/authz/batch")
+async def _batch(request: Request):
+    body = await request.json()
+    calls.append(("batch", [r["subject"] for r in body["requests"]], request.headers.get("authorization")))
+    return {"results": [{"allowed": not r["subject"].startswith("deny")} for r in body["requests"]]}
+
+
+@pytest.fixture(scope="module")
+def authz_base(serve):
+    return serve(stub)
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    calls.clear()
+
+
+def _client(base, window_ms=20, batch_path="/authz/batch"):
+    return _AuthzClient(f"{base}/authz", 3.0, f"{base}{batch_path}", batch_window_ms=window_ms)
+
+
+def test_decisions_in_one_window_share_a_call(authz_base):
+    client = _client(authz_base)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.decide({"subject": s}, {}) for s in ("a", "deny-b", "c")))
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == [True, False, True]
+    assert [(kind, sorted(subjects)) for kind, subjects, _ in calls] == [("batch", ["a", "c", "deny-b"])]
+
+
+def test_batches_never_mix_header_sets(authz_base):
+    client = _client(authz_base)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                client.decide({"subject": "a1"}, {"Authorization": "Bearer a"}),
+                client.decide({"subject": "b1"}, {"Authorization": "Bearer b"}),
+                client.decide({"subject": "a2"}, {"Authorization": "Bearer a"}),
+            )
+        finally:
+            await client.aclose()
+
+    assert all(asyncio.run(run()))
+    assert sorted((auth, sorted(subjects)) for _, subjects, auth in calls) == [
+        ("Bearer a", ["a1", "a2"]), ("Bearer b", ["b1"])]
+
+
+def test_aclose_finishes_queued_decisions_then_closes(authz_base):
+    client = _client(authz_base, window_ms=60_000)
+
+    async def run():
+        pending = asyncio.ensure_future(client.decide({"subject": "a"}, {}))
+        await asyncio.sleep(0)  # queued, window still open
+        await client.aclose()
+        return pending.done() and pending.result()
+
+    assert asyncio.run(run()) is True
+    assert client._client is None and not client._sending
+
+
+def test_unsupported_batch_endpoint_falls_back_to_single_calls(authz_base):
+    client = _client(authz_base, batch_path="/authz/missing")
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.decide({"subject": s}, {}) for s in ("a", "deny-b")))
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == [True, False]
+    assert not client.batch_supported
+    assert sorted(s for kind, subjects, _ in calls if kind == "single" for s in subjects) == ["a", "deny-b"]
+
+
+def test_decisions_are_cached_and_concurrent_misses_coalesce(authz_base):
+    guard = RequireAuth(oidc=None, authz_api_url=f"{authz_base}/authz", authz_action="view")
+
+    async def run():
+        first = await asyncio.gather(*(guard._check_authorization("alice", None, "view") for _ in range(5)))
+        again = await guard._check_authorization("alice", None, "view")
+        denied = await guard._check_authorization("deny-bob", None, "view")
+        await close_authz_clients()
+        return first, again, denied
+
+    first, again, denied = asyncio.run(run())
+    assert first == [True] * 5 and again is True and denied is False
+    assert len(calls) == 2  # one per subject
+    stats = guard.decision_cache_stats()
+    assert stats["coalesced"] == 4 and stats["hits"] == 1 and stats["authz_calls"] == 2
@@ -0,0 +1,175 @@
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import types
+
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# both copies of the breaker must behave the same
+COPIES = ["ataas/circuit.py", "ataas/ataas/connectors/circuit.py"]
+
+
+def _load(relpath: str):
+    spec = importlib.util.spec_from_file_location(f"_circuit_{abs(hash(relpath))}", os.path.join(ROOT, relpath))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(params=COPIES)
+def circuit(request):
+    return _load(request.param)
+
+
+def _open(circuit, **kw):
+    breaker = circuit.CircuitBreaker("up", min_failures=2, error_rate=0.5, reset_after=0.05, **kw)
+    for _ in range(2):
+        breaker.record(False, breaker.allow())
+    assert breaker.state == circuit.OPEN
+    return breaker
+
+
+def test_opens_on_error_rate_once_enough_failures(circuit):
+    breaker = circuit.CircuitBreaker("up", min_failures=3, error_rate=0.5)
+    for ok in (True, True, True, False, False):
+        breaker.record(ok, breaker.allow())
+    assert breaker.state == circuit.CLOSED  # 2 failures < min_failures
+    breaker.record(False, breaker.allow())
+    assert breaker.state == circuit.OPEN  # 3 of 6 failed
+
+
+def test_low_error_rate_keeps_it_closed(circuit):
+    breaker = circuit.CircuitBreaker("up", min_failures=2, error_rate=0.5)
+    for ok in [True] * 10 + [False] * 3:
+        breaker.record(ok, breaker.allow())
+    assert breaker.state == circuit.CLOSED
+
+
+def test_open_rejects_until_reset(circuit):
+    breaker = _open(circuit)
+    assert breaker.allow() is None
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_admits_a_single_probe(circuit):
+    breaker = _open(circuit)
+    breaker.changed_at -= 1
+    probe = breaker.allow()
+    assert probe and breaker.state == circuit.HALF_OPEN
+    assert breaker.allow() is None
+
+
+def test_probe_success_closes(circuit):
+    breaker = _open(circuit)
+    breaker.changed_at -= 1
+    breaker.record(True, breaker.allow())
+    assert breaker.state == circuit.CLOSED
+
+
+def test_probe_failure_reopens(circuit):
+    breaker = _open(circuit)
+    breaker.changed_at -= 1
+    breaker.record(False, breaker.allow())
+    assert breaker.state == circuit.OPEN
+    assert breaker.allow() is None
+
+
+def test_late_results_do_not_decide_half_open(circuit):
+    breaker = circuit.CircuitBreaker("up", min_failures=2, error_rate=0.5, reset_after=0.05)
+    late = breaker.allow()  # admitted while closed, answers after the breaker went half-open
+    for _ in range(2):
+        breaker.record(False, breaker.allow())
+    breaker.changed_at -= 1
+    probe = breaker.allow()
+    breaker.record(True, late)
+    assert breaker.state == circuit.HALF_OPEN
+    breaker.record(False, late)
+    assert breaker.state == circuit.HALF_OPEN
+    breaker.record(True, probe)
+    assert breaker.state == circuit.CLOSED
+
+
+def test_abandoned_probe_lets_another_through(circuit):
+    breaker = _open(circuit)
+    breaker.changed_at -= 1
+    probe = breaker.allow()
+    breaker.abandon(0)  # not the probe: no effect
+    assert breaker.allow() is None
+    breaker.abandon(probe)
+    assert breaker.allow()
+
+
+def test_shared_state_is_seen_by_other_workers(circuit, tmp_path):
+    a = _open(circuit, shared_dir=str(tmp_path))
+    b = circuit.CircuitBreaker("up", reset_after=0.05, shared_dir=str(tmp_path))
+    assert b.allow() is None and b.state == circuit.OPEN
+    a.changed_at -= 1
+    b.changed_at -= 1
+    assert a.allow()
+    assert b.allow() is None  # a holds the probe token
+
+
+def test_shared_write_failure_does_not_raise(circuit, tmp_path, monkeypatch):
+    breaker = circuit.CircuitBreaker("up", min_failures=1, error_rate=0.5, shared_dir=str(tmp_path))
+
+    def boom(*a, **kw):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(breaker._shared, "write", boom)
+    breaker.record(False, breaker.allow())
+    assert breaker.state == circuit.OPEN
+
+
+def test_aimd_limit_sheds_shrinks_and_grows(circuit):
+    limiter = circuit.AIMDLimiter(initial=2, latency_target=0.1)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire() and limiter.stats()["shed"] == 1
+    limiter.release(True, 0.5)  # slow: multiplicative decrease
+    assert limiter.limit == pytest.approx(1.4)
+    limiter.release(True, 0.01)
+    assert limiter.limit == pytest.approx(1.4 + 1 / 1.4)
+    assert limiter.inflight == 0
+
+
+@pytest.fixture
+def standalone_connect():
+    """ataas/connect.py, imported as part of its (package-less) directory."""
+    pkg = types.ModuleType("_ataas_standalone")
+    pkg.__path__ = [os.path.join(ROOT, "ataas")]
+    sys.modules["_ataas_standalone"] = pkg
+    try:
+        yield importlib.import_module("_ataas_standalone.connect")
+    finally:
+        for name in [n for n in sys.modules if n.startswith("_ataas_standalone")]:
+            del sys.modules[name]
+
+
+def test_permit_is_not_held_during_backoff(standalone_connect):
+    connect = standalone_connect
+    config = connect.ATAASConfig(base_url="http://ataas", retries=1, backoff_base=0.2, jitter=False,
+                                 aimd_initial_limit=4, aimd_latency_target_sec=0.1)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503 if len(calls) == 1 else 200, json={"ok": True})
+
+    async def run():
+        client = httpx.AsyncClient(base_url="http://ataas", transport=httpx.MockTransport(handler))
+        async with connect.ATAASConnector(config, client=client) as c:
+            limiter = c._guard.limiter
+            task = asyncio.ensure_future(c._request("GET", "/x"))
+            await asyncio.sleep(0.1)  # inside the backoff sleep
+            inflight_during_backoff = limiter.inflight
+            assert await task == {"ok": True}
+        await client.aclose()
+        return limiter, inflight_during_backoff
+
+    limiter, inflight = asyncio.run(run())
+    assert inflight == 0
+    # one failure (x0.7) and one fast success; the 0.2s sleep is not counted as upstream latency
+    assert limiter.limit == pytest.approx(4 * 0.7 + 1 / (4 * 0.7))
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+
+import llcon
+from llcon import LandlordConnector
+
+
+@pytest.fixture
+def landlord(monkeypatch):
+    """A connector whose upstream echoes the caller's Authorization and counts requests."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        return httpx.Response(200, json={"who": request.headers.get("authorization", ""), "items": [1, 2]},
+                              headers={"etag": '"v1"'})
+
+    monkeypatch.setattr(llcon, "_response_cache", llcon.ResponseCache())
+    monkeypatch.setattr(llcon, "_inflight", {})
+    monkeypatch.setattr(llcon, "_route_policies", {})
+    conn = LandlordConnector()
+    conn._client = httpx.AsyncClient(base_url="http://landlord", headers={"Authorization": "Bearer connector"},
+                                     transport=httpx.MockTransport(handler))
+    yield conn, seen
+    asyncio.run(conn.aclose())
+
+
+def test_entries_are_not_shared_between_credentials(landlord):
+    conn, seen = landlord
+
+    async def run():
+        a = await conn.proxy_get("clusters", {"dc": "x"}, {"Authorization": "Bearer alice"})
+        b = await conn.proxy_get("clusters", {"dc": "x"}, {"Authorization": "Bearer bob"})
+        again = await conn.proxy_get("clusters", {"dc": "x"}, {"Authorization": "Bearer alice"})
+        return a, b, again
+
+    a, b, again = asyncio.run(run())
+    assert a["who"] == "Bearer alice" and again["who"] == "Bearer alice"
+    assert b["who"] == "Bearer bob"
+    assert len(seen) == 2  # alice's second call was a hit
+
+
+def test_cookie_is_part_of_the_key(landlord):
+    conn, seen = landlord
+
+    async def run():
+        await conn.proxy_get("clusters", {}, {"Cookie": "session=a"})
+        await conn.proxy_get("clusters", {}, {"Cookie": "session=b"})
+
+    asyncio.run(run())
+    assert [r.headers["cookie"] for r in seen] == ["session=a", "session=b"]
+
+
+def test_shared_route_fetches_with_connector_credentials(landlord):
+    conn, seen = landlord
+    llcon._route_policies["/clusters"] = (60.0, True)
+
+    async def run():
+        a = await conn.proxy_get("clusters", {}, {"Authorization": "Bearer alice", "Cookie": "s=1"})
+        b = await conn.proxy_get("clusters", {}, {"Authorization": "Bearer bob"})
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a["who"] == b["who"] == "Bearer connector"
+    assert len(seen) == 1 and "cookie" not in seen[0].headers
+
+
+def test_callers_get_their_own_copy(landlord):
+    conn, _ = landlord
+
+    async def run():
+        first = await conn.proxy_get("clusters", {}, {})
+        first["items"].append(99)
+        return await conn.proxy_get("clusters", {}, {})
+
+    assert asyncio.run(run())["items"] == [1, 2]
+
+
+def test_concurrent_misses_share_one_fetch(landlord):
+    conn, seen = landlord
+
+    async def run():
+        return await asyncio.gather(*(conn.proxy_get("clusters", {}, {}) for _ in range(5)))
+
+    bodies = asyncio.run(run())
+    assert len(seen) == 1
+    assert len({id(b) for b in bodies}) == 5
+
+
+def test_expired_entry_is_revalidated_with_etag(landlord, monkeypatch):
+    conn, seen = landlord
+    monkeypatch.setattr(llcon, "CACHE_SWR", 0)
+    llcon._route_policies["/clusters"] = (0.01, False)
+
+    async def run():
+        await conn.proxy_get("clusters", {}, {})
+        await asyncio.sleep(0.02)
+        return await conn.proxy_get("clusters", {}, {})
+
+    assert asyncio.run(run())["items"] == [1, 2]
+    assert seen[1].headers["if-none-match"] == '"v1"'
+    assert llcon.cache_stats()["revalidated"] == 1
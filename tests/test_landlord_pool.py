@@ -0,0 +1,100 @@
+import asyncio
+import ssl
+
+import pytest
+from fastapi import FastAPI, Request
+
+import llcon
+from llcon import LandlordConnector
+
+# Stub Landlord API, served by `serve`; it records the client port of each call
+landlord = FastAPI()
+peers = []
+
+
+@landlord.get("/api/v1/{path:path}")
+async def _get(path: str, request: Request):
+    peers.append(request.client.port)
+    return {"path": path}
+
+
+@pytest.fixture(scope="module")
+def landlord_url(serve):
+    return serve(landlord)
+
+
+@pytest.fixture(autouse=True)
+def _reset(landlord_url, monkeypatch):
+    peers.clear()
+    monkeypatch.setattr(LandlordConnector, "BASE_URL", landlord_url)
+    monkeypatch.setattr(llcon, "_response_cache", llcon.ResponseCache())
+    monkeypatch.setattr(llcon, "_inflight", {})
+    monkeypatch.setattr(llcon, "_route_policies", {})
+    monkeypatch.setattr(llcon, "_connector", None)
+
+
+def test_started_connector_keeps_one_connection():
+    async def run():
+        conn = await llcon.start_landlord_connector()
+        bodies = [await conn.proxy_get("clusters", {"page": i}, {}) for i in range(3)]
+        client = conn._client
+        await llcon.close_landlord_connector()
+        return bodies, client, conn._client
+
+    bodies, client, after = asyncio.run(run())
+    assert [b["path"] for b in bodies] == ["clusters"] * 3
+    assert len(peers) == 3 and len(set(peers)) == 1  # kept alive between calls
+    assert client.is_closed and after is None
+
+
+def test_unstarted_connector_uses_a_client_per_call():
+    async def run():
+        conn = LandlordConnector()
+        for i in range(2):
+            await conn.proxy_get("clusters", {"page": i}, {})
+        return conn._client
+
+    assert asyncio.run(run()) is None
+    assert len(peers) == 2 and len(set(peers)) == 2
+
+
+def test_brick_shares_the_app_connector(srehubapp):
+    brick = srehubapp("ll_brick").LandlordBrick()
+
+    async def run():
+        await brick.start()
+        first = llcon.get_landlord_connector()
+        await brick.proxy_get("clusters", {}, {})
+        await brick.proxy_get("datacenters", {}, {})
+        await brick.close()
+        return first
+
+    first = asyncio.run(run())
+    assert llcon.get_landlord_connector() is first and first._client is None
+    assert len(set(peers)) == 1
+
+
+@pytest.mark.parametrize("verify_ssl, mode", [(True, ssl.CERT_REQUIRED), (False, ssl.CERT_NONE)])
+def test_tls_verification_is_configurable(monkeypatch, verify_ssl, mode):
+    monkeypatch.setattr(llcon, "VERIFY_SSL", verify_ssl)
+
+    async def run():
+        client = await LandlordConnector().get_client()
+        ctx = client._transport._pool._ssl_context
+        await client.aclose()
+        return ctx.verify_mode
+
+    assert asyncio.run(run()) == mode
+
+
+def test_ca_bundle_enables_verification(monkeypatch):
+    certifi = pytest.importorskip("certifi")
+    monkeypatch.setattr(llcon, "VERIFY_SSL", False)
+    monkeypatch.setattr(llcon, "CA_BUNDLE", certifi.where())
+
+    async def run():
+        client = await LandlordConnector().get_client()
+        await client.aclose()
+        return client._transport._pool._ssl_context.verify_mode
+
+    assert asyncio.run(run()) == ssl.CERT_REQUIRED
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import llcon
+
+
+def _spec(*paths):
+    return {"swagger": "2.0", "paths": {p: {"get": {"summary": p, "tags": ["cache-ttl:60"]}} for p in paths}}
+
+
+@pytest.fixture
+def landlord_app(srehubapp, monkeypatch):
+    """App with the Landlord router included under /api/v1; `specs` is what /swagger/doc.json serves next."""
+    route = srehubapp("snippet_route")
+    for name, value in {"_dynamic": {}, "_spec_etag": None, "_spec_digest": None, "_synced": None}.items():
+        monkeypatch.setattr(route, name, value)
+    monkeypatch.setattr(llcon, "_response_cache", llcon.ResponseCache())
+    monkeypatch.setattr(llcon, "_inflight", {})
+    monkeypatch.setattr(llcon, "_route_policies", {})
+    specs = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/swagger/doc.json":
+            return httpx.Response(200, json=specs[0] if len(specs) == 1 else specs.pop(0))
+        return httpx.Response(200, json={"upstream": request.url.path})
+
+    conn = llcon.LandlordConnector()
+    conn._client = httpx.AsyncClient(base_url="http://landlord", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llcon, "_connector", conn)
+    app = FastAPI()
+    app.include_router(route.router, prefix="/api/v1")
+    yield route, app, specs
+    asyncio.run(conn.aclose())
+
+
+def test_dynamic_routes_carry_the_include_prefix(landlord_app):
+    route, app, specs = landlord_app
+    specs.append(_spec("/racks", "/clusters"))
+    assert asyncio.run(route.add_dynamic_routes(app, "/api/v1"))
+
+    dynamic = sorted(r.path for r in app.router.routes if route._is_dynamic(r))
+    assert dynamic == ["/api/v1/landlord/racks"]  # /landlord/clusters is an explicit route
+    client = TestClient(app)
+    assert client.get("/api/v1/landlord/racks").json() == {"upstream": "/api/v1/racks"}
+    assert client.get("/api/v1/landlord/clusters", params={"datacenter_name": "dc1"}).json() == {"clusters_for": "dc1"}
+
+
+def test_unchanged_spec_is_a_no_op(landlord_app):
+    route, app, specs = landlord_app
+    specs.append(_spec("/racks"))
+    assert asyncio.run(route.add_dynamic_routes(app, "/api/v1"))
+    assert not asyncio.run(route.add_dynamic_routes(app, "/api/v1"))
+    assert asyncio.run(route.add_dynamic_routes(app, "/v2"))  # another prefix is another route set
+
+
+def test_removed_paths_drop_their_route_and_cache_policy(landlord_app):
+    route, app, specs = landlord_app
+    specs.extend([_spec("/racks", "/hosts"), _spec("/hosts")])
+    asyncio.run(route.add_dynamic_routes(app, "/api/v1"))
+    assert set(llcon._route_policies) == {"/racks", "/hosts"}
+
+    assert asyncio.run(route.add_dynamic_routes(app, "/api/v1"))
+    assert [r.path for r in app.router.routes if route._is_dynamic(r)] == ["/api/v1/landlord/hosts"]
+    assert set(llcon._route_policies) == {"/hosts"}
+    assert TestClient(app).get("/api/v1/landlord/racks").status_code == 404
+
+
+def test_lazy_routes_build_their_model_on_first_request(landlord_app, monkeypatch, tmp_path):
+    route, app, specs = landlord_app
+    models = route.ModelCache("landlord", cache_dir=str(tmp_path))
+    monkeypatch.setattr(route, "_models", models)
+    monkeypatch.setattr(route, "LAZY_MODELS", True)
+    params = [{"name": "dc", "in": "query", "type": "string", "required": True},
+              {"name": "limit", "in": "query", "type": "integer"}]
+    spec = _spec("/racks", "/hosts")
+    for op in spec["paths"].values():
+        op["get"]["parameters"] = params
+    specs.append(spec)
+    asyncio.run(route.add_dynamic_routes(app, "/api/v1"))
+    assert models.builds == 0
+
+    client = TestClient(app)
+    docs = client.get("/openapi.json").json()["paths"]["/api/v1/landlord/racks"]["get"]["parameters"]
+    assert [(p["name"], p["required"]) for p in docs] == [("dc", True), ("limit", False)]
+    assert client.get("/api/v1/landlord/racks", params={"limit": "x"}).status_code == 422
+    assert client.get("/api/v1/landlord/hosts", params={"dc": "dc1", "limit": 5}).json() == {"upstream": "/api/v1/hosts"}
+    assert models.builds == 1 and models.hits == 1  # both routes share the model
+
+
+def test_shared_param_models_are_named_by_content_hash(landlord_app, monkeypatch):
+    route, _, _ = landlord_app
+    monkeypatch.setattr(route, "_models", route.ModelCache("landlord", cache_dir=""))
+    params = [{"name": "dc", "in": "query", "type": "string"}]
+    racks = route.build_param_model_from_oas(params, name="racks")
+    assert route.build_param_model_from_oas(params, name="hosts") is racks
+    assert racks.__name__ == f"Params_{route.spec_key(params)[:12]}"
@@ -0,0 +1,168 @@
+import logging
+import queue
+
+import pytest
+
+import log_config
+from log_config import LOGGER_NAME, BoundedQueueHandler, set_log_level, setup_logger
+
+
+CONFIG = """
+version: 1
+disable_existing_loggers: false
+handlers:
+  file:
+    class: logging.FileHandler
+    level: INFO
+    filename: {path}
+loggers:
+  srehubapp_logger:
+    level: DEBUG
+    handlers: [file]
+    propagate: no
+queue:
+  enabled: {enabled}
+  maxsize: 100
+"""
+
+
+@pytest.fixture
+def configured(tmp_path):
+    logger = logging.getLogger(LOGGER_NAME)
+    saved = (list(logger.handlers), logger.level, logger.propagate)
+    log_file = tmp_path / "app.log"
+
+    def _setup(enabled):
+        cfg = tmp_path / "log.yaml"
+        cfg.write_text(CONFIG.format(path=log_file, enabled=str(enabled).lower()))
+        setup_logger(str(cfg))
+        return logger, log_file
+
+    yield _setup
+    log_config.stop_queue_listener()
+    for h in logger.handlers:
+        h.close()
+    logger.handlers[:], logger.level, logger.propagate = saved
+
+
+def test_queue_mode_only_enqueues_on_logger(configured):
+    logger, log_file = configured(True)
+    assert [type(h) for h in logger.handlers] == [BoundedQueueHandler]
+    logger.info("hello %s", "queue")
+    log_config.stop_queue_listener()
+    assert "hello queue" in log_file.read_text()
+
+
+def test_set_log_level_reaches_listener_handlers(configured):
+    logger, log_file = configured(True)
+    set_log_level("ERROR")
+    assert all(h.level == logging.ERROR for h in log_config._listener.handlers)
+    logger.warning("filtered out")
+    log_config.stop_queue_listener()
+    assert "filtered out" not in log_file.read_text()
+
+
+def test_direct_mode_unchanged(configured):
+    logger, _ = configured(False)
+    assert [type(h) for h in logger.handlers] == [logging.FileHandler]
+    assert log_config.dropped_log_records() == 0
+
+
+@pytest.mark.parametrize("policy,kept", [("drop", "first"), ("drop_oldest", "second")])
+def test_full_queue_drops_and_counts(policy, kept):
+    h = BoundedQueueHandler(queue.Queue(maxsize=1), policy=policy)
+    for msg in ("first", "second"):
+        h.emit(logging.makeLogRecord({"msg": msg}))
+    assert h.dropped == 1
+    assert h.queue.get_nowait().msg == kept
+
+
+def test_full_queue_blocks_briefly_by_default():
+    h = BoundedQueueHandler(queue.Queue(maxsize=1), block_timeout=0.01)
+    assert h.policy == "block"
+    for msg in ("first", "second"):
+        h.emit(logging.makeLogRecord({"msg": msg}))
+    assert h.dropped == 1  # only after waiting block_timeout
+    assert h.queue.get_nowait().msg == "first"
+
+
+def test_shipped_config_keeps_the_queue_opt_in():
+    import os
+    import yaml
+
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "log_config.yaml")
+    with open(path) as f:
+        cfg = yaml.safe_load(f)["queue"]
+    assert cfg["enabled"] is False and cfg["policy"] == "block"
+
+
+def test_json_formatter_emits_valid_escaped_json():
+    import json
+
+    fmt = log_config.JsonFormatter(static_fields={"service": "srehubapp"})
+    record = logging.makeLogRecord({
+        "name": LOGGER_NAME, "levelname": "INFO", "levelno": logging.INFO,
+        "msg": 'said "hi"\n%s', "args": ("back\\slash",),
+        "request_id": "req-1", "duration_ms": 1.5,
+    })
+    out = json.loads(fmt.format(record))
+    assert out["message"] == 'said "hi"\nback\\slash'
+    assert out["service"] == "srehubapp"
+    assert out["request_id"] == "req-1" and out["duration_ms"] == 1.5
+    assert out["level"] == "INFO" and out["logger"] == LOGGER_NAME
+
+
+def test_json_formatter_includes_exception():
+    import json
+
+    fmt = log_config.JsonFormatter()
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        import sys
+        record = logging.makeLogRecord({"msg": "boom", "exc_info": sys.exc_info()})
+    assert "ValueError: bad" in json.loads(fmt.format(record))["exc_info"]
+
+
+def test_queued_record_is_a_snapshot():
+    import json
+    import sys
+
+    h = BoundedQueueHandler(queue.Queue())
+    payload = {"state": "before"}
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        record = logging.makeLogRecord({"msg": "job %s", "args": (payload,), "exc_info": sys.exc_info()})
+    h.emit(record)
+    payload["state"] = "after"
+    queued = h.queue.get_nowait()
+    assert queued is not record and record.args == (payload,)
+    assert (queued.msg, queued.args, queued.exc_info) == ("job {'state': 'before'}", None, None)
+    out = json.loads(log_config.JsonFormatter().format(queued))
+    assert out["message"] == "job {'state': 'before'}" and "ValueError: bad" in out["exc_info"]
+
+
+def test_block_policy_never_waits_on_the_event_loop():
+    import asyncio
+    import time
+
+    h = BoundedQueueHandler(queue.Queue(maxsize=1), block_timeout=5)
+
+    async def log_twice():
+        t = time.perf_counter()
+        for msg in ("first", "second"):
+            h.emit(logging.makeLogRecord({"msg": msg}))
+        return time.perf_counter() - t
+
+    assert asyncio.run(log_twice()) < 1
+    assert h.dropped == 1 and h.queue.get_nowait().msg == "first"
+
+
+def test_json_formatter_time_follows_each_records_second():
+    import json
+
+    fmt = log_config.JsonFormatter(datefmt="%S")
+    times = [json.loads(fmt.format(logging.makeLogRecord({"created": t, "msecs": 5})))["time"]
+             for t in (61.0, 61.5, 62.0, 61.0)]
+    assert times == ["01,005", "01,005", "02,005", "01,005"]
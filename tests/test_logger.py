@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+import pytest
+
+from logger import log_execution
+
+
+log = logging.getLogger("test_log_execution")
+
+
+class _Counting:
+    calls = 0
+
+    def __repr__(self):
+        _Counting.calls += 1
+        return "<counting>"
+
+
+def test_sync_logs_call_result_and_duration(caplog):
+    @log_execution(log)
+    def add(a, b):
+        return a + b
+
+    with caplog.at_level(logging.INFO, logger=log.name):
+        assert add(1, 2) == 3
+    assert "Calling: add | args=(1, 2)" in caplog.records[0].getMessage()
+    assert "Returned: add => 3" in caplog.records[1].getMessage()
+    assert caplog.records[1].func == "add"
+    assert caplog.records[1].duration_ms >= 0
+
+
+def test_async_function_stays_async(caplog):
+    @log_execution(log)
+    async def hello():
+        return {"status": "ok"}
+
+    assert asyncio.iscoroutinefunction(hello)
+    with caplog.at_level(logging.INFO, logger=log.name):
+        assert asyncio.run(hello()) == {"status": "ok"}
+    assert "Returned: hello => {'status': 'ok'}" in caplog.records[-1].getMessage()
+
+
+def test_nothing_formatted_when_level_disabled(caplog):
+    @log_execution(log)
+    def echo(x):
+        return x
+
+    _Counting.calls = 0
+    with caplog.at_level(logging.WARNING, logger=log.name):
+        echo(_Counting())
+    assert _Counting.calls == 0
+    assert not caplog.records
+
+
+def test_large_payload_is_summarized(caplog):
+    @log_execution(log, max_len=50)
+    def big():
+        return "x" * 10_000
+
+    with caplog.at_level(logging.INFO, logger=log.name):
+        big()
+    assert len(caplog.records[-1].getMessage()) < 200
+
+
+def test_exception_logged_and_reraised(caplog):
+    @log_execution(log)
+    async def boom():
+        raise ValueError("nope")
+
+    with caplog.at_level(logging.INFO, logger=log.name), pytest.raises(ValueError):
+        asyncio.run(boom())
+    assert caplog.records[-1].levelno == logging.ERROR
+    assert "Error in boom: nope" in caplog.records[-1].getMessage()
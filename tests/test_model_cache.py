@@ -0,0 +1,45 @@
+from pydantic import BaseModel, create_model
+
+from model_cache import ModelCache, spec_key
+
+
+def _build(built):
+    def build():
+        built.append(1)
+        return create_model("RacksParams", dc=(str, ...), limit=(int, 10))
+    return build
+
+
+def test_spec_key_ignores_key_order():
+    assert spec_key({"name": "dc", "type": "string"}) == spec_key({"type": "string", "name": "dc"})
+    assert spec_key([{"name": "dc"}]) != spec_key([{"name": "rack"}])
+
+
+def test_identical_specs_share_one_model():
+    cache, built = ModelCache("t", cache_dir=""), []
+    key = spec_key([{"name": "dc"}])
+    first = cache.get_or_build(key, _build(built))
+    assert cache.get_or_build(key, _build(built)) is first
+    assert issubclass(first, BaseModel) and len(built) == 1
+    assert (cache.hits, cache.builds) == (1, 1)
+    assert cache.schema(key) is None  # nothing persisted without a cache dir
+
+
+def test_schemas_survive_a_restart(tmp_path):
+    key = spec_key([{"name": "dc"}])
+    cache = ModelCache("landlord", cache_dir=str(tmp_path))
+    cache.get_or_build(key, _build([]))
+    cache.save()
+
+    restarted = ModelCache("landlord", cache_dir=str(tmp_path))
+    assert set(restarted.schema(key)["properties"]) == {"dc", "limit"}  # before any model is built
+    assert restarted.builds == 0
+    assert ModelCache("ataas", cache_dir=str(tmp_path)).schema(key) is None
+
+
+def test_unreadable_cache_file_is_ignored(tmp_path):
+    (tmp_path / "landlord.schemas.json").write_text("{not json")
+    cache = ModelCache("landlord", cache_dir=str(tmp_path))
+    assert cache.schema("anything") is None
+    cache.save()  # clean: the broken file is left for an operator to look at
+    assert (tmp_path / "landlord.schemas.json").read_text() == "{not json"
@@ -0,0 +1,292 @@
+import asyncio
+import sys
+import types
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+
+class _Registry:
+    """Stands in for common.connectors.registry: connector name -> UpstreamInfo."""
+
+    def __init__(self):
+        self.upstreams = {}
+
+    def resolve(self, connector):
+        return self.upstreams[connector]
+
+
+class _Stream(httpx.AsyncByteStream):
+    """Upstream response body: `chunks` are bytes, awaitables (waited on) or exceptions (raised)."""
+
+    def __init__(self, *chunks):
+        self.chunks, self.closed = chunks, False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if not isinstance(chunk, bytes):
+                await chunk
+                continue
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _Upstream(httpx.AsyncBaseTransport):
+    """Requests the connector pool sent, answered by the async `handler` (unlike MockTransport, the body is not pre-read)."""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = None
+
+    async def handle_async_request(self, request):
+        self.requests.append(request)
+        resp = await self.handler(request)
+        if isinstance(resp.stream, httpx.ByteStream):  # Response(content=...) arrives already read; send it as a real stream
+            resp = httpx.Response(resp.status_code, headers=resp.headers, stream=_Stream(resp.content))
+        return resp
+
+
+@pytest.fixture
+def proxy(utils, monkeypatch):
+    """utils/proxy.py with stand-ins for the app's models.proxy and common.connectors, and fresh proxier state."""
+    registry = _Registry()
+    for name, attrs in {"models": {}, "models.proxy": {"UpstreamInfo": types.SimpleNamespace},
+                        "common": {}, "common.connectors": {"registry": registry}}.items():
+        if name not in sys.modules:
+            monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+        for attr, value in attrs.items():
+            setattr(sys.modules[name], attr, value)
+    module = utils("proxy")
+    monkeypatch.setattr(module, "registry", registry)
+    monkeypatch.setattr(utils("proxy_pools"), "_pools", {})
+    monkeypatch.setattr(utils("proxy_cache"), "_policies", {})
+    monkeypatch.setattr(utils("proxy_ratelimit"), "_admissions", {})
+    monkeypatch.setattr(module, "http_cache", utils("proxy_cache").HttpCache(disk_dir=None))
+    monkeypatch.setattr(module, "coalescer", utils("proxy_coalesce").Coalescer())
+    return module
+
+
+@pytest.fixture
+def svc(proxy, utils):
+    """Connector "svc" (options via `svc.configure(**UpstreamInfo attrs)`) behind a hub app at http://hub/svc/."""
+    upstream = _Upstream()
+    ns = types.SimpleNamespace(upstream=upstream)
+
+    def configure(**attrs):
+        for state in (utils("proxy_pools")._pools, utils("proxy_cache")._policies, utils("proxy_ratelimit")._admissions):
+            state.pop("svc", None)
+        proxy.registry.upstreams["svc"] = up = types.SimpleNamespace(base_url="http://upstream/",
+                                                                     auth_headers={"x-upstream-key": "k"}, **attrs)
+        ns.pool = proxy.pool_for("svc", up)
+        ns.pool.client = httpx.AsyncClient(transport=upstream)
+        ns.admission = proxy.admission_for("svc", up)
+
+    app = FastAPI()
+
+    @app.api_route("/svc/{path:path}", methods=["GET", "POST", "PUT"])
+    async def _route(request: Request, path: str):
+        return await proxy.proxy_request(request, "svc", path)
+
+    ns.configure = configure
+    ns.client = lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://hub")
+    configure()
+    return ns
+
+
+def _call(svc, method, path, **kw):
+    async def run():
+        async with svc.client() as client:
+            return await client.request(method, path, **kw)
+    return asyncio.run(run())
+
+
+# ---------- streaming ----------
+
+def test_upstream_gets_the_first_chunks_before_the_caller_body_is_read(svc):
+    received = []
+
+    async def run():
+        first_chunk_upstream = asyncio.Event()
+
+        async def upstream(request):
+            async for chunk in request.stream:
+                received.append(chunk)
+                first_chunk_upstream.set()
+            return httpx.Response(200, json={"bytes": sum(map(len, received))})
+
+        async def caller_body():
+            yield b"a" * 10
+            # a buffering proxy would wait here for the rest of the body: the upstream never sees "a"
+            await asyncio.wait_for(first_chunk_upstream.wait(), 2)
+            yield b"b" * 10
+
+        svc.upstream.handler = upstream
+        async with svc.client() as client:
+            return await client.put("/svc/blobs/1", content=caller_body())
+
+    resp = asyncio.run(run())
+    assert resp.status_code == 200 and resp.json() == {"bytes": 20}
+    assert received[0] == b"a" * 10
+
+
+def test_failed_upload_is_not_retried_once_bytes_went_upstream(svc):
+    async def upstream(request):
+        async for _ in request.stream:
+            pass
+        raise httpx.WriteError("connection reset mid-upload")
+
+    svc.upstream.handler = upstream
+    resp = _call(svc, "POST", "/svc/jobs", content=b"payload")
+    assert resp.status_code == 502 and len(svc.upstream.requests) == 1
+
+
+def test_failure_before_any_byte_was_sent_is_retried(svc):
+    async def upstream(request):
+        if len(svc.upstream.requests) == 1:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(201, content=await request.aread())
+
+    svc.upstream.handler = upstream
+    resp = _call(svc, "POST", "/svc/jobs", content=b"payload")
+    assert resp.status_code == 201 and resp.content == b"payload"
+    assert len(svc.upstream.requests) == 2
+
+
+def test_upstream_response_is_released_by_the_background_task(svc, proxy, monkeypatch):
+    body, released = _Stream(b"one", b"two"), []
+
+    async def upstream(request):
+        return httpx.Response(200, stream=body)
+
+    async def spy_release(pool, resp):
+        released.append(pool.active)  # the connection is still held when the body has gone out
+        await real_release(pool, resp)
+
+    real_release = proxy._release
+    monkeypatch.setattr(proxy, "_release", spy_release)
+    svc.upstream.handler = upstream
+    resp = _call(svc, "POST", "/svc/jobs")
+    assert resp.content == b"onetwo"
+    assert released == [1] and body.closed and svc.pool.active == 0
+
+
+def test_upstream_abort_mid_body_ends_the_body(svc):
+    async def upstream(request):
+        return httpx.Response(200, stream=_Stream(b"partial", httpx.ReadError("upstream went away")))
+
+    svc.upstream.handler = upstream
+    resp = _call(svc, "POST", "/svc/export")
+    assert resp.status_code == 200 and resp.content == b"partial"
+    assert svc.pool.active == 0
+
+
+# ---------- admission ----------
+
+def test_admission_slot_is_held_until_the_body_is_sent(svc):
+    svc.configure(rate_enabled=True, rate_max_concurrent=1)
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def upstream(request):
+            return httpx.Response(200, stream=_Stream(b"head", gate.wait(), b"tail"))
+
+        svc.upstream.handler = upstream
+        async with svc.client() as client:
+            first = asyncio.ensure_future(client.post("/svc/report"))
+            await asyncio.sleep(0.05)
+            during = svc.admission.queue.active
+            gate.set()
+            resp = await first
+            return during, resp, svc.admission.queue.active
+
+    during, resp, after = asyncio.run(run())
+    assert resp.content == b"headtail"
+    assert (during, after) == (1, 0)
+
+
+def test_admission_slot_is_freed_when_the_request_errors(svc):
+    svc.configure(rate_enabled=True, rate_max_concurrent=1)
+
+    async def upstream(request):
+        raise RuntimeError("bug in a transport")
+
+    svc.upstream.handler = upstream
+    with pytest.raises(RuntimeError):
+        _call(svc, "POST", "/svc/jobs")
+    assert svc.admission.queue.active == 0
+
+
+def test_pool_timeout_is_503_with_retry_after(svc):
+    svc.configure(rate_enabled=True, pool_timeout=3.0)
+
+    async def upstream(request):
+        raise httpx.PoolTimeout("no free connection")
+
+    svc.upstream.handler = upstream
+    resp = _call(svc, "POST", "/svc/jobs")
+    assert resp.status_code == 503 and resp.headers["retry-after"] == "3"
+    assert len(svc.upstream.requests) == 1  # not retried
+    assert svc.pool.stats()["pool_timeouts"] == 1 and svc.admission.queue.active == 0
+
+
+# ---------- shared cache ----------
+
+def _cached(svc, *responses):
+    """Cache-enabled svc whose upstream answers with `responses` in turn (exceptions are raised)."""
+    svc.configure(cache_enabled=True)
+    answers = list(responses)
+
+    async def upstream(request):
+        answer = answers.pop(0)
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+    svc.upstream.handler = upstream
+
+
+def _gets(svc, n, **kw):
+    async def run():
+        async with svc.client() as client:
+            return [await client.get("/svc/items", **kw) for _ in range(n)]
+    return asyncio.run(run())
+
+
+def test_fresh_entries_are_served_from_the_cache(svc):
+    _cached(svc, httpx.Response(200, json=[1, 2], headers={"cache-control": "max-age=60", "etag": '"v1"'}))
+    miss, hit = _gets(svc, 2)
+    assert miss.headers["x-cache"] == "MISS" and hit.headers["x-cache"] == "HIT"
+    assert hit.json() == [1, 2] and len(svc.upstream.requests) == 1
+
+
+def test_expired_entry_is_revalidated_and_refreshed_by_a_304(svc):
+    _cached(svc, httpx.Response(200, json=[1], headers={"cache-control": "max-age=0", "etag": '"v1"'}),
+            httpx.Response(304, headers={"cache-control": "max-age=60", "etag": '"v1"'}))
+    miss, revalidated, hit = _gets(svc, 3)
+    assert [r.headers["x-cache"] for r in (miss, revalidated, hit)] == ["MISS", "HIT", "HIT"]
+    assert revalidated.json() == [1] and "max-age=60" in revalidated.headers["cache-control"]
+    assert svc.upstream.requests[1].headers["if-none-match"] == '"v1"'
+    assert len(svc.upstream.requests) == 2  # the refreshed entry is fresh again
+
+
+@pytest.mark.parametrize("failure", [httpx.Response(503, text="down"), httpx.PoolTimeout("saturated")],
+                         ids=["5xx", "pool-timeout"])
+def test_expired_entry_is_served_stale_when_the_upstream_fails(svc, failure):
+    _cached(svc, httpx.Response(200, json=[1], headers={"cache-control": "max-age=0", "etag": '"v1"'}), failure)
+    miss, stale = _gets(svc, 2)
+    assert stale.status_code == 200 and stale.json() == [1]
+    assert stale.headers["x-cache"] == "STALE"
+
+
+def test_callers_own_validators_are_answered_from_the_cache(svc):
+    _cached(svc, httpx.Response(200, json=[1], headers={"cache-control": "max-age=60", "etag": '"v1"'}))
+    _gets(svc, 1)
+    [resp] = _gets(svc, 1, headers={"If-None-Match": '"v1"'})
+    assert resp.status_code == 304 and resp.headers["x-cache"] == "HIT"
+    assert "if-none-match" not in svc.upstream.requests[0].headers
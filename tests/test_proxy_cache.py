@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def proxy_cache(utils):
+    return utils("proxy_cache")
+
+
+def _put(cache, proxy_cache, lang, body=b"x" * 10, vary="Accept-Language"):
+    policy = proxy_cache.CachePolicy(enabled=True)
+    headers = {"vary": vary} if vary else {}
+    return asyncio.run(cache.put("p", {"Accept-Language": lang}, 200, headers, body, 60.0, policy))
+
+
+def test_evicting_one_variant_keeps_the_others_reachable(proxy_cache):
+    cache = proxy_cache.HttpCache(memory_bytes=25, disk_dir=None)
+    for lang in ("en", "fr", "de"):
+        _put(cache, proxy_cache, lang)
+    assert cache.evictions == 1  # en
+    assert cache.get("p", {"Accept-Language": "en"}) is None
+    assert cache.get("p", {"Accept-Language": "fr"}).body == b"x" * 10
+    assert cache.get("p", {"Accept-Language": "de"}) is not None
+
+
+def test_vary_is_forgotten_with_the_last_variant(proxy_cache):
+    cache = proxy_cache.HttpCache(memory_bytes=15, disk_dir=None)
+    _put(cache, proxy_cache, "en")
+    _put(cache, proxy_cache, "fr")  # evicts en
+    assert cache._vary == {"p": ("accept-language",)}
+    cache.memory_bytes = 0
+    cache._evict()
+    assert cache._vary == {} and cache._variants == {}
+
+
+def test_rejected_body_leaves_no_vary_behind(proxy_cache):
+    cache = proxy_cache.HttpCache(memory_bytes=5, disk_dir=None)
+    assert _put(cache, proxy_cache, "en") is None
+    assert cache._vary == {} and cache.stats()["memory_entries"] == 0
+
+
+def test_vary_change_drops_unreachable_variants(proxy_cache):
+    cache = proxy_cache.HttpCache(disk_dir=None)
+    _put(cache, proxy_cache, "en")
+    _put(cache, proxy_cache, "fr")
+    _put(cache, proxy_cache, "en", vary="")
+    assert cache.stats()["memory_entries"] == 1
+    assert cache.get("p", {"Accept-Language": "fr"}).body == b"x" * 10  # served the unvaried entry
+
+
+def test_large_bodies_go_to_disk_and_are_served_from_it(proxy_cache, tmp_path):
+    cache = proxy_cache.HttpCache(disk_dir=str(tmp_path), mmap_min_bytes=100)
+    body = bytes(range(256)) * 1000
+    entry = _put(cache, proxy_cache, "en", body=body)
+    assert entry.body is None and entry.path.startswith(str(tmp_path))
+    assert b"".join(cache.get("p", {"Accept-Language": "en"}).iter_body()) == body
+    assert cache.stats()["disk_bytes"] == len(body)
+    cache.close()
+    assert not list(tmp_path.iterdir())
+
+
+def test_disk_write_failure_is_not_stored(proxy_cache, tmp_path):
+    cache = proxy_cache.HttpCache(disk_dir=str(tmp_path), mmap_min_bytes=1)
+    cache.close()  # its directory is gone
+    assert _put(cache, proxy_cache, "en") is None
+    assert cache._vary == {} and cache.stats()["disk_entries"] == 0
+
+
+@pytest.mark.parametrize("headers,ttl", [
+    ({"cache-control": "max-age=60", "age": "10"}, 50.0),
+    ({"cache-control": "s-maxage=30, max-age=60"}, 30.0),
+    ({"cache-control": "no-cache"}, 0.0),
+    ({"cache-control": "private, max-age=60"}, None),
+    ({"vary": "*"}, None),
+    ({}, 5.0),
+])
+def test_freshness(proxy_cache, headers, ttl):
+    assert proxy_cache.freshness(headers, proxy_cache.CachePolicy(default_ttl=5.0)) == ttl
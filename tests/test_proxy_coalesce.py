@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def coalesce(utils):
+    return utils("proxy_coalesce")
+
+
+def _upstream(chunks, sent):
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def send():
+        sent.append(1)
+        await asyncio.sleep(0.01)  # let the other callers attach
+        return httpx.Response(200, content=body())
+
+    return send
+
+
+async def _release(resp):
+    await resp.aclose()
+
+
+async def _read(shared):
+    return b"".join([c async for c in shared.aiter_raw()])
+
+
+def test_concurrent_callers_share_one_upstream_request(coalesce):
+    c = coalesce.Coalescer(max_buffer=1024)
+    sent = []
+
+    async def run():
+        send = _upstream([b"ab", b"cd"], sent)
+        shared = await asyncio.gather(*(c.fetch("k", send, _release) for _ in range(3)))
+        return shared, await asyncio.gather(*(_read(s) for s in shared))
+
+    shared, bodies = asyncio.run(run())
+    assert bodies == [b"abcd"] * 3 and len(sent) == 1
+    assert c.stats()["coalesced"] == 2 and c.stats()["inflight"] == 0
+    assert [s.claim() for s in shared] == [True, False, False]  # one caller stores the body
+
+
+def test_flights_do_not_share_claims(coalesce):
+    c = coalesce.Coalescer()
+
+    async def run():
+        first = await c.fetch(None, _upstream([b"x"], []), _release)
+        second = await c.fetch(None, _upstream([b"x"], []), _release)
+        await asyncio.gather(_read(first), _read(second))
+        return first.claim(), second.claim()
+
+    assert asyncio.run(run()) == (True, True)
+
+
+def test_send_errors_reach_every_caller(coalesce):
+    c = coalesce.Coalescer()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("refused")
+
+    async def run():
+        return await asyncio.gather(*(c.fetch("k", fail, _release) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, httpx.ConnectError) for r in results)
+    assert c.stats()["upstream_requests"] == 1
+
+
+def test_late_callers_start_their_own_flight(coalesce):
+    c = coalesce.Coalescer(max_buffer=1)
+    sent = []
+
+    async def run():
+        send = _upstream([b"a", b"b", b"c"], sent)
+        first = await c.fetch("k", send, _release)
+        it = first.aiter_raw()
+        assert await it.__anext__() == b"a"
+        await asyncio.sleep(0.01)  # the pump trims "a": the flight is no longer joinable
+        late = await c.fetch("k", send, _release)
+        rest = b"".join([ch async for ch in it])
+        return rest, await _read(late)
+
+    rest, late_body = asyncio.run(run())
+    assert rest == b"bc" and late_body == b"abc"
+    assert len(sent) == 2 and c.stats()["too_late"] == 1
+
+
+def test_disabled_coalescer_never_shares(coalesce):
+    c = coalesce.Coalescer(enabled=False)
+    sent = []
+
+    async def run():
+        send = _upstream([b"x"], sent)
+        shared = await asyncio.gather(*(c.fetch("k", send, _release) for _ in range(2)))
+        await asyncio.gather(*(_read(s) for s in shared))
+
+    asyncio.run(run())
+    assert len(sent) == 2
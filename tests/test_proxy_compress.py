@@ -0,0 +1,79 @@
+import asyncio
+import gzip
+
+import pytest
+
+JSON = {"content-type": "application/json", "etag": '"v1"', "vary": "Cookie", "content-length": "20000"}
+
+
+@pytest.fixture
+def compress(utils, monkeypatch):
+    module = utils("proxy_compress")
+    monkeypatch.setattr(module, "COMPRESS", True)
+    monkeypatch.setattr(module, "COMPRESS_ENCODINGS", ["zstd", "br", "gzip"])
+    monkeypatch.setattr(module, "COMPRESS_MIN_BYTES", 1024)
+    monkeypatch.setattr(module, "budget", module._CpuBudget(0.2))
+    monkeypatch.setattr(module, "_counters", dict.fromkeys(module._counters, 0))
+    return module
+
+
+async def _body(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(body):
+    return b"".join([c async for c in body])
+
+
+def test_upstream_is_only_asked_for_codings_the_caller_accepts(compress):
+    assert compress.upstream_accept_encoding("gzip, br;q=0.5, zstd;q=0") == "gzip, br"
+    assert compress.upstream_accept_encoding(None) == "identity"
+    assert compress.upstream_accept_encoding("*") == "gzip, br, zstd, deflate"
+
+
+def test_upstream_encoded_bodies_pass_through_untouched(compress):
+    headers = {**JSON, "content-encoding": "br"}
+    out, body = compress.maybe_compress({"accept-encoding": "gzip"}, "GET", 200, headers, _body([b"\x0b\x02"]))
+    assert out == headers and asyncio.run(_collect(body)) == b"\x0b\x02"
+
+
+def test_large_json_is_gzipped_for_callers_that_accept_it(compress):
+    payload = b'{"items": [' + b'{"id": 1},' * 2000 + b"{}]}"
+    out, body = compress.maybe_compress({"accept-encoding": "gzip"}, "GET", 200, JSON,
+                                        _body([payload[:5000], payload[5000:]]))
+    assert out["content-encoding"] == "gzip" and "content-length" not in out
+    assert out["vary"] == "Cookie, Accept-Encoding" and out["etag"] == 'W/"v1"'
+    assert gzip.decompress(asyncio.run(_collect(body))) == payload
+    stats = compress.compression_stats()
+    assert stats["compressed"] == 1 and stats["bytes_in"] == len(payload) > stats["bytes_out"]
+
+
+@pytest.mark.parametrize("request_headers, method, status, headers", [
+    ({"accept-encoding": "gzip"}, "HEAD", 200, JSON),
+    ({"accept-encoding": "gzip"}, "GET", 206, JSON),
+    ({"accept-encoding": "gzip"}, "GET", 200, {**JSON, "content-length": "100"}),
+    ({"accept-encoding": "gzip"}, "GET", 200, {**JSON, "content-type": "image/png"}),
+    ({"accept-encoding": "gzip"}, "GET", 200, {**JSON, "cache-control": "no-transform"}),
+    ({"accept-encoding": "identity"}, "GET", 200, JSON),
+], ids=["head", "partial", "small", "binary", "no-transform", "not-accepted"])
+def test_responses_that_are_forwarded_as_is(compress, request_headers, method, status, headers):
+    assert compress.choose_encoding(request_headers, method, status, headers, None) is None
+
+
+def test_caller_preference_then_server_preference(compress, monkeypatch):
+    monkeypatch.setattr(compress, "_available", lambda coding: True)
+    assert compress.choose_encoding({"accept-encoding": "gzip, br;q=0.5"}, "GET", 200, JSON, None) == "gzip"
+    assert compress.choose_encoding({"accept-encoding": "gzip, br, zstd"}, "GET", 200, JSON, None) == "zstd"
+
+
+def test_cpu_budget_skips_compression_once_spent(compress, monkeypatch):
+    monkeypatch.setattr(compress.budget, "_roll", lambda: None)  # stay in one window
+    compress.budget.charge(0.5)
+    assert compress.choose_encoding({"accept-encoding": "gzip"}, "GET", 200, JSON, None) is None
+    assert compress.compression_stats()["skipped_cpu_budget"] == 1
+
+
+def test_compression_is_opt_in(compress, monkeypatch):
+    monkeypatch.setattr(compress, "COMPRESS", False)
+    assert compress.choose_encoding({"accept-encoding": "gzip"}, "GET", 200, JSON, None) is None
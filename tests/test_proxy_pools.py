@@ -0,0 +1,88 @@
+import asyncio
+import types
+from dataclasses import dataclass
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+# Stub upstream, served by `serve`: pool limits only bite on real connections
+upstream = FastAPI()
+
+
+@upstream.get("/ok")
+async def _ok():
+    return {"ok": True}
+
+
+@pytest.fixture(scope="module")
+def upstream_url(serve):
+    return serve(upstream)
+
+
+@pytest.fixture
+def pools(utils, monkeypatch):
+    module = utils("proxy_pools")
+    monkeypatch.setattr(module, "_pools", {})
+    for name in ("PROXY_MAX_CONNECTIONS", "PROXY_BILLING_MAX_CONNECTIONS", "PROXY_HTTP2", "PROXY_BILLING_HTTP2"):
+        monkeypatch.delenv(name, raising=False)
+    return module
+
+
+def test_settings_precedence(pools, monkeypatch):
+    assert pools.PoolSettings.resolve("billing", None).max_connections == 200
+    monkeypatch.setenv("PROXY_MAX_CONNECTIONS", "50")
+    monkeypatch.setenv("PROXY_HTTP2", "yes")
+    assert pools.PoolSettings.resolve("billing", None).max_connections == 50
+    monkeypatch.setenv("PROXY_BILLING_MAX_CONNECTIONS", "10")
+    monkeypatch.setenv("PROXY_BILLING_HTTP2", "false")
+    settings = pools.PoolSettings.resolve("billing", None)
+    assert (settings.max_connections, settings.http2) == (10, False)
+    assert pools.PoolSettings.resolve("other", None).http2 is True
+    up = types.SimpleNamespace(max_connections=3, ca_bundle="/etc/ca.pem")
+    assert pools.PoolSettings.resolve("billing", up) == pools.PoolSettings(max_connections=3, http2=False,
+                                                                           ca_bundle="/etc/ca.pem")
+
+
+def test_grouped_settings_use_their_prefix(pools, monkeypatch):
+    @dataclass(frozen=True)
+    class Cache:
+        ttl: float = 1.0
+
+    monkeypatch.setenv("PROXY_CACHE_TTL", "9")
+    assert pools.resolve_settings(Cache, "billing", None, group="cache").ttl == 9.0
+    assert pools.resolve_settings(Cache, "billing", types.SimpleNamespace(cache_ttl=2.5), group="cache").ttl == 2.5
+
+
+def test_each_connector_gets_its_own_pool(pools):
+    async def run():
+        a, again, b = pools.pool_for("a", None), pools.pool_for("a", None), pools.pool_for("b", None)
+        await pools.close_pools()
+        return a, again, b
+
+    a, again, b = asyncio.run(run())
+    assert a is again and a.client is not b.client
+    assert a.client.is_closed and pools.pool_stats() == {}
+
+
+def test_held_streams_count_as_active_until_released(pools, upstream_url):
+    up = types.SimpleNamespace(max_connections=1, pool_timeout=0.05)
+
+    async def run():
+        pool = pools.pool_for("slow", up)
+        held = await pool.send(pool.client.build_request("GET", f"{upstream_url}/ok"), stream=True)
+        busy = pool.stats()
+        with pytest.raises(httpx.PoolTimeout):
+            await pool.send(pool.client.build_request("GET", f"{upstream_url}/ok"))
+        await pool.release(held)
+        after = await pool.send(pool.client.build_request("GET", f"{upstream_url}/ok"))
+        stats = pool.stats()
+        await pools.close_pools()
+        return busy, after, stats
+
+    busy, after, stats = asyncio.run(run())
+    assert busy["active"] == 1 and busy["saturation"] == 1.0
+    assert after.json() == {"ok": True}
+    assert stats["active"] == 0 and stats["peak_active"] == 2
+    assert stats["requests"] == 3 and stats["pool_timeouts"] == 1
+    assert stats["connections"] == stats["idle_connections"] == 1
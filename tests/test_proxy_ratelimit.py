@@ -0,0 +1,125 @@
+import asyncio
+import os
+import types
+
+import pytest
+from starlette.datastructures import Headers
+
+
+@pytest.fixture
+def ratelimit(utils):
+    return utils("proxy_ratelimit")
+
+
+def _request(headers=None, host="10.0.0.1", user=None):
+    return types.SimpleNamespace(headers=Headers(headers or {}), client=types.SimpleNamespace(host=host),
+                                 state=types.SimpleNamespace(user=user))
+
+
+def test_admission_is_opt_in(ratelimit):
+    assert not ratelimit.RatePolicy().enabled
+    admission = ratelimit.Admission("c", ratelimit.RatePolicy(caller_rate=1, caller_burst=1))
+    for _ in range(5):
+        asyncio.run(admission.acquire("ip:lb"))
+    assert admission.admitted == 0
+
+
+def test_caller_then_connector_limits(ratelimit):
+    policy = ratelimit.RatePolicy(enabled=True, caller_rate=1, caller_burst=1, connector_rate=1, connector_burst=2)
+    admission = ratelimit.Admission("c", policy)
+    asyncio.run(admission.acquire("a"))
+    with pytest.raises(ratelimit.Rejected) as e:
+        asyncio.run(admission.acquire("a"))
+    assert e.value.status == 429
+    asyncio.run(admission.acquire("b"))
+    with pytest.raises(ratelimit.Rejected) as e:
+        asyncio.run(admission.acquire("c"))
+    assert e.value.status == 503
+    assert admission._callers["c"].tokens == pytest.approx(1.0, abs=0.01)  # refunded
+
+
+def test_caller_identity(ratelimit):
+    policy = ratelimit.RatePolicy(caller_header="x-team")
+    assert ratelimit.caller_identity(_request({"x-team": "sre"}), policy) == "h:sre"
+    assert ratelimit.caller_identity(_request(user={"sub": "alice"}), policy) == "u:alice"
+    # unverified credentials would give every request a fresh bucket
+    assert ratelimit.caller_identity(_request({"authorization": "Bearer random-1"}), policy) == "ip:10.0.0.1"
+    assert ratelimit.caller_identity(_request({"x-api-key": "random-2"}), policy) == "ip:10.0.0.1"
+    assert ratelimit.caller_identity(_request({"x-forwarded-for": "1.2.3.4"}), policy) == "ip:10.0.0.1"
+
+
+@pytest.mark.parametrize("xff,trusted,ip", [
+    ("203.0.113.7", 1, "203.0.113.7"),
+    ("6.6.6.6, 203.0.113.7", 1, "203.0.113.7"),  # the caller cannot pick its identity
+    ("6.6.6.6, 203.0.113.7, 10.1.1.1", 2, "203.0.113.7"),
+    ("", 1, "10.0.0.1"),
+    ("6.6.6.6", 2, "10.0.0.1"),  # short chain: the only hop may be caller-written
+])
+def test_client_ip_past_trusted_proxies(ratelimit, xff, trusted, ip):
+    assert ratelimit.client_ip(_request({"x-forwarded-for": xff} if xff else {}), trusted) == ip
+
+
+def test_fair_queue_serves_callers_round_robin(ratelimit):
+    queue = ratelimit.FairQueue(limit=1, size=10, per_caller=5, timeout=1.0)
+    order = []
+
+    async def run():
+        await queue.acquire("holder")
+
+        async def waiter(caller):
+            await queue.acquire(caller)
+            order.append(caller)
+
+        tasks = [asyncio.ensure_future(waiter(c)) for c in ("a", "a", "a", "b")]
+        await asyncio.sleep(0)
+        for _ in range(4):
+            queue.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["a", "b", "a", "a"]
+
+
+def test_fair_queue_rejects_when_a_caller_fills_its_share(ratelimit):
+    queue = ratelimit.FairQueue(limit=1, size=10, per_caller=1, timeout=1.0)
+
+    async def run():
+        await queue.acquire("holder")
+        first = asyncio.ensure_future(queue.acquire("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(ratelimit.Rejected):
+            await queue.acquire("a")
+        queue.release()
+        await first
+
+    asyncio.run(run())
+
+
+def test_file_buckets_are_shared_and_swept_once_refilled(ratelimit, tmp_path):
+    a = ratelimit.FileTokenBucket(str(tmp_path), "c alice", rate=1000, burst=1)
+    b = ratelimit.FileTokenBucket(str(tmp_path), "c alice", rate=1000, burst=1)
+    slow = ratelimit.FileTokenBucket(str(tmp_path), "c bob", rate=0.001, burst=1)
+    assert a.take() == 0 and b.take() > 0  # one bucket across workers
+    assert slow.take() == 0
+    asyncio.run(asyncio.sleep(0.01))  # alice refills, bob does not
+
+    assert ratelimit.sweep_buckets(str(tmp_path)) == 1
+    assert not os.path.exists(a.path) and os.path.exists(slow.path)
+    assert a.take() == 0  # a swept bucket starts full
+
+
+def test_shared_admission_sweeps_as_callers_arrive(ratelimit, tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "_SWEEP_INTERVAL", 0.0)
+    policy = ratelimit.RatePolicy(enabled=True, caller_rate=1000, caller_burst=1, shared_dir=str(tmp_path))
+    admission = ratelimit.Admission("c", policy)
+
+    async def run():
+        for i in range(20):
+            await admission.acquire(f"ip:{i}")
+            admission.release()
+            await asyncio.sleep(0.002)
+
+    asyncio.run(run())
+    assert admission.stats()["swept"] >= 15
+    assert len(os.listdir(tmp_path)) <= 3
@@ -0,0 +1,216 @@
+import asyncio
+import time
+import types
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+pytest.importorskip("authlib")
+pytest.importorskip("cryptography")
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI
+
+from auth.newwithauth import decorators
+from auth.newwithauth.decorators import RequireAuth, _ClaimsCache
+
+ISSUER = "https://idp"
+KEYS = {kid: rsa.generate_private_key(public_exponent=65537, key_size=2048) for kid in ("k1", "k2")}
+
+# Stub IdP JWKS endpoint; `published` is the key set it currently serves
+idp = FastAPI()
+published = ["k1"]
+jwks_fetches = []
+
+
+@idp.get("/jwks")
+async def _jwks():
+    jwks_fetches.append(1)
+    await asyncio.sleep(0.01)
+    keys = []
+    for kid in published:
+        jwk = jwt.algorithms.RSAAlgorithm.to_jwk(KEYS[kid].public_key(), as_dict=True)
+        keys.append({**jwk, "kid": kid, "use": "sig", "alg": "RS256"})
+    return {"keys": keys}
+
+
+@pytest.fixture(scope="module")
+def idp_cfg(serve):
+    return {"issuer": ISSUER, "jwks_uri": f"{serve(idp)}/jwks"}
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    published[:] = ["k1"]
+    jwks_fetches.clear()
+    monkeypatch.setattr(decorators, "_claims_cache", _ClaimsCache(16))
+
+
+def _auth(**kw):
+    return RequireAuth(types.SimpleNamespace(client_id="hub"), **kw)
+
+
+def _token(kid="k1", sub="alice", exp_in=3600):
+    claims = {"iss": ISSUER, "aud": "hub", "sub": sub, "exp": int(time.time()) + exp_in}
+    return jwt.encode(claims, KEYS[kid], algorithm="RS256", headers={"kid": kid})
+
+
+def test_claims_cache_drops_expired_and_least_recent():
+    cache = _ClaimsCache(2)
+    cache.put("old", {"sub": "a"}, time.time() - 1)
+    cache.put("b", {"sub": "b"}, time.time() + 60)
+    cache.put("c", {"sub": "c"}, time.time() + 60)
+    assert cache.get("old") is None
+    assert cache.get("b") == {"sub": "b"}  # "b" is now the most recent
+    cache.put("d", {"sub": "d"}, time.time() + 60)
+    assert cache.get("c") is None and cache.get("b") is not None
+
+
+def test_verified_claims_are_cached_and_copied(idp_cfg):
+    auth, idt = _auth(), _token()
+
+    async def run():
+        first = await auth._verify_id_token(idp_cfg, idt)
+        first["sub"] = "mallory"  # e.g. a route editing request.state.user["claims"]
+        return await _auth()._verify_id_token(idp_cfg, idt)  # another route, same session
+
+    assert asyncio.run(run())["sub"] == "alice"
+    assert len(jwks_fetches) == 1
+
+
+def test_claims_are_not_cached_past_the_token_exp(idp_cfg, monkeypatch):
+    decodes = []
+    monkeypatch.setattr(jwt, "decode", lambda *a, real=jwt.decode, **kw: decodes.append(1) or real(*a, **kw))
+    auth, idt = _auth(), _token(exp_in=-5)  # expired, but within the clock skew
+    asyncio.run(auth._verify_id_token(idp_cfg, idt))
+    asyncio.run(auth._verify_id_token(idp_cfg, idt))
+    assert len(decodes) == 2
+
+
+def test_concurrent_verifies_share_one_jwks_fetch(idp_cfg):
+    auth = _auth()
+
+    async def run():
+        return await asyncio.gather(*(auth._verify_id_token(idp_cfg, _token(sub=f"u{i}")) for i in range(5)))
+
+    assert [c["sub"] for c in asyncio.run(run())] == [f"u{i}" for i in range(5)]
+    assert len(jwks_fetches) == 1
+
+
+def test_unknown_kid_refetches_rotated_keys(idp_cfg):
+    auth = _auth()
+
+    async def run():
+        await auth._verify_id_token(idp_cfg, _token("k1"))
+        published[:] = ["k1", "k2"]
+        with pytest.raises(jwt.InvalidKeyError):
+            await auth._verify_id_token(idp_cfg, _token("k2"))  # keys fetched under 10s ago
+        auth._jwks_fetched_at -= 11
+        return await auth._verify_id_token(idp_cfg, _token("k2", sub="bob"))
+
+    assert asyncio.run(run())["sub"] == "bob"
+    assert len(jwks_fetches) == 2
+
+
+class _Decider:
+    """Stands in for _AuthzClient: answers from `allowed`, or raises when it is an exception."""
+
+    def __init__(self, allowed=True):
+        self.allowed, self.calls = allowed, []
+
+    async def decide(self, payload, headers):
+        self.calls.append(payload["subject"])
+        await asyncio.sleep(0.01)
+        if isinstance(self.allowed, Exception):
+            raise self.allowed
+        return self.allowed
+
+
+def _authz(decider, **kw):
+    auth = _auth(authz_api_url="http://authz/authz", **kw)
+    auth._authz_client = decider
+    return auth
+
+
+def test_decision_cache_stale_window_and_eviction():
+    cache = decorators._DecisionCache(2)
+    cache.put("a", True, ttl=10, stale_ttl=5, now=0)
+    assert cache.get("a", 9) == (True, False)
+    assert cache.get("a", 12) == (True, True)
+    assert cache.get("a", 15) == (None, False)
+    cache.put("b", True, 10, 0, now=0)
+    cache.put("c", False, 10, 0, now=0)
+    cache.put("d", True, 10, 0, now=0)
+    assert cache.get("b", 1) == (None, False)
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+
+
+def test_stale_grant_is_served_while_it_revalidates(monkeypatch):
+    decider = _Decider()
+    auth = _authz(decider, decision_ttl_secs=10, stale_ttl_secs=30)
+    now = [1000.0]
+    monkeypatch.setattr(decorators.time, "time", lambda: now[0])
+
+    async def run():
+        assert await auth._check_authorization("alice", None, "read")
+        now[0] += 15
+        decider.allowed = False  # grant revoked upstream
+        stale = await auth._check_authorization("alice", None, "read")
+        await asyncio.sleep(0.05)  # background revalidation lands
+        return stale, await auth._check_authorization("alice", None, "read")
+
+    assert asyncio.run(run()) == (True, False)
+    assert decider.calls == ["alice", "alice"]
+    assert auth._decisions.stats()["stale_hits"] == 1
+
+
+def test_denials_expire_quickly_and_are_never_stale(monkeypatch):
+    decider = _Decider(allowed=False)
+    auth = _authz(decider, negative_ttl_secs=5, stale_ttl_secs=30)
+    now = [1000.0]
+    monkeypatch.setattr(decorators.time, "time", lambda: now[0])
+
+    async def run():
+        first = await auth._check_authorization("bob", None, "read")
+        now[0] += 6
+        decider.allowed = True  # access granted upstream
+        return first, await auth._check_authorization("bob", None, "read")
+
+    assert asyncio.run(run()) == (False, True)
+    assert decider.calls == ["bob", "bob"]
+
+
+@pytest.mark.parametrize("deny_on_error", [True, False])
+def test_authz_errors_follow_deny_on_error(deny_on_error):
+    auth = _authz(_Decider(allowed=RuntimeError("authz down")), deny_on_error=deny_on_error)
+    assert asyncio.run(auth._check_authorization("carol", None, "read")) is not deny_on_error
+
+
+def test_errors_are_not_cached(monkeypatch):
+    decider = _Decider(allowed=RuntimeError("authz down"))
+    auth = _authz(decider, deny_on_error=False)
+
+    async def run():
+        during = await auth._check_authorization("dave", None, "read")
+        decider.allowed = False  # back up, and dave is denied
+        return during, await auth._check_authorization("dave", None, "read")
+
+    assert asyncio.run(run()) == (True, False)  # the outage fallback was not kept as a grant
+    assert decider.calls == ["dave", "dave"]
+
+
+def test_failed_revalidation_keeps_the_stale_grant(monkeypatch):
+    decider = _Decider()
+    auth = _authz(decider, decision_ttl_secs=10, stale_ttl_secs=30)
+    now = [1000.0]
+    monkeypatch.setattr(decorators.time, "time", lambda: now[0])
+
+    async def run():
+        await auth._check_authorization("erin", None, "read")
+        now[0] += 15
+        decider.allowed = RuntimeError("authz returned 500")
+        stale = await auth._check_authorization("erin", None, "read")
+        await asyncio.sleep(0.05)  # background revalidation fails
+        return stale, await auth._check_authorization("erin", None, "read")
+
+    assert asyncio.run(run()) == (True, True)  # still the known grant, not a cached deny
+    assert auth._decisions.stats()["stale_hits"] == 2
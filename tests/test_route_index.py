@@ -0,0 +1,93 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import route_index
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/jobs/{job}/runs")
+    async def run_any(job: str):
+        return {"route": "param", "job": job}
+
+    @app.get("/jobs/backup/runs")
+    async def run_backup():
+        return {"route": "literal"}
+
+    @app.post("/jobs/{job}/runs")
+    async def trigger(job: str):
+        return {"route": "post", "job": job}
+
+    @app.get("/files/{rest:path}")
+    async def files(rest: str):
+        return {"rest": rest}
+
+    @app.get("/ids/{n:int}")
+    async def ids(n: int):
+        return {"n": n}
+
+    app.router.routes = route_index.index_routes(app.router.routes, lambda r: r.path.startswith(("/jobs", "/files", "/ids")))
+    return app
+
+
+def test_literal_segments_win_over_params():
+    client = TestClient(_app())
+    assert client.get("/jobs/backup/runs").json() == {"route": "literal"}  # declared after the param route
+    assert client.get("/jobs/restore/runs").json() == {"route": "param", "job": "restore"}
+    assert client.post("/jobs/backup/runs").json() == {"route": "post", "job": "backup"}
+
+
+def test_wrong_method_is_405_and_misses_are_404():
+    client = TestClient(_app())
+    assert client.delete("/jobs/backup/runs").status_code == 405
+    assert client.get("/jobs//runs").status_code == 404  # empty segments do not fill a param
+    assert client.get("/jobs/backup").status_code == 404
+
+
+def test_params_are_converted_by_the_matched_route():
+    client = TestClient(_app())
+    assert client.get("/ids/7").json() == {"n": 7}
+    assert client.get("/ids/seven").status_code == 404
+
+
+def test_path_params_keep_linear_matching():
+    app = _app()
+    [index] = [r for r in app.router.routes if isinstance(r, route_index.RouteIndex)]
+    assert "/files/{rest:path}" not in [r.path for r in index.routes]
+    assert TestClient(app).get("/files/a/b/c").json() == {"rest": "a/b/c"}
+
+
+def test_reindexing_replaces_the_previous_index():
+    app = _app()
+
+    @app.get("/jobs/{job}/runs/latest")
+    async def latest(job: str):
+        return {"route": "latest", "job": job}
+
+    app.router.routes = route_index.index_routes(app.router.routes, lambda r: r.path.startswith("/jobs"))
+    indexes = [r for r in app.router.routes if isinstance(r, route_index.RouteIndex)]
+    assert len(indexes) == 1 and len(indexes[0].routes) == 4
+    client = TestClient(app)
+    assert client.get("/jobs/x/runs/latest").json() == {"route": "latest", "job": "x"}
+    assert client.get("/ids/7").json() == {"n": 7}  # dropped from the index, linear again
+    assert app.url_path_for("run_backup") == "/jobs/backup/runs"
+    assert "/jobs/{job}/runs" in app.openapi()["paths"]
+
+
+def test_families_sharing_a_router_keep_their_own_index():
+    app = _app()  # "route_index" owns /jobs, /files and /ids
+
+    @app.get("/landlord/{dc}/clusters")
+    async def clusters(dc: str):
+        return {"dc": dc}
+
+    for _ in range(2):  # re-indexing never takes over routes another family indexed
+        app.router.routes = route_index.index_routes(app.router.routes, lambda r: r.path.startswith(("/landlord", "/jobs")),
+                                                     name="landlord_routes")
+    indexes = {r.name: r for r in app.router.routes if isinstance(r, route_index.RouteIndex)}
+    assert set(indexes) == {"route_index", "landlord_routes"}
+    assert [r.path for r in indexes["landlord_routes"].routes] == ["/landlord/{dc}/clusters"]
+    client = TestClient(app)
+    assert client.get("/landlord/dc1/clusters").json() == {"dc": "dc1"}
+    assert client.get("/jobs/backup/runs").json() == {"route": "literal"}